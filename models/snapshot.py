@@ -1,4 +1,3 @@
-import copy
 from datetime import datetime
 
 import cv2
@@ -6,15 +5,16 @@ import numpy as np
 import pandas as pd
 from PySide6.QtCore import QObject, Signal, QRectF
 from PySide6.QtGui import QPixmap
-from skimage import color
 
 from models import Image, Target
-from util import image_converter as ic, SnapshotDataManager
+from models.timeline_store import CHUNK_ROWS, LodPyramid, TimelineStore, extend_well_distances
+from util import colorimetry, image_converter as ic, SnapshotDataManager
+from util import well_statistics as ws
+from util.enums import ColorDistanceMetric
 from util.local_storage_manager import TimelineDataManager
 from util.setting_manager import SettingManager
 
-MASK_COLOR = (255, 255, 255)
-UNMASK_COLOR = (0, 0, 0)
+WELL_DISTANCE_CACHE_SIZE = 8  # 홀 조합 별 색 차이 캐시 개수
 
 
 # origin_image 안에서 플레이트의 위치
@@ -128,35 +128,92 @@ class Mask(QObject):
     flare_threshold_changed = Signal()
 
     mask_updated = Signal()
+    mask_region_updated = Signal(int, int, int, int)  # x1, y1, x2, y2: 영역 단위 수정
 
     def __init__(self):
         super().__init__()
         self.plate_image = None
         self.columns = []
         self.rows = []
+        self.direction = 0
         self.radius = 0
         self.flare_threshold = 0
 
+        # 마스크 레이어는 (h, w) bool 평면, True: 마스크 처리(계산에서 제외)
+        self.circle_mask: np.ndarray = None  # 원 바깥 영역 (플레이트 설정 간 공유, 읽기 전용)
+        self.flare_mask: np.ndarray = None  # flare_threshold 초과 영역
+        self.custom_mask: np.ndarray = None  # 사용자가 직접 그린 영역
+
+        self._combined_mask: np.ndarray = None  # 세 레이어를 합친 마스크, 필요할 때 계산
+        self._integral_image: ws.WellIntegralImage = None  # 원 마스크를 제외한 마스크 기준 누적합 테이블
+        self._well_patches: ws.WellPatches = None  # 홀 별 이미지/마스크 조각
+        self.version = 0  # 영역 단위 수정을 제외한 마스크 변경 횟수
+
     @property
-    def mask_filled_array(self):
-        return self.masked_array.filled(0).astype(np.uint8)
+    def mask_filled_array(self):  # 마스크 영역을 0으로 채운 (h, w, 3) uint8 이미지
+        return np.where(self.combined_mask[:, :, None], np.uint8(0), self.plate_image)
+
+    def get_mask_filled_region(self, x1, y1, x2, y2):
+        region = np.s_[y1:y2, x1:x2]
+        return np.where(self.combined_mask[region][:, :, None], np.uint8(0), self.plate_image[region])
 
     @property
     def mask_filled_pixmap(self):
         return ic.array_to_q_pixmap(self.mask_filled_array)
 
+    @property
+    def masked_array(self) -> np.ma.MaskedArray:  # 기존 호출부 호환용
+        mask = np.broadcast_to(self.combined_mask[:, :, None], self.shape)
+        return np.ma.masked_array(self.plate_image, mask)
+
     @property
     def basic_mask(self):
         return np.logical_or(self.circle_mask, self.flare_mask)
 
+    @property
+    def combined_mask(self) -> np.ndarray:
+        if self._combined_mask is None:
+            self._combined_mask = self.basic_mask
+            np.logical_or(self._combined_mask, self.custom_mask, out=self._combined_mask)
+
+        return self._combined_mask
+
     @property
     def shape(self):
         return self.plate_image.shape if self.plate_image is not None else (10, 10, 3)
 
+    @property
+    def well_geometry(self) -> ws.WellGeometry:  # 같은 플레이트 설정의 마스크끼리 공유
+        return ws.WellGeometryCache().get(self.shape, self.rows, self.columns, self.radius, self.direction)
+
+    @property
+    def integral_image(self) -> ws.WellIntegralImage:
+        if self._integral_image is None:
+            masked = np.logical_or(self.flare_mask, self.custom_mask)
+            # 원 영역은 행 단위로만 조회하므로 이미지 너비를 최대 넓이로 사용
+            self._integral_image = ws.WellIntegralImage(self.plate_image, masked, max_area=self.shape[1])
+
+        return self._integral_image
+
+    @property
+    def well_patches(self) -> ws.WellPatches:
+        if self._well_patches is None:
+            self._well_patches = ws.WellPatches(self.plate_image, self.well_geometry, self.combined_mask)
+
+        return self._well_patches
+
+    def release_dense(self):  # 다시 계산할 수 있는 전체 크기 배열 해제, 통계와 화면은 조각을 사용
+        self._combined_mask = None
+        self._integral_image = None
+
     def init_mask_info(self, plate_image: np.ndarray, plate: PlatePosition, mask_info: dict, set=True):
         self.plate_image = plate_image
+        self._integral_image = None
+        self._well_patches = None
+        self.version += 1
         self.columns = plate.columns
         self.rows = plate.rows
+        self.direction = plate.direction
         self.radius = mask_info.get("radius") or 35
         self.flare_threshold = mask_info.get("flare_threshold") or 255
 
@@ -165,15 +222,14 @@ class Mask(QObject):
 
     def change_plate_image(self, plate_image: np.ndarray):
         self.plate_image = plate_image
+        self._integral_image = None
+        self._well_patches = None
+        self.version += 1
         self.set_mask()
         # self.on_mask_changed()
 
     def set_mask(self):
-        shape = self.shape
-        self.circle_mask = np.full(shape, 255, np.uint8)
-        self.flare_mask = np.full(shape, 0, np.uint8)
-        self.custom_mask = np.full(shape, 0, np.uint8)
-        self.masked_array: np.ndarray
+        self.custom_mask = np.zeros(self.shape[:2], dtype=bool)
 
         self.set_circle_mask()
         self.set_flare_mask(update_mask=True, emit=True)
@@ -195,43 +251,70 @@ class Mask(QObject):
         self.flare_threshold_changed.emit()
 
     def set_circle_mask(self, update_mask=False, emit=True):
-        self.circle_mask = np.full(self.shape, 255, dtype=np.uint8)
-
-        for y in self.rows:
-            for x in self.columns:
-                cv2.circle(self.circle_mask, (int(x), int(y)), self.radius, UNMASK_COLOR, thickness=cv2.FILLED)
+        self.circle_mask = self.well_geometry.circle_mask
 
         if update_mask:
-            self.update_mask(emit)
+            self.update_mask(emit, circle_changed=True)
 
     def set_flare_mask(self, update_mask=False, emit=True):
-        b, g, r = cv2.split(self.plate_image)
-        threshold = self.flare_threshold
-        self.flare_mask = np.zeros(self.shape)
-        self.flare_mask[(r > threshold) | (g > threshold) | (b > threshold)] = 255
+        self.flare_mask = np.any(self.plate_image > self.flare_threshold, axis=2)
 
         if update_mask:
             self.update_mask(emit)
 
     def set_custom_mask(self, mask: np.ndarray, emit=True):
-        self.custom_mask = mask
+        if mask.ndim == 3:  # 이전 버전의 (h, w, 3) uint8 마스크
+            mask = np.any(mask, axis=2)
+        self.custom_mask = np.array(mask, dtype=bool)
         self.update_mask(emit)
 
-    def update_mask(self, emit=True):
-        self.on_mask_changed()
+    def paint_custom_mask(self, x: int, y: int, radius: int, masked=True):
+        """ return 수정된 영역 (x1, y1, x2, y2) """
+        # bool 평면을 uint8로 보고 그리므로 0/1 값만 사용
+        cv2.circle(self.custom_mask.view(np.uint8), (x, y), radius, int(masked), thickness=cv2.FILLED)
+
+        height, width = self.custom_mask.shape
+        x1, y1 = min(width, max(0, x - radius)), min(height, max(0, y - radius))
+        x2, y2 = max(x1, min(width, x + radius + 1)), max(y1, min(height, y + radius + 1))
+        return x1, y1, x2, y2
+
+    def update_mask(self, emit=True, circle_changed=False):
+        self.on_mask_changed(circle_changed)
 
         if emit:
             self.mask_updated.emit()
 
-    def on_mask_changed(self):
-        combined_mask = np.logical_or(self.basic_mask, self.custom_mask)
-        self.masked_array = np.ma.masked_array(self.plate_image, combined_mask)
+    def update_mask_region(self, x1, y1, x2, y2):
+        self.on_mask_changed(dirty_rect=(x1, y1, x2, y2))
+        self.mask_region_updated.emit(x1, y1, x2, y2)
+
+    def on_mask_changed(self, circle_changed=False, dirty_rect=None):
+        if not circle_changed:  # 원 마스크만 바뀐 경우 누적합 테이블을 그대로 사용
+            self._integral_image = None
+
+        if dirty_rect is None:
+            self.version += 1
+            self._combined_mask = None
+            self._well_patches = None
+            return
+
+        x1, y1, x2, y2 = dirty_rect
+        if self._combined_mask is not None:
+            # 수정된 영역만 다시 합성
+            region = np.s_[y1:y2, x1:x2]
+            combined = self._combined_mask[region]
+            np.logical_or(self.circle_mask[region], self.flare_mask[region], out=combined)
+            np.logical_or(combined, self.custom_mask[region], out=combined)
+
+        if self._well_patches is not None:
+            self._well_patches.update_masks(self.well_geometry.get_wells_in_rect(x1, y1, x2, y2), self.combined_mask)
 
 
 class Snapshot(QObject):
     origin_image_changed = Signal(Image)  # 원본 이미지 변경시 발생
     target_changed = Signal(Target)  # 타겟 물질 변경시 발생
     processed = Signal()  # 마스크 매니저 윈도우 닫히면 발생: 처리 탭, 평균색 탭, 색차이 탭 업데이트 슬롯으로 연결
+    colors_changed = Signal()  # 이미지 교체, Lab 보정 상수 변경으로 평균색 캐시가 바뀌면 발생
 
     def __init__(self, image: np.ndarray = None, has_alpha: bool = False):
         super().__init__()
@@ -244,8 +327,15 @@ class Snapshot(QObject):
         self.snapshot_loaded = False
         self.is_property_referenced = False
         self.use_lab_corrected_pixmap = False
+        self.use_integral_image = False  # 누적합 테이블로 홀 별 통계 계산
 
         self._mean_rgb_colors: np.ndarray = None  # 96개 평균 RGB 배열
+        self._well_sums: np.ndarray = None  # 96개 홀의 RGB 합
+        self._well_counts: np.ndarray = None  # 96개 홀의 유효 픽셀 수
+        self._well_sums_version = None  # 홀 별 합을 계산한 마스크 버전
+        self._dirty_wells = set()  # 영역 단위 마스크 수정으로 다시 계산할 홀
+        self._mean_rgb_variances: np.ndarray = None  # 96개 RGB 분산 배열
+        self._well_pixel_counts: np.ndarray = None  # 96개 홀의 유효 픽셀 수
         self._cropped_array: np.ndarray = None  # crop된 플레이트 원본 이미지 어레이
         self._mean_color_pixmap: QPixmap = None  # crop된 평균 RGB 픽스맵
         self._cropped_pixmap: QPixmap = None  # 1.crop된 플레이트 원본 픽스맵 / 2.crop된 평균 RGB 픽스맵
@@ -261,6 +351,7 @@ class Snapshot(QObject):
         self.plate_position.position_changed.connect(self.on_position_changed)
         self.plate_position.direction_changed.connect(self.on_position_changed)
         self.mask.mask_updated.connect(self.init_property_reference)
+        self.mask.mask_region_updated.connect(self.on_mask_region_updated)
 
     def on_processed(self):
         plate_info = self.plate_position.get_plate_info_dict()
@@ -268,7 +359,8 @@ class Snapshot(QObject):
         plate_mask_info = dict(plate_info, **mask_info)
 
         SettingManager().set_mask_area_info(plate_mask_info)
-        self.mask.update_mask()
+        self.mask.release_dense()
+        self.mask.mask_updated.emit()
         self.processed.emit()
 
     # 영역이나 마스킹이 변경되면 기존 mean_colors의 참조를 해제함
@@ -278,13 +370,30 @@ class Snapshot(QObject):
 
     def init_property_reference(self):
         if self.is_property_referenced and self.mask_editable:
-            self.is_property_referenced = False
-            self._mean_rgb_colors = None
-            self._cropped_array = None
-            self._mean_color_pixmap = None
-            self._origin_sized_masked_pixmap = None
-            self._mean_lab_colors = None
-            self.init_lab_corrected_colors()
+            self.release_property_reference()
+
+    def release_property_reference(self):
+        self.is_property_referenced = False
+        self._mean_rgb_colors = None
+        self._mean_rgb_variances = None
+        self._well_pixel_counts = None
+        self._cropped_array = None
+        self._mean_color_pixmap = None
+        self._origin_sized_masked_pixmap = None
+        self._mean_lab_colors = None
+        self.init_lab_corrected_colors()
+
+    # 영역 단위로 마스크가 수정되면 해당 영역과 겹치는 홀만 다시 계산함
+    def on_mask_region_updated(self, x1, y1, x2, y2):
+        self._dirty_wells.update(self.mask.well_geometry.get_wells_in_rect(x1, y1, x2, y2).tolist())
+
+        self._mean_rgb_colors = None
+        self._mean_rgb_variances = None
+        self._well_pixel_counts = None
+        self._mean_color_pixmap = None
+        self._origin_sized_masked_pixmap = None
+        self._mean_lab_colors = None
+        self.init_lab_corrected_colors()
 
     def init_lab_corrected_colors(self):
         self._lab_corrected_lab_colors = None
@@ -294,6 +403,7 @@ class Snapshot(QObject):
         self.origin_image = image
         self.mask_editable = True
         self.snapshot_time = datetime.now()
+        self.release_property_reference()  # 이전 이미지의 crop을 마스크에 넘기지 않도록 먼저 해제
 
         plate_mask_info = SettingManager().get_mask_area_info()
 
@@ -307,9 +417,12 @@ class Snapshot(QObject):
         self.origin_image = image
         self.mask_editable = True
         self.snapshot_time = datetime.now()
+        # 이전 이미지의 crop은 풀이 다음 프레임으로 덮어쓸 수 있으므로 마스크에 넘기기 전에 해제
+        self.release_property_reference()
         self.mask.change_plate_image(self.cropped_array)
 
         self.init_property_reference()
+        self.colors_changed.emit()
         # self.origin_image_changed.emit(image)
 
     def save_snapshot(self, snapshot_path: str, snapshot_age: int):
@@ -324,11 +437,7 @@ class Snapshot(QObject):
         r, t = mask.get_mask_info()
 
         plate_image = self.cropped_array
-        mean_colors = copy.deepcopy(self.mean_rgb_colors)
-        for rows in mean_colors:
-            for column in rows:
-                for i in range(3):
-                    column[i] = int(column[i])
+        mean_colors = np.asarray(self.mean_rgb_colors).astype(int).tolist()
 
         mean_colors = {"mean_colors": mean_colors}
         snapshot_info = {
@@ -383,8 +492,8 @@ class Snapshot(QObject):
         self.init_property_reference()
         plate_info = {"x": 0, "y": 0, "width": 500, "height": 400, "direction": 1, "rotation": 0}
         mask_info = {"radius": 20, "flare_threshold": 255}
-        init_shape = (500, 400, 3)
-        new_mask = np.full(init_shape, 0, np.uint8)
+        init_shape = (500, 400)
+        new_mask = np.zeros(init_shape, dtype=bool)
         self.set_plate_mask_info(plate_info, mask_info, new_mask)
 
     def set_target(self, target: Target):
@@ -400,12 +509,23 @@ class Snapshot(QObject):
         self.is_property_referenced = True
         return self._mean_rgb_colors
 
+    @property
+    def mean_rgb_variances(self):
+        if self._mean_rgb_variances is None:
+            self.calculate_well_statistics()
+        return self._mean_rgb_variances
+
+    @property
+    def well_pixel_counts(self):
+        if self._well_pixel_counts is None:
+            self.calculate_well_statistics()
+        return self._well_pixel_counts
+
     @property
     def mean_lab_colors(self):
         if self._mean_lab_colors is not None:
             return self._mean_lab_colors
-        normalized_mean_colors = np.array(self.mean_rgb_colors) / 255.0
-        self._mean_lab_colors = color.rgb2lab(normalized_mean_colors)
+        self._mean_lab_colors = colorimetry.rgb_to_lab(np.asarray(self.mean_rgb_colors))
 
         return self._mean_lab_colors
 
@@ -435,9 +555,7 @@ class Snapshot(QObject):
             return self._lab_corrected_rgb_colors
 
         corrected_lab_colors = self.lab_corrected_lab_colors
-        normalized_corrected_rgb_colors = color.lab2rgb(corrected_lab_colors)
-
-        self._lab_corrected_rgb_colors = (normalized_corrected_rgb_colors * 255).astype(np.uint8)
+        self._lab_corrected_rgb_colors = colorimetry.lab_to_rgb(corrected_lab_colors).astype(np.uint8)
         return self._lab_corrected_rgb_colors
 
     @property
@@ -471,34 +589,50 @@ class Snapshot(QObject):
     def update_lab_correction_factors(self, lab_correction_factors: np.ndarray):
         self.lab_correction_factors = lab_correction_factors
         self.init_lab_corrected_colors()
+        self.colors_changed.emit()
 
     def set_use_lab_corrected_pixmap(self, use_lab_corrected_pixmap: bool):
         self._mean_color_pixmap = None
         self.use_lab_corrected_pixmap = use_lab_corrected_pixmap
 
     def calculate_mean_rgb_colors(self):
-        plate = self.plate_position
         mask = self.mask
-        r, columns, rows = mask.radius, plate.columns, plate.rows
-        plate_image = self.mask.masked_array
-
-        mean_rgb_colors = []
-        for j, circle_y in enumerate(rows):
-            mean_rgb_colors.append([])
-            for circle_x in columns:
-                x1, x2 = int(circle_x - r), int(circle_x + r)
-                y1, y2 = int(circle_y - r), int(circle_y + r)
-                cell = plate_image[y1:y2, x1:x2]
-                # mean_color = np.mean(cell, axis=(0, 1)).astype(np.uint8)
-                mean_rgb_color = np.mean(cell, axis=(0, 1)).astype(np.float32)
-                # mean_color = np.mean(cell, axis=(0, 1))
-                for i, rgb_color in enumerate(mean_rgb_color):
-                    if isinstance(color, np.ma.core.MaskedConstant):
-                        # mean_color[i] = np.uint8(0)
-                        mean_rgb_color[i] = np.float32(0.0)
-                mean_rgb_colors[j].append(list(mean_rgb_color))
-
-        return mean_rgb_colors
+        if self.use_integral_image:
+            return self.calculate_well_statistics()
+
+        sums, counts = self.well_sums
+        return ws.sums_to_means(sums, counts, mask.well_geometry)
+
+    @property
+    def well_sums(self):
+        """ return (sums (96, 3), counts (96,)) """
+        mask = self.mask
+
+        if self._well_sums is None or self._well_sums_version != mask.version:
+            geometry = mask.well_geometry
+            if geometry.use_bincount:
+                self._well_sums, self._well_counts = ws.bincount_well_sums(mask.plate_image, geometry,
+                                                                           mask.combined_mask)
+            else:
+                self._well_sums, self._well_counts = mask.well_patches.calculate_well_sums()
+            self._well_sums_version = mask.version
+        elif self._dirty_wells:
+            indexes = sorted(self._dirty_wells)
+            sums, counts = mask.well_patches.calculate_well_sums(indexes)
+            self._well_sums[indexes] = sums[indexes]
+            self._well_counts[indexes] = counts[indexes]
+        self._dirty_wells.clear()
+
+        return self._well_sums, self._well_counts
+
+    def calculate_well_statistics(self):
+        mask = self.mask
+        means, variances, counts = mask.integral_image.well_statistics(mask.well_geometry)
+        self._mean_rgb_variances = variances
+        self._well_pixel_counts = counts
+        self.is_property_referenced = True
+
+        return means
 
     @property
     def cropped_array(self) -> np.ndarray:
@@ -523,14 +657,12 @@ class Snapshot(QObject):
 
         new_array = np.full((height, width, 3), 0, dtype=np.uint8)
         if self.use_lab_corrected_pixmap:
-            mean_colors = copy.deepcopy(self.lab_corrected_rgb_colors.tolist())
+            mean_colors = self.lab_corrected_rgb_colors.tolist()
         else:
-            mean_colors = copy.deepcopy(self.mean_rgb_colors)
+            mean_colors = np.asarray(self.mean_rgb_colors, dtype=np.float64).tolist()
         for j, circle_y in enumerate(plate.rows):
             for i, circle_x in enumerate(plate.columns):
                 color = mean_colors[j][i]
-                for k in range(3):
-                    color[k] = np.float64(color[k])
                 try:
                     cv2.circle(new_array, (int(circle_x), int(circle_y)), mask.radius, color, cv2.FILLED)
                 except:
@@ -559,7 +691,7 @@ class Snapshot(QObject):
 
         background = np.full_like(self.origin_image.array, 0)
         x, y, width, height = self.plate_position.get_crop_area()
-        background[y:y + height, x:x + width] = self.mask.mask_filled_array
+        self.mask.well_patches.paste(background[y:y + height, x:x + width])  # 홀 영역 밖은 모두 마스크 처리됨
 
         self._origin_sized_masked_pixmap = ic.array_to_q_pixmap(background)
         self.is_property_referenced = True
@@ -625,10 +757,14 @@ class Timeline(dict):
         self.num_cells = 96
 
         self.info_saved = False
-        self.datas: pd.DataFrame
-        self.init_data_frame()
+        self.store = TimelineStore(self.num_cells)  # 색 차이, velocity, 보정 색은 선택한 홀만 계산
+        self.saved_count = 0  # 파일에 기록된 행 수
 
         self.lab_correction_factors: np.ndarray = None
+        self.distance_metric = ColorDistanceMetric.EUCLIDEAN  # 색 차이(distance) 계산 공식
+
+        self._well_distances = {}  # (홀 조합, 보정 여부): (n, k) 색 차이, velocity, (k, 3) 첫 행의 색
+        self._well_pyramids = {}  # (홀 조합, 보정 여부): 색 차이, velocity의 LodPyramid
 
     def init_plate_info(self, snapshot: Snapshot):
         x, y, w, h = snapshot.plate_position.get_plate_size()
@@ -642,214 +778,174 @@ class Timeline(dict):
         self["radius"] = r
         self["flare_threshold"] = t
 
-    def init_data_frame(self):
-        #         0: elapsed_time                       (1)
-        #   1 - 288: R, G, B                            (288)   96 * 3 = 288
-        # 289 - 384: ColorDistance                      (96)    96 * 4 = 384
-        # 385 - 480: ColorVelocity                      (96)    96 * 5 = 480
-        # 481 - 768: CorrectedR, CorrectedG, CorrectedB (288)   96 * 8 = 768
-        # 769 - 864: CorrectedColorDistance             (96)    96 * 9 = 864
-        # 865 - 960: CorrectedColorVelocity             (96)    96 * 10 = 960
-
-        columns = ["elapsed_time"]
-        for idx in range(96):
-            columns.extend([f"R{idx + 1}", f"G{idx + 1}", f"B{idx + 1}"])
-        for idx in range(96):
-            columns.append(f"ColorDistance{idx + 1}")
-        for idx in range(96):
-            columns.append(f"ColorVelocity{idx + 1}")
-        for idx in range(96):
-            columns.extend([f"CorrectedR{idx + 1}", f"CorrectedG{idx + 1}", f"CorrectedB{idx + 1}"])
-        for idx in range(96):
-            columns.append(f"CorrectedColorDistance{idx + 1}")
-        for idx in range(96):
-            columns.append(f"CorrectedColorVelocity{idx + 1}")
-
-        self.datas = pd.DataFrame(columns=columns)
+    @property
+    def datas(self) -> pd.DataFrame:
+        """ store를 복사 없이 감싸는 (n, 289) DataFrame: elapsed_time, R1, G1, B1 ... B96
+
+        예전 961열 표의 ColorDistance, ColorVelocity, Corrected* 열은 저장하지 않으므로
+        get_datas, get_timeline_datas로 선택한 홀만 계산해서 받음
+        """
+        return self.store.to_dataframe()
+
+    @datas.setter
+    def datas(self, datas: pd.DataFrame):  # 961열 표도 받으며 파생 열은 버림
+        self.store.load_dataframe(datas)
+        self.reset_distance_cache()
 
     def update_lab_correction_factors(self, lab_correction_factors: np.ndarray):
         self.lab_correction_factors = lab_correction_factors
-        num_cells = self.num_cells
-        self.datas.iloc[:, 1 + num_cells * 5:1 + num_cells * 10] = np.nan
-
-        self.lab_correct()
-
-    def lab_correct(self):
-        num_cells = self.num_cells
-        ors = 1  # origin_rgb_start
-        ore = 1 + num_cells * 3  # origin_rgb_end
-        crs = 1 + num_cells * 5  # corrected_rgb_start
-        cre = 1 + num_cells * 8  # corrected_rgb_end
-        cde = 1 + num_cells * 9  # corrected_distance_end
-        cve = 1 + num_cells * 10  # corrected_velocity_end
-
-        def convert_row_to_lab(row):
-            # 해당 행의 RGB 데이터를 추출하고 2D 배열로 변환
-            rgb_values = row.values.reshape(-1, 3)
-            lab_values = color.rgb2lab(rgb_values)
-            # 1D 배열로 변환해 반환
-            return lab_values.flatten()
-
-        def apply_rgb2lab(df):
-            # 각 행에 대해 RGB -> LAB 변환 적용
-            lab = df.apply(lambda row: convert_row_to_lab(row), axis=1)
-            lab_df = pd.DataFrame(lab.tolist(), index=df.index, columns=df.columns[:])
-
-            return lab_df
-
-        def apply_lab_correction(row, lab_correction_factors):
-            # LAB 데이터를 numpy 배열로 변환 (1차원일 경우 reshape으로 강제 변환)
-            # lab_correction_factors = self.lab_correction_factors
-
-            arrayed_row = row.values.reshape(12, 8, -1)
-            corrected_lab_colors = np.zeros_like(arrayed_row)
-
-            corrected_lab_colors[:, :, 0] = arrayed_row[:, :, 0] * lab_correction_factors[:, :, 0]
-            corrected_lab_colors[:, :, 1] = arrayed_row[:, :, 1] + lab_correction_factors[:, :, 1]
-            corrected_lab_colors[:, :, 2] = arrayed_row[:, :, 2] + lab_correction_factors[:, :, 2]
-
-            corrected_lab_colors[:, :, 0] = np.clip(corrected_lab_colors[:, :, 0], 0, 100)  # L 범위: 0~100
-            corrected_lab_colors[:, :, 1] = np.clip(corrected_lab_colors[:, :, 1], -128, 128)  # a 범위: -128~128
-            corrected_lab_colors[:, :, 2] = np.clip(corrected_lab_colors[:, :, 2], -128, 128)  # b 범위: -128~128
-
-            return corrected_lab_colors.reshape(-1)
-
-        def convert_row_to_rgb(row):
-            # 해당 행의 lab 데이터를 추출하고 2D 배열로 변환
-            lab_values = row.values.reshape(-1, 3)
-            rgb_values = color.lab2rgb(lab_values)
-            # 1D 배열로 변환해 반환
-            return rgb_values.flatten()
-
-        def apply_lab2rgb(lab_df):
-            # 각 행의 LAB 데이터를 다시 RGB로 변환
-            rgb = lab_df.apply(lambda row: convert_row_to_rgb(row) * 255, axis=1)
-
-            rgb_df = pd.DataFrame(rgb.tolist(), index=lab_df.index, columns=lab_df.columns)
-            return rgb_df
-
-        normalized_rgb = self.datas.iloc[:, ors:ore] / 255.0
-        # lab_values = color.rgb2lab(normalized_rgb)
-        lab_values = apply_rgb2lab(normalized_rgb)
-
-        # Step 3: Apply LAB correction using self.lab_correction_factors
-        lab_correction_factors = self.lab_correction_factors[::-1]
-        corrected_lab_values = lab_values.apply(lambda row: apply_lab_correction(row, lab_correction_factors), axis=1)
-        corrected_lab_values = pd.DataFrame(corrected_lab_values.tolist(), index=lab_values.index)
-
-        # Step 4: Convert corrected LAB values back to RGB
-        corrected_rgb = apply_lab2rgb(corrected_lab_values)
-
-        # Step 5: Store the corrected RGB values back in the original DataFrame
-        # corrected_rgb_df = pd.DataFrame(corrected_rgb.tolist(), index=self.datas.index)
-        self.datas.iloc[:, crs:cre] = corrected_rgb
-
-        corrected_init_colors = self.datas.iloc[0, crs:cre].values.reshape(num_cells, 3)
-
-        corrected_current_colors_matrix = self.datas.iloc[1:, crs:cre].values.reshape(-1, num_cells, 3)
-        corrected_distances = np.linalg.norm(corrected_init_colors - corrected_current_colors_matrix, axis=2)
-
-        for idx in range(num_cells):
-            self.datas.iloc[1:, self.datas.columns.get_loc(f"CorrectedColorDistance{idx + 1}")] = corrected_distances[:,
-                                                                                                  idx]
-
-        corrected_distance_columns = [f"CorrectedColorDistance{idx + 1}" for idx in range(num_cells)]
-        corrected_prev_distances = self.datas.iloc[1:-1,
-                                   self.datas.columns.get_loc(corrected_distance_columns[0]):self.datas.columns.get_loc(
-                                       corrected_distance_columns[-1]) + 1].astype(np.float32).values
-        corrected_current_distances = self.datas.iloc[2:, self.datas.columns.get_loc(
-            corrected_distance_columns[0]):self.datas.columns.get_loc(
-            corrected_distance_columns[-1]) + 1].astype(np.float32).values
-        corrected_prev_distances[corrected_prev_distances == 0] = np.finfo(np.float32).eps
-        corrected_color_velocities = (corrected_current_distances - corrected_prev_distances) / corrected_prev_distances
-
-        for idx, col in enumerate(corrected_distance_columns):
-            self.datas.iloc[2:,
-            self.datas.columns.get_loc(f"CorrectedColorVelocity{idx + 1}")] = corrected_color_velocities[:, idx]
+        self.reset_distance_cache()  # 보정된 색은 get_well_rgbs에서 선택한 홀만 계산
+
+    def get_lab_corrected_rgbs(self, rgbs: np.ndarray, wells=None) -> np.ndarray:
+        """ (n, k, 3) rgb에 홀 별 Lab 보정 상수를 적용한 (n, k, 3) rgb, wells가 None이면 전체 홀
+
+        CHUNK_ROWS 행씩 변환해 미리 만든 결과 배열에 채우므로 변환 중 임시 배열은 행 수와 관계없이 일정함
+        """
+        # 행 순서에 맞춰 뒤집은 홀 별 보정 상수 (96, 3), (rows, k, 3) Lab 블록에 broadcast
+        lab_correction_factors = self.lab_correction_factors[::-1].reshape(self.num_cells, 3)
+        if wells is not None:
+            lab_correction_factors = lab_correction_factors[wells]
+
+        corrected_rgbs = np.empty(rgbs.shape, dtype=np.float32)
+        for start in range(0, len(rgbs), CHUNK_ROWS):
+            rows = slice(start, start + CHUNK_ROWS)
+            lab_values = colorimetry.rgb_to_lab(rgbs[rows])
+            lab_values[:, :, 0] *= lab_correction_factors[:, 0]
+            lab_values[:, :, 1:] += lab_correction_factors[:, 1:]
+            np.clip(lab_values[:, :, 0], 0, 100, out=lab_values[:, :, 0])  # L 범위: 0~100
+            np.clip(lab_values[:, :, 1:], -128, 128, out=lab_values[:, :, 1:])  # a, b 범위: -128~128
+            corrected_rgbs[rows] = colorimetry.lab_to_rgb(lab_values)
+
+        return corrected_rgbs
+
+    def set_distance_metric(self, metric: ColorDistanceMetric):
+        """ 색 차이 공식을 바꾸면 다음 계산에서 저장된 rgb로 distance, velocity를 다시 계산 """
+        if metric == self.distance_metric:
+            return
+        self.distance_metric = metric
+        self.reset_distance_cache()
 
     def append_snapshot(self, snapshot: Snapshot):
         num_cells = self.num_cells  # 96
+        store = self.store
         current_time = snapshot.snapshot_time.strftime("%y%m%d-%H%M%S.%f")[:-5]
 
         elapsed_time = self.elapsed_time
         mean_rgb_colors = np.array(snapshot.mean_rgb_colors[::-1]).reshape(-1, 3)
 
-        # 데이터 프레임 할당
-        new_row = np.full(num_cells * 10 + 1, np.nan, dtype=np.float32)
+        # 새 행을 store에 바로 채움
+        new_row = np.full(len(store.columns), np.nan, dtype=np.float32)
         new_row[0] = elapsed_time  # 누적 시간
-        # new_row[1:1 + mean_rgb_colors.size] = mean_rgb_colors.flatten()  # 일반 rgb
-        new_row[1:1 + num_cells * 3] = mean_rgb_colors.flatten()  # 일반 rgb
-
-        if self.lab_correction_factors is not None:
-            # lab 보정된 데이터
-            lab_corrected_rgb_colors = np.array(snapshot.lab_corrected_lab_colors[::-1]).reshape(-1, 3)
-            crs = 1 + num_cells * 5  # corrected_rgb_start
-            cre = 1 + num_cells * 8  # corrected_rgb_end
-            cde = 1 + num_cells * 9  # corrected_distance_end
-            cve = 1 + num_cells * 10  # corrected_velocity_end
-            new_row[crs:cre] = lab_corrected_rgb_colors.flatten()
-
-        self.datas.loc[current_time] = new_row
-
-        if self.current_count > 1:
-            # 일반 색 차이
-            init_colors = self.datas.iloc[0, 1:289].values.reshape(self.num_cells, 3)
-            current_colors = mean_rgb_colors
-            distances = np.linalg.norm(init_colors - current_colors, axis=1)
-            self.datas.iloc[self.current_count - 1, self.num_cells * 3 + 1:self.num_cells * 4 + 1] = distances
-
-            if self.lab_correction_factors is not None:
-                # lab 보정된 색차이
-                corrected_init_colors = self.datas.iloc[0, crs:cre].values.reshape(self.num_cells, 3)
-                current_corrected_colors = lab_corrected_rgb_colors
-                distances = np.linalg.norm(corrected_init_colors - current_corrected_colors, axis=1)
-                self.datas.iloc[self.current_count - 1, cre:cde] = distances
-
-        if self.current_count > 2:
-            # 일반 velocity
-            distance_idx = self.num_cells * 3 + 1
-            prev_distances = self.datas.iloc[
-                             self.current_count - 2, distance_idx:distance_idx + self.num_cells].astype(np.float32)
-            current_distances = self.datas.iloc[
-                                self.current_count - 1, distance_idx:distance_idx + self.num_cells].astype(np.float32)
-
-            with np.errstate(divide='ignore', invalid='ignore'):
-                color_velocities = np.true_divide(current_distances - prev_distances, prev_distances)
-                color_velocities[~np.isfinite(color_velocities)] = 0
-            self.datas.iloc[self.current_count - 1, self.num_cells * 4 + 1:self.num_cells * 5 + 1] = color_velocities
-
-            if self.lab_correction_factors is not None:
-                # lab 보정된 velocity
-                prev_corrected_distances = self.datas.iloc[self.current_count - 2, cre:cde].astype(np.float32)
-                current_corrected_distances = self.datas.iloc[self.current_count - 1, cre:cde].astype(np.float32)
-
-                with np.errstate(divide="ignore", invalid="ignore"):
-                    corrected_color_velocities = np.true_divide(
-                        current_corrected_distances - prev_corrected_distances, prev_corrected_distances)
-                    corrected_color_velocities[~np.isfinite(corrected_color_velocities)] = 0
-                self.datas.iloc[self.current_count - 1, cde:cve] = corrected_color_velocities
+        new_row[store.sections["rgb"]] = mean_rgb_colors.flatten()  # 일반 rgb
 
+        # 캐시된 홀 별 색 차이는 다음 get_well_distances에서 새 행만 이어 계산
+        store.append(new_row, current_time)
         self.save_timeline()
 
+    def reset_distance_cache(self):
+        """ store, 보정 상수, 색 차이 공식이 바뀌면 호출, 다음 계산에서 store로부터 다시 채움 (첫 행의 색 포함) """
+        self._well_distances.clear()
+        self._well_pyramids.clear()
+
+    def get_well_rgbs(self, wells: list, corrected=False, rows=slice(None)) -> np.ndarray:
+        """ return 선택한 홀의 (n, k, 3) rgb, corrected면 Lab 보정된 rgb """
+        rgbs = self.store.get_rgbs(rows, wells)
+        if corrected:
+            return self.get_lab_corrected_rgbs(rgbs, wells)
+        return rgbs
+
+    def get_well_distances(self, wells: list, corrected=False) -> (np.ndarray, np.ndarray):
+        """ return 선택한 홀의 (n, k) 색 차이, velocity
+
+        홀 조합 별로 캐시하고, append로 늘어난 행만 이어서 계산함
+        보정 상수나 색 차이 공식이 바뀌면 reset_distance_cache로 비움
+        """
+        key = (tuple(wells), corrected)
+        empty = np.empty((0, len(wells)), dtype=np.float32)
+        distances, velocities, baseline_colors = self._well_distances.pop(key, (empty, empty, None))
+
+        size = len(self.store)
+        computed = len(distances)
+        if computed < size:
+            colors = self.get_well_rgbs(wells, corrected, slice(computed, size))
+            if baseline_colors is None:
+                # 첫 행의 색(보정된 색 포함)은 한 번만 읽어 두고 이후 append에서는 새 행만 변환함
+                baseline_colors = colors[0].copy()
+            distances, velocities = extend_well_distances(distances, velocities, baseline_colors, colors,
+                                                          self.distance_metric)
+
+        # 최근에 쓴 조합을 뒤로 보내고 오래된 조합부터 버림
+        self._well_distances[key] = (distances, velocities, baseline_colors)
+        while len(self._well_distances) > WELL_DISTANCE_CACHE_SIZE:
+            old_key = next(iter(self._well_distances))
+            del self._well_distances[old_key]
+            self._well_pyramids.pop(old_key, None)
+
+        return distances, velocities
+
+    def get_well_lod_datas(self, wells: list, corrected=False, max_points=1000) -> (np.ndarray, np.ndarray,
+                                                                                  np.ndarray, np.ndarray):
+        """ return 점 수가 max_points 이하인 (m, k) 색 차이의 경과 시간, 색 차이, velocity의 경과 시간, velocity
+
+        화면 폭에 맞는 level의 버킷마다 홀 별 min, max 두 점을 실제 행의 시간 순서대로 그려 튀는 값도 사라지지 않게 함
+        """
+        distances, velocities = self.get_well_distances(wells, corrected)
+        key = (tuple(wells), corrected)
+        if key not in self._well_pyramids:
+            self._well_pyramids[key] = (LodPyramid(), LodPyramid())
+        distance_pyramid, velocity_pyramid = self._well_pyramids[key]
+        distance_pyramid.update(distances)
+        velocity_pyramid.update(velocities)
+
+        elapsed_times = self.store.get_elapsed_times()
+        level = distance_pyramid.choose_level(max(1, max_points // 2))
+        if level == 0:
+            times = np.broadcast_to(elapsed_times[:, None], distances.shape)
+            return times, distances, times, velocities
+
+        distance_times, distances = distance_pyramid.get_points(level, elapsed_times)
+        velocity_times, velocities = velocity_pyramid.get_points(level, elapsed_times)
+        return distance_times, distances, velocity_times, velocities
+
     # append snapshot 작성 완료. 타임라인 불러오기할 때 보정 적용하기   ############################
     # get_datas에서 일반색 or 보정된 색 return
 
     def get_color_distance(self, color1, color2) -> np.float32:
         return np.float32(round(np.linalg.norm(color1 - color2), 3))
 
-    def get_datas(self, indexes: list, apply_lab_correct, include_velocity=True) -> (list, pd.DataFrame, pd.DataFrame):
-        elapsed_times = self.datas["elapsed_time"].tolist()
+    def get_datas(self, indexes: list, apply_lab_correct, include_velocity=True, max_points=None) \
+            -> (list, pd.DataFrame, pd.DataFrame, np.ndarray):
+        """ return 경과 시간, 색 차이, velocity, velocity의 경과 시간 (None이면 색 차이와 같음)
+
+        max_points: 그래프 폭(픽셀), 행이 더 많으면 LodPyramid로 줄인 값과 홀 별 (m, k) 경과 시간을 return
+        """
+        store = self.store
+        elapsed_times = store.get_elapsed_times().tolist()
         distance_datas = [f"ColorDistance{idx + 1}" for idx in indexes]
         velocity_datas = ([f"ColorVelocity{idx + 1}" for idx in indexes])
-        if self.lab_correction_factors is not None and apply_lab_correct:
+        corrected = self.lab_correction_factors is not None and apply_lab_correct
+        if corrected:
             distance_datas = [f"CorrectedColorDistance{idx + 1}" for idx in indexes]
             velocity_datas = ([f"CorrectedColorVelocity{idx + 1}" for idx in indexes])
-        return elapsed_times, self.datas[distance_datas], self.datas[velocity_datas] if include_velocity else None
+
+        if max_points is not None and len(store) > max_points:
+            distance_times, distances, velocity_times, velocities = self.get_well_lod_datas(indexes, corrected,
+                                                                                             max_points)
+            return (distance_times, pd.DataFrame(distances, columns=distance_datas, copy=False),
+                    pd.DataFrame(velocities, columns=velocity_datas, copy=False) if include_velocity else None,
+                    velocity_times)
+
+        distances, velocities = self.get_well_distances(indexes, corrected)
+        index = pd.Index(store.index)
+        return (elapsed_times, pd.DataFrame(distances, index=index, columns=distance_datas, copy=False),
+                pd.DataFrame(velocities, index=index, columns=velocity_datas, copy=False)
+                if include_velocity else None, None)
 
     def get_timeline_datas(self, indexes: list, apply_lab_correct) -> (list, pd.DataFrame, pd.DataFrame):
         rgb_columns = []
         distance_columns = []
-        if self.lab_correction_factors is not None and apply_lab_correct:
+        corrected = self.lab_correction_factors is not None and apply_lab_correct
+        if corrected:
             for idx in indexes:
                 rgb_columns.extend([f"CorrectedR{idx + 1}", f"CorrectedG{idx + 1}", f"CorrectedB{idx + 1}"])
             for idx in indexes:
@@ -860,10 +956,13 @@ class Timeline(dict):
             for idx in indexes:
                 distance_columns.extend([f"ColorDistance{idx + 1}"])
 
-        rgb_datas = self.datas[rgb_columns]
-        distance_datas = self.datas[distance_columns]
+        index = pd.Index(self.store.index)
+        rgbs = self.get_well_rgbs(indexes, corrected).reshape(len(index), -1)
+        rgb_datas = pd.DataFrame(rgbs, index=index, columns=rgb_columns)
+        distances, _ = self.get_well_distances(indexes, corrected)
+        distance_datas = pd.DataFrame(distances, index=index, columns=distance_columns)
 
-        rows = self.datas.index.tolist()
+        rows = self.store.index
         datetimes = [datetime.strptime(row, '%y%m%d-%H%M%S.%f') for row in rows]
         real_elapsed_times = [0.0]
         for i in range(1, len(datetimes)):
@@ -876,8 +975,13 @@ class Timeline(dict):
             TimelineDataManager().save_timeline_info(self.camera_settings, self.cs_file_name, self, self.ti_file_name)
             self.info_saved = True
 
-        mean_colors = self.datas.iloc[:, :289]
-        TimelineDataManager().save_timeline(mean_colors, self.mc_file_name)
+        # 아직 기록하지 않은 행만 이어 씀, 불러온 타임라인이 아닌데 처음 쓰는 경우는 새 파일로 시작
+        store = self.store
+        rows = slice(self.saved_count, len(store))
+        TimelineDataManager().append_timeline(store.index[rows], store.get_elapsed_times(rows),
+                                              store.get_rgbs(rows).reshape(-1, self.num_cells * 3), self.mc_file_name,
+                                              new_timeline=self.saved_count == 0)
+        self.saved_count = len(store)
 
     def load_timeline(self, snapshot_instance: Snapshot):
         worker, camera_settings = TimelineDataManager().load_timeline(
@@ -891,7 +995,7 @@ class Timeline(dict):
             worker.finished.connect(lambda i, d: self.on_timeline_data_loaded(snapshot_instance, i, d))
         return worker, camera_settings
 
-    def on_timeline_data_loaded(self, snapshot_instance, timeline_info, datas):
+    def on_timeline_data_loaded(self, snapshot_instance, timeline_info, datas: TimelineStore):
         for key, value in timeline_info.items():
             if key == "rounds":
                 continue
@@ -902,7 +1006,9 @@ class Timeline(dict):
         snapshot_instance.mask.set_radius(self["radius"])
         snapshot_instance.mask.set_flare_threshold(self["flare_threshold"], False)
 
-        self.datas = datas
+        self.store = datas
+        self.saved_count = len(self.store)
+        self.reset_distance_cache()
         self.info_saved = True
 
     @property
@@ -911,7 +1017,7 @@ class Timeline(dict):
 
     @property
     def current_count(self):
-        return len(self.datas)
+        return len(self.store)
 
     @property
     def current_round(self):
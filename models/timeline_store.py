@@ -0,0 +1,326 @@
+import numpy as np
+import pandas as pd
+
+from util.colorimetry import rgb_distances
+from util.enums import ColorDistanceMetric
+
+INITIAL_CAPACITY = 64
+CHUNK_ROWS = 4096  # 행 단위 일괄 계산 시 한 번에 처리하는 행 수
+
+
+def get_timeline_columns(num_cells: int = 96) -> list:
+    #       0: elapsed_time  (1)
+    # 1 - 288: R, G, B       (288)   96 * 3 = 288
+    # 색 차이, velocity, 보정 색은 저장하지 않고 선택한 홀만 계산 (Timeline.get_well_distances)
+    columns = ["elapsed_time"]
+    for idx in range(num_cells):
+        columns.extend([f"R{idx + 1}", f"G{idx + 1}", f"B{idx + 1}"])
+
+    return columns
+
+
+def get_timeline_sections(num_cells: int = 96) -> dict:
+    return {
+        "elapsed_time": slice(0, 1),
+        "rgb": slice(1, 1 + num_cells * 3),
+    }
+
+
+def extend_well_distances(distances: np.ndarray, velocities: np.ndarray, baseline_colors: np.ndarray,
+                          colors: np.ndarray, metric=None) -> (np.ndarray, np.ndarray):
+    """ 이미 계산된 (m, k) 색 차이, velocity 뒤에 새 행 (n - m, k, 3) colors의 값을 이어 붙임
+
+    baseline_colors: 첫 행의 (k, 3) 색, 첫 행의 distance와 처음 두 행의 velocity는 NaN
+    """
+    if metric is None:
+        metric = ColorDistanceMetric.EUCLIDEAN
+
+    computed = len(distances)
+    new_distances = rgb_distances(baseline_colors, colors, metric).astype(np.float32)
+    if computed == 0:
+        new_distances[:1] = np.nan
+    distances = np.concatenate([distances, new_distances])
+
+    new_velocities = np.full(new_distances.shape, np.nan, dtype=np.float32)
+    start = max(2, computed)
+    if start < len(distances):
+        prev_distances = distances[start - 1:-1].copy()
+        prev_distances[prev_distances == 0] = np.finfo(np.float32).eps
+        new_velocities[start - computed:] = (distances[start:] - prev_distances) / prev_distances
+    velocities = np.concatenate([velocities, new_velocities])
+
+    return distances, velocities
+
+
+def combine_buckets(mins, maxs, argmins, argmaxs, sums, counts) -> tuple:
+    """ 이웃한 두 버킷을 하나로 합침, 개수가 홀수면 마지막 버킷은 혼자 합쳐짐
+
+    argmins, argmaxs: 최솟값, 최댓값이 있는 행 번호, 같은 값이면 앞의 행, 값이 모두 NaN이면 -1
+    """
+    if len(mins) % 2:
+        pad = np.full((1,) + mins.shape[1:], np.nan, dtype=mins.dtype)
+        pad_rows = np.full(pad.shape, -1, dtype=argmins.dtype)
+        mins = np.concatenate([mins, pad])
+        maxs = np.concatenate([maxs, pad])
+        argmins = np.concatenate([argmins, pad_rows])
+        argmaxs = np.concatenate([argmaxs, pad_rows])
+        sums = np.concatenate([sums, np.zeros_like(pad)])
+        counts = np.concatenate([counts, np.zeros(pad.shape, dtype=counts.dtype)])
+
+    # 왼쪽이 NaN이면 오른쪽을 택함
+    right_min = (mins[1::2] < mins[0::2]) | np.isnan(mins[0::2])
+    right_max = (maxs[1::2] > maxs[0::2]) | np.isnan(maxs[0::2])
+    return (np.where(right_min, mins[1::2], mins[0::2]), np.where(right_max, maxs[1::2], maxs[0::2]),
+            np.where(right_min, argmins[1::2], argmins[0::2]), np.where(right_max, argmaxs[1::2], argmaxs[0::2]),
+            sums[0::2] + sums[1::2], counts[0::2] + counts[1::2])
+
+
+class LodPyramid:
+    """ (n, k) 값을 2^level 행씩 묶은 버킷 별 min / max / mean과 min, max가 있는 행 번호
+
+    level 0은 원래 값이고, update는 지난 호출 이후 늘어난 행이 속한 버킷만 다시 계산함
+    그래프는 화면 폭에 맞는 level을 골라 버킷마다 min, max 두 점을 시간 순서대로 그림 (M4 방식)
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.levels = []  # level 1부터: [mins, maxs, argmins, argmaxs, sums, counts] 각 (capacity, k)
+        self.lengths = []  # level 별 유효한 버킷 수
+
+    def update(self, values: np.ndarray):
+        """ values: 지금까지의 전체 (n, k) 값, 앞의 self.size 행은 이전 호출과 같아야 함 """
+        size = len(values)
+        if size <= self.size:
+            return
+
+        finite = np.isfinite(values)
+        start = self.size
+        child = None
+        level = 1
+        child_length = size
+        while child_length > 1:
+            first_bucket = start >> level
+            if child is None:
+                rows = values[first_bucket * 2:size]
+                valid = finite[first_bucket * 2:size]
+                row_numbers = np.arange(first_bucket * 2, size)[:, None]
+                row_numbers = np.where(valid, row_numbers, -1)
+                buckets = combine_buckets(rows, rows, row_numbers, row_numbers, np.where(valid, rows, 0),
+                                          valid.astype(np.int32))
+            else:
+                buckets = combine_buckets(*[array[first_bucket * 2:child_length] for array in child])
+
+            length = first_bucket + len(buckets[0])
+            self.set_buckets(level, first_bucket, length, buckets)
+            child = [array[:length] for array in self.levels[level - 1]]
+            child_length = length
+            level += 1
+
+        self.size = size
+
+    def set_buckets(self, level: int, first_bucket: int, length: int, buckets: tuple):
+        if len(self.levels) < level:
+            self.levels.append([np.empty((0,) + bucket.shape[1:], dtype=bucket.dtype) for bucket in buckets])
+            self.lengths.append(0)
+
+        arrays = self.levels[level - 1]
+        if len(arrays[0]) < length:
+            # 용량을 2배씩 늘려 append 당 분할상환 O(1)
+            capacity = max(length, len(arrays[0]) * 2, 1)
+            for i, array in enumerate(arrays):
+                grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+                grown[:self.lengths[level - 1]] = array[:self.lengths[level - 1]]
+                arrays[i] = grown
+
+        for array, bucket in zip(arrays, buckets):
+            array[first_bucket:length] = bucket
+        self.lengths[level - 1] = length
+
+    def choose_level(self, max_buckets: int) -> int:
+        """ return 버킷 수가 max_buckets 이하가 되는 가장 낮은 level """
+        level = 0
+        while level < len(self.levels) and (self.size >> level) + 1 > max_buckets:
+            level += 1
+        return level
+
+    def get_level(self, level: int) -> (np.ndarray, np.ndarray, np.ndarray):
+        """ return level의 (buckets, k) min, max, mean """
+        mins, maxs, _, _, sums, counts = [array[:self.lengths[level - 1]] for array in self.levels[level - 1]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = sums / counts
+        return mins, maxs, means
+
+    def get_points(self, level: int, times: np.ndarray) -> (np.ndarray, np.ndarray):
+        """ return 버킷마다 min, max 중 앞선 행부터 두 점씩 놓은 (2 * buckets, k) 시간, 값
+
+        times: (n,) 행 별 시간, 값이 모두 NaN인 버킷의 점은 시간, 값 모두 NaN
+        """
+        mins, maxs, argmins, argmaxs, _, _ = [array[:self.lengths[level - 1]] for array in self.levels[level - 1]]
+        min_first = argmins <= argmaxs
+        first_values = np.where(min_first, mins, maxs)
+        second_values = np.where(min_first, maxs, mins)
+        first_rows = np.where(min_first, argmins, argmaxs)
+        second_rows = np.where(min_first, argmaxs, argmins)
+
+        times = np.append(np.asarray(times, dtype=np.float64), np.nan)  # 행 번호 -1은 NaN
+        values = np.stack([first_values, second_values], axis=1).reshape((-1,) + mins.shape[1:])
+        rows = np.stack([first_rows, second_rows], axis=1).reshape((-1,) + mins.shape[1:])
+        return times[rows], values
+
+
+class TimelineStore:
+    """ 타임라인 데이터를 담는 (capacity, 289) float32 블록, elapsed_time과 홀 별 R, G, B
+
+    용량이 부족하면 2배로 늘리므로 append는 분할상환 O(1)이고,
+    섹션(elapsed_time, rgb)과 DataFrame은 블록의 앞 size 행을 복사 없이 참조함
+    distance, velocity, 보정 색은 사용하는 쪽에서 필요한 홀만 계산
+
+    set_base()로 불러온 기록은 메모리에 올리지 않고 .mclog memmap(TimelineLogReader)을 그대로 쓰며,
+    get_rgbs()가 필요한 행과 홀만 읽음. 이때 블록에는 불러온 뒤 추가된 행만 담고,
+    전체 섹션과 DataFrame은 기록을 합친 복사본이 됨
+    """
+
+    def __init__(self, num_cells: int = 96, capacity: int = INITIAL_CAPACITY):
+        self.num_cells = num_cells
+        self.columns = pd.Index(get_timeline_columns(num_cells))
+        self.column_locs = {column: loc for loc, column in enumerate(self.columns)}
+        self.sections = get_timeline_sections(num_cells)
+
+        self.block = np.full((max(1, capacity), len(self.columns)), np.nan, dtype=np.float32)
+        self.index = []  # 행 이름 ("%y%m%d-%H%M%S.%f"[:-5])
+        self.size = 0
+
+        self.reader = None  # 불러온 기록의 TimelineLogReader
+        self.reader_rows: np.ndarray = None  # 기록에서 쓰는 레코드 번호 (crc가 맞는 레코드), None이면 전체
+        self.base_elapsed_times = np.empty(0, dtype=np.float32)
+        self.base_size = 0  # 기록에서 읽는 앞쪽 행 수
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return self.base_size + len(self.block)
+
+    @property
+    def appended(self) -> np.ndarray:  # 블록에 담긴 (size - base_size, 289) view
+        return self.block[:self.size - self.base_size]
+
+    @property
+    def values(self) -> np.ndarray:  # (size, 289), 기록이 없으면 view
+        if not self.base_size:
+            return self.appended
+        base = np.empty((self.base_size, len(self.columns)), dtype=np.float32)
+        base[:, self.sections["elapsed_time"]] = self.base_elapsed_times[:, None]
+        base[:, self.sections["rgb"]] = self.get_rgbs(slice(0, self.base_size)).reshape(self.base_size, -1)
+        return np.concatenate([base, self.appended])
+
+    def set_base(self, reader, indexes: list, elapsed_times: np.ndarray, reader_rows: np.ndarray = None):
+        """ 불러온 기록을 앞쪽 행으로 사용, reader_rows: 기록에서 쓸 레코드 번호 (None이면 전체) """
+        self.clear()
+        self.reader = reader
+        self.reader_rows = reader_rows
+        self.base_elapsed_times = np.asarray(elapsed_times, dtype=np.float32)
+        self.base_size = len(indexes)
+        self.index = list(indexes)
+        self.size = self.base_size
+
+    def reserve(self, capacity: int):
+        capacity -= self.base_size
+        if capacity <= len(self.block):
+            return
+
+        new_capacity = len(self.block)
+        while new_capacity < capacity:
+            new_capacity *= 2
+
+        block = np.full((new_capacity, len(self.columns)), np.nan, dtype=np.float32)
+        block[:self.size - self.base_size] = self.appended
+        self.block = block
+
+    def append(self, row: np.ndarray, index: str) -> int:
+        """ return 추가된 행 번호 """
+        self.reserve(self.size + 1)
+        self.block[self.size - self.base_size] = row
+        self.index.append(index)
+        self.size += 1
+
+        return self.size - 1
+
+    def extend(self, indexes: list, **sections):
+        """ 여러 행을 한 번에 추가, 주어지지 않은 섹션은 NaN / ex) extend(indexes, elapsed_time=..., rgb=...) """
+        start, end = self.size, self.size + len(indexes)
+        self.reserve(end)
+        for name, values in sections.items():
+            self.block[start - self.base_size:end - self.base_size, self.sections[name]] = \
+                np.reshape(values, (len(indexes), -1))
+        self.index.extend(indexes)
+        self.size = end
+
+    def clear(self):
+        self.block[:self.size - self.base_size] = np.nan
+        self.index = []
+        self.size = 0
+        if self.reader is not None:
+            self.reader.close()
+        self.reader = None
+        self.reader_rows = None
+        self.base_elapsed_times = np.empty(0, dtype=np.float32)
+        self.base_size = 0
+
+    def section(self, name: str) -> np.ndarray:  # (size, n), 기록이 없으면 view
+        if not self.base_size:
+            return self.block[:self.size, self.sections[name]]
+        return self.values[:, self.sections[name]]
+
+    def get_elapsed_times(self, rows=slice(None)) -> np.ndarray:
+        """ return (n,) float32, rows: 행 범위 slice """
+        start, stop, _ = rows.indices(self.size)
+        base = self.base_elapsed_times[start:min(stop, self.base_size)]
+        appended = self.block[max(start, self.base_size) - self.base_size:max(stop, self.base_size) - self.base_size, 0]
+        return appended if not len(base) else np.concatenate([base, appended])
+
+    def get_rgbs(self, rows=slice(None), wells=None) -> np.ndarray:
+        """ return (n, k, 3) float32, rows: 행 범위 slice, wells가 None이면 전체 홀
+
+        기록에 있는 행은 memmap에서 해당 행과 홀만 읽고, 추가된 행은 블록에서 가져옴
+        """
+        start, stop, _ = rows.indices(self.size)
+        wells = slice(None) if wells is None else wells
+        appended = self.block[max(start, self.base_size) - self.base_size:max(stop, self.base_size) - self.base_size,
+                              self.sections["rgb"]].reshape(-1, self.num_cells, 3)[:, wells]
+        if start >= self.base_size:
+            return appended
+
+        base_rows = slice(start, min(stop, self.base_size))
+        if self.reader_rows is not None:
+            base_rows = self.reader_rows[base_rows]
+        base = self.reader.get_rgbs(base_rows, wells)
+        return base if not len(appended) else np.concatenate([base, appended])
+
+    def get_locator(self, columns):
+        """ 연속된 열이면 slice(view), 아니면 열 번호 리스트(copy) """
+        locs = [self.column_locs[column] for column in columns]
+        if locs and locs == list(range(locs[0], locs[0] + len(locs))):
+            return slice(locs[0], locs[0] + len(locs))
+        return locs
+
+    def get_values(self, columns=None) -> np.ndarray:
+        if columns is None:
+            return self.values
+        return self.values[:, self.get_locator(columns)]
+
+    def to_dataframe(self, columns=None) -> pd.DataFrame:
+        """ 연속된 열(전체 포함)은 블록을 복사 없이 감싸는 DataFrame """
+        columns = self.columns if columns is None else pd.Index(columns)
+        return pd.DataFrame(self.get_values(columns), index=pd.Index(self.index), columns=columns, copy=False)
+
+    def load_dataframe(self, datas: pd.DataFrame):
+        """ 저장된 DataFrame을 블록으로 옮김, 없는 열은 NaN """
+        values = datas.reindex(columns=self.columns).to_numpy(dtype=np.float32, na_value=np.nan)
+
+        self.clear()
+        self.reserve(len(values))
+        self.block[:len(values)] = values
+        self.index = [str(index) for index in datas.index]
+        self.size = len(values)
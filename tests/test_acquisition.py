@@ -0,0 +1,148 @@
+import threading
+
+import pytest
+
+pytest.importorskip("dotenv")  # util.camera_manager 패키지가 카메라 설정을 불러옴
+
+from util.camera_manager.acquisition import AcquisitionWorker  # noqa: E402
+from util.camera_manager.frame_pool import FramePool  # noqa: E402
+from util.camera_manager.main import CameraUnit  # noqa: E402
+
+SHAPE = (4, 6, 3)
+
+
+class FakeCameraUnit:
+    trigger_mode = False
+    cam = None
+    preview_height = 0
+
+    def __init__(self):
+        self.frame_pool = FramePool(num_slots=3)
+
+
+def publish(pool: FramePool):
+    return pool.publish(pool.acquire_writable(SHAPE))
+
+
+def test_no_preview_until_displayed():
+    worker = AcquisitionWorker(FakeCameraUnit())
+    worker.preview_fps = 0
+    assert worker.should_preview()
+
+    worker.put(publish(worker.camera_unit.frame_pool))
+    assert not worker.should_preview()
+
+    with worker.take():
+        pass
+    worker.mark_displayed()
+    assert worker.should_preview()
+
+
+def test_full_queue_drops_oldest_frame():
+    worker = AcquisitionWorker(FakeCameraUnit())
+    pool = worker.camera_unit.frame_pool
+    first = publish(pool)
+    worker.put(first)
+    second = publish(pool)
+    worker.put(second)
+
+    assert first.ref_count == 0
+    assert worker.dropped_count == 1
+    frame = worker.take()
+    assert frame is second
+    assert worker.take() is None
+    frame.release()
+
+
+def test_full_queue_drops_new_frame_without_drop_oldest():
+    worker = AcquisitionWorker(FakeCameraUnit(), queue_size=2, drop_oldest=False)
+    pool = worker.camera_unit.frame_pool
+    frames = [publish(pool) for _ in range(3)]
+    for frame in frames:
+        worker.put(frame)
+
+    assert worker.dropped_count == 1
+    assert frames[2].ref_count == 1  # 풀의 최신 프레임 참조만 남음
+    taken = [worker.take(), worker.take()]
+    assert taken == frames[:2]
+    assert worker.take() is None
+    for frame in taken:
+        frame.release()
+
+
+def test_clear_releases_waiting_frame():
+    worker = AcquisitionWorker(FakeCameraUnit())
+    frame = publish(worker.camera_unit.frame_pool)
+    worker.put(frame)
+    worker.clear()
+
+    assert worker.take() is None
+    assert not worker.awaiting_display
+    assert frame.ref_count == 1  # 풀의 최신 프레임 참조만 남음
+
+
+def test_cleared_capture_requests_are_answered_with_none():
+    worker = AcquisitionWorker(FakeCameraUnit())
+    answers = []
+    worker.frame_captured.connect(lambda request_id, frame: answers.append((request_id, frame)))
+
+    first = worker.request_capture(3)
+    second = worker.request_capture(3)
+    assert first != second
+
+    worker.clear()
+    assert answers == [(first, None), (second, None)]
+    assert not worker.capture_requests
+
+
+class FakeTriggerCam:
+    def __init__(self, unit):
+        self.unit = unit
+        self.lock_free_during_sync = None
+
+    def Trigger(self, count):
+        pass
+
+    def TriggerSync(self, wait_ms, data, bits, row_pitch, info):
+        # 노출을 기다리는 동안 해상도 변경이나 다른 당겨 오기가 잠금에 막히지 않아야 함
+        self.lock_free_during_sync = self.unit.pull_lock.acquire(blocking=False)
+        if self.lock_free_during_sync:
+            self.unit.pull_lock.release()
+        assert not self.unit.trigger_idle.is_set()
+
+
+class FakeTriggerUnit(FakeCameraUnit):
+    trigger_mode = True
+    trigger_streaming = False
+    frame_shape = SHAPE
+
+    def __init__(self):
+        super().__init__()
+        self.pull_lock = threading.Lock()
+        self.trigger_idle = threading.Event()
+        self.trigger_idle.set()
+        self.cam = FakeTriggerCam(self)
+
+
+def test_trigger_waits_outside_pull_lock():
+    unit = FakeTriggerUnit()
+    frame = CameraUnit.trigger_frame(unit)
+
+    assert unit.cam.lock_free_during_sync
+    assert unit.trigger_idle.is_set()
+    assert unit.frame_pool.latest is frame
+    frame.release()
+
+
+def test_trigger_frame_discarded_when_shape_changes():
+    unit = FakeTriggerUnit()
+    trigger_sync = unit.cam.TriggerSync
+
+    def resize_during_sync(*args):
+        trigger_sync(*args)
+        unit.frame_shape = (2, 3, 3)
+
+    unit.cam.TriggerSync = resize_during_sync
+    assert CameraUnit.trigger_frame(unit) is None
+    assert unit.frame_pool.get_latest() is None
+    assert unit.trigger_idle.is_set()
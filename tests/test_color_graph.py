@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("dotenv")  # ui.common이 API 설정을 불러옴
+pytest.importorskip("openpyxl")  # timeline 패키지가 엑셀 저장을 불러옴
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from ui.tabs.experiment.window.timeline.widgets.color_graph import ColorGraphController, ColorGraphView  # noqa: E402
+
+
+@pytest.fixture
+def view():
+    _app = QApplication.instance() or QApplication([])
+    controller = ColorGraphController()
+    controller.set_colors(2)
+    view: ColorGraphView = controller.view
+    view.resize(400, 300)
+    return view
+
+
+def update(view, rows: int, offset: float):
+    x = np.arange(rows, dtype=np.float64)
+    distances = pd.DataFrame(offset + np.random.default_rng(rows).normal(0, 0.1, (rows, 2)), columns=["A1", "A2"])
+    view.update_graph(x, distances, None)
+
+
+def test_steady_data_keeps_blit_path(view, monkeypatch):
+    update(view, 10, 100.0)
+    view.canvas.draw()  # draw_idle 대신 바로 그려서 배경을 저장
+
+    redraws, blits = [], []
+    monkeypatch.setattr(view.canvas, "draw_idle", lambda: redraws.append(1))
+    monkeypatch.setattr(view, "blit_lines", lambda: blits.append(1))
+    for _ in range(5):
+        update(view, 10, 100.0)
+
+    assert not redraws
+    assert len(blits) == 5
+
+
+def test_limits_follow_data_leaving_range(view):
+    update(view, 10, 100.0)
+    assert view.update_limits(view.ax1, np.arange(10.0), np.full((10, 1), 200.0), True)
+    assert view.ax1.get_ylim()[1] > 200
+    # 0 근처로 크게 줄어든 데이터는 hysteresis를 넘으므로 범위를 줄임
+    assert view.update_limits(view.ax1, np.arange(10.0), np.full((10, 1), 1.0), True)
+    assert view.ax1.get_ylim()[1] < 10
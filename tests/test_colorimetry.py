@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+
+from util import colorimetry
+from util.enums import ColorDistanceMetric
+
+ACCURACY_TOLERANCE = 1e-3  # skimage 대비 허용 ΔE
+
+# Sharma, Wu, Dalal (2005) Table 1: L1, a1, b1, L2, a2, b2, ΔE00
+SHARMA_PAIRS = np.array([
+    [50.0000, 2.6772, -79.7751, 50.0000, 0.0000, -82.7485, 2.0425],
+    [50.0000, 3.1571, -77.2803, 50.0000, 0.0000, -82.7485, 2.8615],
+    [50.0000, 2.8361, -74.0200, 50.0000, 0.0000, -82.7485, 3.4412],
+    [50.0000, -1.3802, -84.2814, 50.0000, 0.0000, -82.7485, 1.0000],
+    [50.0000, -1.1848, -84.8006, 50.0000, 0.0000, -82.7485, 1.0000],
+    [50.0000, -0.9009, -85.5211, 50.0000, 0.0000, -82.7485, 1.0000],
+    [50.0000, 0.0000, 0.0000, 50.0000, -1.0000, 2.0000, 2.3669],
+    [50.0000, -1.0000, 2.0000, 50.0000, 0.0000, 0.0000, 2.3669],
+    [50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0009, 7.1792],
+    [50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0010, 7.1792],
+    [50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0011, 7.2195],
+    [50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0012, 7.2195],
+    [50.0000, -0.0010, 2.4900, 50.0000, 0.0009, -2.4900, 4.8045],
+    [50.0000, -0.0010, 2.4900, 50.0000, 0.0010, -2.4900, 4.8045],
+    [50.0000, -0.0010, 2.4900, 50.0000, 0.0011, -2.4900, 4.7461],
+    [50.0000, 2.5000, 0.0000, 50.0000, 0.0000, -2.5000, 4.3065],
+    [50.0000, 2.5000, 0.0000, 73.0000, 25.0000, -18.0000, 27.1492],
+    [50.0000, 2.5000, 0.0000, 61.0000, -5.0000, 29.0000, 22.8977],
+    [50.0000, 2.5000, 0.0000, 56.0000, -27.0000, -3.0000, 31.9030],
+    [50.0000, 2.5000, 0.0000, 58.0000, 24.0000, 15.0000, 19.4535],
+    [50.0000, 2.5000, 0.0000, 50.0000, 3.1736, 0.5854, 1.0000],
+    [50.0000, 2.5000, 0.0000, 50.0000, 3.2972, 0.0000, 1.0000],
+    [50.0000, 2.5000, 0.0000, 50.0000, 1.8634, 0.5757, 1.0000],
+    [50.0000, 2.5000, 0.0000, 50.0000, 3.2592, 0.3350, 1.0000],
+    [60.2574, -34.0099, 36.2677, 60.4626, -34.1751, 39.4387, 1.2644],
+    [63.0109, -31.0961, -5.8663, 62.8187, -29.7946, -4.0864, 1.2630],
+    [61.2901, 3.7196, -5.3901, 61.4292, 2.2480, -4.9620, 1.8731],
+    [35.0831, -44.1164, 3.7933, 35.0232, -40.0716, 1.5901, 1.8645],
+    [22.7233, 20.0904, -46.6940, 23.0331, 14.9730, -42.5619, 2.0373],
+    [36.4612, 47.8580, 18.3852, 36.2715, 50.5065, 21.2231, 1.4146],
+    [90.8027, -2.0831, 1.4410, 91.1528, -1.6435, 0.0447, 1.4441],
+    [90.9257, -0.5406, -0.9208, 88.6381, -0.8985, -0.7239, 1.5381],
+    [6.7747, -0.2908, -2.4247, 5.8714, -0.0985, -2.2286, 0.6377],
+    [2.0776, 0.0795, -1.1350, 0.9033, -0.0636, -0.5514, 0.9082],
+])
+
+
+@pytest.fixture(scope="module")
+def rgb():
+    rng = np.random.default_rng(0)
+    rgb = rng.uniform(0, 255, (1000, 96, 3))
+    rgb[0, :8] = [[0, 0, 0], [255, 255, 255], [255, 0, 0], [0, 255, 0], [0, 0, 255], [10, 10, 10], [1, 2, 3],
+                  [254.9, 0.1, 128]]
+    return rgb
+
+
+@pytest.fixture(scope="module")
+def lab_pairs(rgb):
+    rng = np.random.default_rng(1)
+    lab1 = colorimetry.rgb_to_lab(rgb)
+    lab2 = colorimetry.rgb_to_lab(np.clip(rgb + rng.normal(0, 20, rgb.shape), 0, 255))
+    return lab1, lab2
+
+
+def test_ciede2000_sharma_pairs():
+    # 표는 소수점 넷째 자리까지
+    expected = SHARMA_PAIRS[:, 6]
+    np.testing.assert_allclose(colorimetry.delta_e_ciede2000(SHARMA_PAIRS[:, :3], SHARMA_PAIRS[:, 3:6]),
+                               expected, atol=1e-4)
+    np.testing.assert_allclose(colorimetry.delta_e_ciede2000(SHARMA_PAIRS[:, 3:6], SHARMA_PAIRS[:, :3]),
+                               expected, atol=1e-4)
+
+
+def test_rgb_to_lab_matches_skimage(rgb):
+    color = pytest.importorskip("skimage.color")
+    errors = np.linalg.norm(colorimetry.rgb_to_lab(rgb) - color.rgb2lab(rgb / 255.0), axis=-1)
+    assert errors.max() < ACCURACY_TOLERANCE
+
+
+def test_uint8_rgb_to_lab_matches_skimage(rgb):
+    color = pytest.importorskip("skimage.color")
+    rgb = rgb.astype(np.uint8)
+    errors = np.linalg.norm(colorimetry.rgb_to_lab(rgb) - color.rgb2lab(rgb / 255.0), axis=-1)
+    assert errors.max() < ACCURACY_TOLERANCE
+
+
+@pytest.mark.filterwarnings("ignore:Conversion from CIE-LAB")  # 범위 밖 색을 일부러 포함
+def test_lab_to_rgb_matches_skimage():
+    color = pytest.importorskip("skimage.color")
+    rng = np.random.default_rng(2)
+    lab = np.stack([rng.uniform(0, 100, 10000), rng.uniform(-128, 128, 10000), rng.uniform(-128, 128, 10000)],
+                   axis=-1)
+
+    # 범위 밖 색은 잘린 rgb 끼리 Lab에서 비교
+    expected_rgb = color.lab2rgb(lab) * 255
+    errors = np.linalg.norm(color.rgb2lab(colorimetry.lab_to_rgb(lab) / 255.0) - color.rgb2lab(expected_rgb / 255.0),
+                            axis=-1)
+    assert errors.max() < ACCURACY_TOLERANCE
+
+
+def test_lab_round_trip(rgb):
+    lab = colorimetry.rgb_to_lab(rgb)
+    errors = np.linalg.norm(colorimetry.rgb_to_lab(colorimetry.lab_to_rgb(lab)) - lab, axis=-1)
+    assert errors.max() < ACCURACY_TOLERANCE
+
+
+def test_linear_lut_matches_exact_curve():
+    np.testing.assert_allclose(colorimetry.LINEAR_LUT_8BIT, colorimetry.linearize_exact(np.arange(256)), atol=1e-7)
+    rgb = np.arange(256, dtype=np.uint8)
+    np.testing.assert_allclose(colorimetry.linearize(rgb), colorimetry.linearize(rgb.astype(np.float32)), atol=1e-6)
+
+
+def test_uint8_lut_round_trip(rgb):
+    # LUT를 거친 변환을 되돌리면 원래 8비트 값으로 돌아와야 함
+    rgb = rgb.astype(np.uint8)
+    round_trip = colorimetry.lab_to_rgb(colorimetry.rgb_to_lab(rgb))
+    assert np.abs(round_trip - rgb).max() < 0.01
+    np.testing.assert_array_equal(np.rint(round_trip).astype(np.uint8), rgb)
+
+
+def test_cie76_matches_skimage(rgb):
+    # ΔE*ab는 Lab 거리이므로 두 변환의 오차가 그대로 드러남
+    color = pytest.importorskip("skimage.color")
+    rgb2 = rgb[::-1]
+    expected = color.deltaE_cie76(color.rgb2lab(rgb / 255.0), color.rgb2lab(rgb2 / 255.0))
+    errors = np.abs(np.linalg.norm(colorimetry.rgb_to_lab(rgb2) - colorimetry.rgb_to_lab(rgb), axis=-1) - expected)
+    assert errors.max() < ACCURACY_TOLERANCE
+
+
+def test_cie94_matches_skimage(lab_pairs):
+    color = pytest.importorskip("skimage.color")
+    lab1, lab2 = lab_pairs
+    errors = np.abs(colorimetry.delta_e_cie94(lab1, lab2) - color.deltaE_ciede94(lab1, lab2))
+    assert errors.max() < ACCURACY_TOLERANCE
+
+
+def test_ciede2000_matches_skimage(lab_pairs):
+    color = pytest.importorskip("skimage.color")
+    lab1, lab2 = lab_pairs
+    errors = np.abs(colorimetry.delta_e_ciede2000(lab1, lab2) - color.deltaE_ciede2000(lab1, lab2))
+    assert errors.max() < ACCURACY_TOLERANCE
+
+
+def test_rgb_distances(rgb):
+    rgb2 = rgb[::-1]
+    np.testing.assert_allclose(colorimetry.rgb_distances(rgb, rgb2), np.linalg.norm(rgb - rgb2, axis=-1),
+                               rtol=1e-5)
+    np.testing.assert_allclose(colorimetry.rgb_distances(rgb, rgb2, ColorDistanceMetric.CIE76),
+                               colorimetry.delta_e_cie76(colorimetry.rgb_to_lab(rgb), colorimetry.rgb_to_lab(rgb2)))
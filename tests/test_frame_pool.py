@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("dotenv")  # util.camera_manager 패키지가 카메라 설정을 불러옴
+
+from util.camera_manager.frame_pool import FramePool  # noqa: E402
+
+SHAPE = (4, 6, 3)
+
+
+def test_held_frame_is_not_overwritten():
+    pool = FramePool(num_slots=2)
+    pool.publish(pool.acquire_writable(SHAPE))
+    held = pool.get_latest()
+
+    for _ in range(5):
+        assert pool.publish(pool.acquire_writable(SHAPE)) is not held
+    held.release()
+
+
+def test_grown_pool_shrinks_back_when_frames_are_released():
+    pool = FramePool(num_slots=2)
+    held = [pool.acquire_writable(SHAPE) for _ in range(5)]
+    assert len(pool.frames) == 5
+
+    for frame in held:
+        frame.release()
+    for _ in range(3):
+        pool.publish(pool.acquire_writable(SHAPE))
+
+    assert len(pool.frames) == 2
+
+
+def test_frames_still_held_are_kept_until_released():
+    pool = FramePool(num_slots=2)
+    held = [pool.acquire_writable(SHAPE) for _ in range(4)]
+    for frame in held[:3]:
+        frame.release()
+
+    pool.publish(pool.acquire_writable(SHAPE))
+    assert held[3] in pool.frames
+    assert len(pool.frames) == 2
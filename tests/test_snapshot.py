@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from models import Image
+from models.snapshot import Snapshot, Timeline
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path))
+    snapshot = Snapshot()
+    snapshot.init_origin_image(Image(np.full((600, 900, 3), 10, dtype=np.uint8)))
+    return snapshot
+
+
+def get_well_mean(snapshot: Snapshot) -> float:
+    colors = np.asarray(snapshot.mean_rgb_colors)
+    return float(colors[colors > 0].mean())
+
+
+def test_change_origin_image_measures_new_image(snapshot):
+    assert get_well_mean(snapshot) == 10
+
+    for value in [50, 90, 130]:
+        snapshot.cropped_array  # 화면이 이전 이미지의 crop을 참조한 상태
+        snapshot.change_origin_image(Image(np.full((600, 900, 3), value, dtype=np.uint8)))
+        assert get_well_mean(snapshot) == value
+
+
+def test_change_origin_image_does_not_read_reused_buffer(snapshot):
+    # 풀 프레임처럼 같은 버퍼에 다음 이미지를 쓰는 경우
+    buffers = [np.full((600, 900, 3), 0, dtype=np.uint8) for _ in range(2)]
+    for step, value in enumerate([50, 90, 130]):
+        buffer = buffers[step % 2]
+        buffer[:] = value
+        snapshot.cropped_array
+        snapshot.change_origin_image(Image(buffer))
+        buffers[(step + 1) % 2][:] = 255  # 이전 이미지 버퍼는 다음 프레임으로 덮어씀
+        assert get_well_mean(snapshot) == value
+
+
+def test_integral_image_backend_matches_disc_path(snapshot):
+    rng = np.random.default_rng(0)
+    snapshot.change_origin_image(Image(rng.integers(0, 200, (600, 900, 3), dtype=np.uint8)))
+    expected = np.asarray(snapshot.mean_rgb_colors)
+
+    snapshot.use_integral_image = True
+    snapshot.release_property_reference()
+    np.testing.assert_allclose(np.asarray(snapshot.mean_rgb_colors), expected, atol=1e-4)
+    counts = snapshot.well_pixel_counts
+    assert counts.shape == expected.shape[:2] and counts.any()
+    assert (snapshot.mean_rgb_variances[counts > 0] > 0).all()
+
+
+def test_lab_correction_is_chunked_without_changing_result(monkeypatch):
+    from models import snapshot as snapshot_module
+    from util import colorimetry
+
+    timeline = Timeline.__new__(Timeline)  # RoundModel 없이 보정 계산만 확인
+    timeline.num_cells = 96
+    rng = np.random.default_rng(0)
+    timeline.lab_correction_factors = np.column_stack([rng.uniform(0.9, 1.1, 96), rng.uniform(-5, 5, (96, 2))])
+    rgbs = rng.uniform(0, 255, (10, 4, 3)).astype(np.float32)
+    wells = [0, 7, 50, 95]
+
+    factors = timeline.lab_correction_factors[::-1][wells]
+    lab_values = colorimetry.rgb_to_lab(rgbs)
+    lab_values[:, :, 0] = np.clip(lab_values[:, :, 0] * factors[:, 0], 0, 100)
+    lab_values[:, :, 1:] = np.clip(lab_values[:, :, 1:] + factors[:, 1:], -128, 128)
+    expected = colorimetry.lab_to_rgb(lab_values)
+
+    monkeypatch.setattr(snapshot_module, "CHUNK_ROWS", 3)
+    np.testing.assert_allclose(timeline.get_lab_corrected_rgbs(rgbs, wells), expected, atol=1e-4)
+
+
+def test_well_distances_reuse_cached_baseline_colors():
+    from models.timeline_store import TimelineStore
+    from util.enums import ColorDistanceMetric
+
+    timeline = Timeline.__new__(Timeline)  # RoundModel 없이 색 차이 캐시만 확인
+    timeline.store = TimelineStore()
+    timeline.distance_metric = ColorDistanceMetric.EUCLIDEAN
+    timeline._well_distances, timeline._well_pyramids = {}, {}
+    rng = np.random.default_rng(0)
+    timeline.store.extend([f"{i}" for i in range(4)], elapsed_time=np.arange(4), rgb=rng.uniform(0, 255, (4, 288)))
+    wells = [0, 5, 95]
+    timeline.get_well_distances(wells)
+
+    requested_rows = []
+    get_well_rgbs = timeline.get_well_rgbs
+    timeline.get_well_rgbs = lambda wells, corrected=False, rows=slice(None): (
+        requested_rows.append(rows) or get_well_rgbs(wells, corrected, rows))
+    timeline.store.extend(["4", "5"], elapsed_time=np.arange(4, 6), rgb=rng.uniform(0, 255, (2, 288)))
+    distances, _ = timeline.get_well_distances(wells)
+
+    assert requested_rows == [slice(4, 6)]  # 첫 행은 다시 읽지 않음
+    rgbs = timeline.store.get_rgbs(wells=wells)
+    np.testing.assert_allclose(distances[1:], np.linalg.norm(rgbs - rgbs[0], axis=2)[1:], atol=1e-3)
+
+    timeline.reset_distance_cache()
+    assert not timeline._well_distances
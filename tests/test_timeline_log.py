@@ -0,0 +1,89 @@
+import numpy as np
+
+from models.timeline_store import TimelineStore
+from util.local_storage_manager import TimeLineLoadWorker, TimelineDataManager
+from util.timeline_log import HEADER_SIZE, TimelineLogReader, get_log_file_name
+
+
+def append_rows(mc_file_name, indexes, rgb_value, new_timeline):
+    rgbs = np.full((len(indexes), 96 * 3), rgb_value, dtype=np.float32)
+    elapsed_times = np.arange(len(indexes), dtype=np.float32)
+    TimelineDataManager().append_timeline(indexes, elapsed_times, rgbs, mc_file_name, new_timeline=new_timeline)
+
+
+def read_rgbs(mc_file_name):
+    reader = TimelineLogReader(get_log_file_name(mc_file_name))
+    rgbs = reader.get_rgbs()
+    reader.close()
+    return rgbs
+
+
+def test_new_timeline_does_not_append_to_old_log(tmp_path):
+    mc_file_name = str(tmp_path / "target.mcgz")
+    append_rows(mc_file_name, ["261018-120000.0", "261018-120001.0"], 10, new_timeline=True)
+    append_rows(mc_file_name, ["261018-130000.0"], 20, new_timeline=True)
+
+    rgbs = read_rgbs(mc_file_name)
+    assert rgbs.shape == (1, 96, 3)
+    assert np.all(rgbs == 20)
+    assert (tmp_path / "target.mclog.old").exists()
+
+
+def test_resumed_timeline_appends(tmp_path):
+    mc_file_name = str(tmp_path / "target.mcgz")
+    append_rows(mc_file_name, ["261018-120000.0", "261018-120001.0"], 10, new_timeline=True)
+    append_rows(mc_file_name, ["261018-120002.0"], 30, new_timeline=False)
+
+    rgbs = read_rgbs(mc_file_name)
+    assert len(rgbs) == 3
+    assert np.all(rgbs[:2] == 10) and np.all(rgbs[2] == 30)
+
+
+class FakeTimeline:
+    num_cells = 96
+
+
+def write_log(mc_file_name, count):
+    indexes = [f"261018-12{minute:02d}00.0" for minute in range(count)]
+    rgbs = np.random.default_rng(0).uniform(0, 255, (count, 96 * 3)).astype(np.float32)
+    TimelineDataManager().append_timeline(indexes, np.arange(count, dtype=np.float32), rgbs, mc_file_name,
+                                          new_timeline=True)
+    return indexes, rgbs.reshape(count, 96, 3)
+
+
+def load_store(mc_file_name) -> TimelineStore:
+    reader = TimelineDataManager().open_timeline_reader(mc_file_name)
+    return TimeLineLoadWorker(FakeTimeline(), None, {}, reader).calculate_timeline_datas()
+
+
+def test_loaded_store_reads_selected_wells_from_log(tmp_path):
+    mc_file_name = str(tmp_path / "target.mcgz")
+    indexes, rgbs = write_log(mc_file_name, 10)
+
+    store = load_store(mc_file_name)
+    assert store.base_size == 10 and not len(store.appended)  # 기록은 블록에 올리지 않음
+    assert store.index == indexes
+    np.testing.assert_array_equal(store.get_rgbs(slice(2, 7), [0, 5, 95]), rgbs[2:7][:, [0, 5, 95]])
+    np.testing.assert_array_equal(store.get_elapsed_times(), np.arange(10))
+
+    row = np.full(len(store.columns), 7, dtype=np.float32)
+    store.append(row, "261018-130000.0")
+    well_rgbs = store.get_rgbs(slice(8, None), [1])
+    np.testing.assert_array_equal(well_rgbs[:2], rgbs[8:][:, [1]])
+    np.testing.assert_array_equal(well_rgbs[2], [[7, 7, 7]])
+    assert store.values.shape == (11, 289)
+    store.clear()
+
+
+def test_loaded_store_skips_corrupted_records(tmp_path):
+    mc_file_name = str(tmp_path / "target.mcgz")
+    indexes, rgbs = write_log(mc_file_name, 5)
+    record_size = TimelineLogReader(get_log_file_name(mc_file_name)).timeline_log.record_size
+    with open(get_log_file_name(mc_file_name), "r+b") as f:
+        f.seek(HEADER_SIZE + record_size * 2 + 20)  # 세 번째 레코드의 rgb
+        f.write(b"\xff\xff")
+
+    store = load_store(mc_file_name)
+    assert store.index == indexes[:2] + indexes[3:]
+    np.testing.assert_array_equal(store.get_rgbs(wells=[0]), rgbs[[0, 1, 3, 4]][:, [0]])
+    store.clear()
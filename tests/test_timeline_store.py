@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from models.timeline_store import LodPyramid, TimelineStore, get_timeline_columns
+
+
+def test_store_keeps_elapsed_time_and_rgb_columns():
+    store = TimelineStore()
+    assert list(store.columns) == get_timeline_columns()
+    assert len(store.columns) == 1 + 96 * 3
+
+
+def test_load_dataframe_drops_derived_columns():
+    columns = get_timeline_columns() + [f"ColorDistance{idx + 1}" for idx in range(96)]
+    values = np.arange(3 * len(columns), dtype=np.float32).reshape(3, len(columns))
+    datas = pd.DataFrame(values, columns=columns, index=["a", "b", "c"])
+
+    store = TimelineStore(capacity=1)
+    store.load_dataframe(datas)
+
+    assert store.to_dataframe().shape == (3, 289)
+    np.testing.assert_array_equal(store.values, values[:, :289])
+    assert store.index == ["a", "b", "c"]
+
+
+def test_append_grows_capacity():
+    store = TimelineStore(capacity=1)
+    for row in range(5):
+        store.append(np.full(len(store.columns), row, dtype=np.float32), str(row))
+
+    assert len(store) == 5 and store.capacity >= 5
+    np.testing.assert_array_equal(store.section("elapsed_time")[:, 0], np.arange(5))
+
+
+def brute_force_points(values: np.ndarray, times: np.ndarray, level: int):
+    """ 2^level 행 버킷마다 홀 별 min, max를 행 순서대로 놓은 (2 * buckets, k) 시간, 값 """
+    bucket_size = 2 ** level
+    num_buckets = -(-len(values) // bucket_size)
+    point_times = np.full((num_buckets * 2, values.shape[1]), np.nan)
+    point_values = np.full((num_buckets * 2, values.shape[1]), np.nan, dtype=values.dtype)
+    for bucket in range(num_buckets):
+        start = bucket * bucket_size
+        for well in range(values.shape[1]):
+            column = values[start:start + bucket_size, well]
+            if np.isnan(column).all():
+                continue
+            rows = sorted([start + np.nanargmin(column), start + np.nanargmax(column)])
+            point_times[bucket * 2:bucket * 2 + 2, well] = times[rows]
+            point_values[bucket * 2:bucket * 2 + 2, well] = values[rows, well]
+    return point_times, point_values
+
+
+def test_lod_points_match_brute_force_decimation():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(1000, 3)).astype(np.float32)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[64:128, 1] = np.nan  # 값이 모두 NaN인 버킷
+    times = np.cumsum(rng.uniform(0.5, 1.5, len(values)))
+
+    pyramid = LodPyramid()
+    # append처럼 조금씩 늘려도 한 번에 계산한 것과 같아야 함
+    for size in [1, 2, 3, 17, 64, 65, 500, 1000]:
+        pyramid.update(values[:size])
+    assert pyramid.size == len(values)
+
+    for level in range(1, len(pyramid.levels) + 1):
+        point_times, point_values = pyramid.get_points(level, times)
+        expected_times, expected_values = brute_force_points(values, times, level)
+        np.testing.assert_array_equal(point_times, expected_times)
+        np.testing.assert_array_equal(point_values, expected_values)
+
+
+def test_lod_points_are_in_time_order():
+    values = np.array([[5], [1], [3], [0], [9], [2], [4], [8]], dtype=np.float32)
+    pyramid = LodPyramid()
+    pyramid.update(values)
+
+    point_times, point_values = pyramid.get_points(2, np.arange(len(values), dtype=np.float64))
+    # 두 버킷 모두 max가 min보다 앞선 행: (0, 5) -> (3, 0), (4, 9) -> (5, 2)
+    np.testing.assert_array_equal(point_times[:, 0], [0, 3, 4, 5])
+    np.testing.assert_array_equal(point_values[:, 0], [5, 0, 9, 2])
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from util import well_statistics as ws
+
+SHAPE = (300, 420)
+ROWS = [40 + 30 * i for i in range(8)]
+COLUMNS = [40 + 30 * i for i in range(12)]
+
+
+@pytest.fixture
+def image():
+    rng = np.random.default_rng(0)
+    # crop과 같이 연속되지 않은 view
+    return rng.integers(0, 256, (SHAPE[0] + 10, SHAPE[1] + 10, 3), dtype=np.uint8)[5:-5, 5:-5]
+
+
+@pytest.fixture
+def masked():
+    return np.random.default_rng(1).random(SHAPE) < 0.1
+
+
+@pytest.mark.parametrize("radius", [5, 12])
+def test_bincount_matches_per_well_sums(image, masked, radius):
+    geometry = ws.WellGeometry(SHAPE, ROWS, COLUMNS, radius)
+    sums, counts = ws.bincount_well_sums(image, geometry, masked)
+    expected_sums, expected_counts = ws.calculate_well_sums(image, geometry, masked, range(geometry.num_wells))
+
+    np.testing.assert_array_equal(counts, expected_counts)
+    np.testing.assert_allclose(sums, expected_sums)
+
+
+def test_bincount_is_used_only_for_small_wells():
+    assert ws.WellGeometry(SHAPE, ROWS, COLUMNS, 5).use_bincount
+    assert not ws.WellGeometry(SHAPE, ROWS, COLUMNS, 12).use_bincount
+
+
+def test_integral_image_matches_well_sums(image, masked):
+    geometry = ws.WellGeometry(SHAPE, ROWS, COLUMNS, 12)
+    integral_image = ws.WellIntegralImage(image, masked, max_area=SHAPE[1])
+    means, variances, counts = integral_image.well_statistics(geometry)
+
+    sums, expected_counts = ws.calculate_well_sums(image, geometry, masked)
+    np.testing.assert_array_equal(counts.ravel(), expected_counts)
+    np.testing.assert_allclose(means, ws.sums_to_means(sums, expected_counts, geometry), atol=1e-4)
+
+    for index in [0, 37, geometry.num_wells - 1]:
+        rows, cols = geometry.box_slice(index)
+        valid = geometry.discs[index] & ~masked[rows, cols]
+        pixels = image[rows, cols][valid].astype(np.float64)
+        np.testing.assert_allclose(variances.reshape(-1, 3)[index], pixels.var(axis=0), rtol=1e-4)
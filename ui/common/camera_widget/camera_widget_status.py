@@ -1,8 +1,8 @@
 import numpy as np
 from PySide6.QtCore import QObject, Signal
-from skimage import color
 
 from models.snapshot import Snapshot
+from util import colorimetry
 from util.enums import LabCorrectionType
 
 
@@ -71,10 +71,8 @@ class CameraWidgetStatus(QObject):
         for i, value in enumerate(temp):
             self.lab_correction_reference_rgb[i] = value if value is not None else self.lab_correction_reference_rgb[i]
 
-        rgb_normalized = np.array(self.lab_correction_reference_rgb) / 255.0
-        rgb_normalized = rgb_normalized.reshape((1, 1, 3))
-        lab = color.rgb2lab(rgb_normalized)
-        self.lab_correction_reference_lab = lab[0, 0, :]
+        lab = colorimetry.rgb_to_lab(np.array(self.lab_correction_reference_rgb, dtype=np.float32))
+        self.lab_correction_reference_lab = lab.tolist()
 
         self.lab_reference_rgb_changed.emit(*self.lab_correction_reference_rgb)
         self.lab_reference_lab_changed.emit(*self.lab_correction_reference_lab)
@@ -84,11 +82,9 @@ class CameraWidgetStatus(QObject):
         for i, value in enumerate(temp):
             self.lab_correction_reference_lab[i] = value if value is not None else self.lab_correction_reference_lab[i]
 
-        lab = np.array(self.lab_correction_reference_lab).reshape((1, 1, 3))
-        normalized_rgb = color.lab2rgb(lab)
-        rgb = (normalized_rgb * 255)  # .astype(np.uint8)
+        rgb = colorimetry.lab_to_rgb(np.array(self.lab_correction_reference_lab))  # .astype(np.uint8)
 
-        self.lab_correction_reference_rgb = rgb[0][0]
+        self.lab_correction_reference_rgb = rgb.tolist()
         self.lab_reference_rgb_changed.emit(*self.lab_correction_reference_rgb)
         self.lab_reference_lab_changed.emit(*self.lab_correction_reference_lab)
 
@@ -1,16 +1,17 @@
 import logging
 import math
+from datetime import datetime
 
 import numpy as np
 from PySide6.QtCore import Signal, QRect, Qt
-from PySide6.QtGui import QPixmap, QFont, QPainter, QPen, QMouseEvent
+from PySide6.QtGui import QFont, QImage, QPainter, QPen, QMouseEvent
 from PySide6.QtWidgets import QLabel, QSizePolicy
 
 from models import Image
 from models.snapshot import Snapshot
 from ui.common.camera_widget.camera_widget_status import CameraWidgetStatus
 from util import image_converter as ic
-from util.camera_manager import CameraUnit, toupcam
+from util.camera_manager import CameraUnit, Frame, make_preview, toupcam
 from util.enums import LabCorrectionType
 
 
@@ -26,7 +27,12 @@ class LabelCamera(QLabel):
         self.initialized = False
         self.snapshot_initialized = False
 
-        self.image = None
+        self.image = None  # 원본 해상도, 캡처에만 사용
+        self.frame: Frame = None  # 화면에 표시 중인 프레임, 다음 프레임이 올 때 release
+        self.preview = None  # 라벨 높이로 줄인 표시용 이미지
+        self.preview_scale = 1.0
+        self.overlay: QImage = None  # 플레이트, 홀, 화이트 밸런스 영역을 미리 그린 투명 레이어
+        self.overlay_key = None
         self.sensor_indexes = []
         self.sensor_colors = []
         self.wb_x, self.wb_y, self.wb_width, self.wb_height = None, None, None, None
@@ -35,7 +41,7 @@ class LabelCamera(QLabel):
         self.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Expanding)
 
         self.camera_unit.evtCallback.connect(self.on_event_callback)
-        self.camera_unit.signal_image.connect(self.update_image)
+        self.camera_unit.signal_frame.connect(self.update_frame)
 
     def calculate_sensor_positions(self):
         sensor_positions = []
@@ -92,16 +98,47 @@ class LabelCamera(QLabel):
 
         return self.width()
 
-    def update_image(self, image: np.ndarray = None):
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # 수집 스레드가 라벨 높이에 맞춰 preview를 줄이도록 알림
+        if self.isVisible():
+            self.camera_unit.set_preview_height(self, self.height())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.camera_unit.set_preview_height(self, self.height())
+        self.refresh_paint()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        # 보이는 라벨이 없으면 CameraUnit이 센서 프레임 수를 줄임
+        self.camera_unit.set_preview_height(self, 0)
+
+    def update_frame(self, frame: Frame):
+        previous, self.frame = self.frame, frame.acquire()
+        if self.isVisible() or not self.snapshot_initialized:
+            self.update_image(frame.array, frame.preview, frame.preview_scale)
+        else:
+            # 숨겨진 탭은 그리지 않고 캡처용 프레임만 바꿔 둠
+            self.image, self.preview, self.preview_scale = frame.array, frame.preview, frame.preview_scale
+        if previous is not None:
+            previous.release()
+
+    def update_image(self, image: np.ndarray = None, preview: np.ndarray = None, preview_scale: float = 1.0):
         if image is not None:
             self.image = image
-            pixmap = ic.array_to_q_pixmap(image, True)
+            if preview is None:
+                preview, preview_scale = make_preview(image, self.height())
+            self.preview, self.preview_scale = preview, preview_scale
 
-            self.paint_wb_roi(pixmap)
-            self.paint_plate_border(pixmap)
-            self.paint_whole_halls(pixmap)
+            pixmap = ic.array_to_q_pixmap(preview)
+            painter = QPainter(pixmap)
+            painter.drawImage(0, 0, self.get_overlay(pixmap.width(), pixmap.height()))
+            painter.end()
 
-            self.setPixmap(pixmap.scaled(self.size(), Qt.KeepAspectRatio))
+            if pixmap.size() != self.size():
+                pixmap = pixmap.scaled(self.size(), Qt.KeepAspectRatio)
+            self.setPixmap(pixmap)
 
             if not self.initialized:
                 self.adjust_size()
@@ -109,15 +146,49 @@ class LabelCamera(QLabel):
 
             if not self.snapshot_initialized:
                 snapshot: Snapshot = self.status.snapshot_instance
-                snapshot.init_origin_image(Image(image))
+                snapshot.init_origin_image(self.hold_image())
                 snapshot.mask.set_flare_threshold(255)
                 self.snapshot_initialized = True
                 self.snapshot_initialized_signal.emit()
 
     def refresh_paint(self):
-        self.update_image(self.image)
+        if self.image is not None and self.preview is not None:
+            self.update_image(self.image, self.preview, self.preview_scale)
+        else:
+            self.update_image(self.image)
+
+    def get_overlay_key(self, width: int, height: int) -> tuple:
+        """ 오버레이 모양을 결정하는 값, 하나라도 바뀌면 레이어를 다시 그림 """
+        status = self.status
+        snapshot = status.snapshot_instance
+        plate = snapshot.plate_position
+        return (width, height, self.preview_scale,
+                plate.get_plate_size(), plate.direction, snapshot.mask.radius,
+                status.plate_border_visible, status.lab_roi_visible, status.wb_roi_visible, status.setting_visible,
+                status.lab_correction_reference_hole_index, status.lab_correction_type,
+                (self.wb_x, self.wb_y, self.wb_width, self.wb_height), tuple(self.sensor_indexes))
+
+    def get_overlay(self, width: int, height: int) -> QImage:
+        key = self.get_overlay_key(width, height)
+        if self.overlay is None or key != self.overlay_key:
+            self.overlay = self.render_overlay(width, height)
+            self.overlay_key = key
+        return self.overlay
+
+    def render_overlay(self, width: int, height: int) -> QImage:
+        overlay = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        overlay.fill(Qt.transparent)
+
+        painter = QPainter(overlay)
+        # 오버레이는 원본 좌표로 그리고, 줄인 이미지 좌표로는 painter가 변환
+        painter.scale(self.preview_scale, self.preview_scale)
+        self.paint_wb_roi(painter)
+        self.paint_plate_border(painter)
+        self.paint_whole_halls(painter)
+        painter.end()
+        return overlay
 
-    def paint_wb_roi(self, pixmap: QPixmap):
+    def paint_wb_roi(self, painter: QPainter):
         if self.wb_x is None or not self.status.wb_roi_visible or not self.status.setting_visible:
             return
 
@@ -127,60 +198,63 @@ class LabelCamera(QLabel):
         font = QFont("Malgun Gothic", 22, QFont.Bold)
         # font.setBold(True)
 
-        painter = QPainter(pixmap)
         painter.setPen(QPen(Qt.red, 5))
         painter.setFont(font)
 
         painter.drawRect(rect)
         painter.drawText(text_rect, Qt.AlignLeft, text)
-        painter.end()
 
-    def paint_plate_border(self, pixmap: QPixmap):
+    def paint_plate_border(self, painter: QPainter):
         if self.status.plate_border_visible and not self.status.lab_roi_visible:
             snapshot = self.status.snapshot_instance
-            painter = QPainter(pixmap)
             painter.setPen(QPen(Qt.red, 5))
             self.draw_plate(painter, snapshot)
-            painter.end()
 
-    def paint_whole_halls(self, pixmap: QPixmap):
+    def paint_whole_halls(self, painter: QPainter):
         if self.status.lab_roi_visible:
             snapshot = self.status.snapshot_instance
-            painter = QPainter(pixmap)
             self.draw_plate(painter, snapshot, highlight=True)
-            painter.end()
 
     def draw_plate(self, painter, snapshot, highlight=False):
         x, y, width, height = snapshot.plate_position.get_crop_area()
         painter.setPen(QPen(Qt.gray, 5))
         painter.drawRect(x, y, width, height)
-        for idx in range(96):
+        sensor_positions = self.calculate_sensor_positions()
+        for idx, (sensor_x, sensor_y) in enumerate(sensor_positions):
             if highlight and idx == self.status.lab_correction_reference_hole_index and self.status.lab_correction_type == LabCorrectionType.SINGLE_HALL_ROI:
                 pen_color = Qt.green
             else:
                 pen_color = Qt.gray
             # pen_color = Qt.green if highlight and idx == self.status.lab_standard_hole_index else Qt.gray
             painter.setPen(QPen(pen_color, 5))
-            solvent_idx, additive_idx = divmod(idx, 8)
-            sensor_x, sensor_y = self.get_sensor_position(snapshot, solvent_idx, additive_idx)
             painter.drawEllipse(sensor_x - snapshot.mask.radius, sensor_y - snapshot.mask.radius,
                                 snapshot.mask.radius * 2, snapshot.mask.radius * 2)
 
-    def get_sensor_position(self, snapshot, solvent_idx, additive_idx):
-        x, y = snapshot.plate_position.get_crop_area()[:2]
-        row_axes, column_axes = snapshot.plate_position.rows, snapshot.plate_position.columns
-        if snapshot.plate_position.direction == 0:
-            return x + column_axes[solvent_idx], y + row_axes[additive_idx]
-        return x + column_axes[additive_idx], y + row_axes[abs(solvent_idx - 11)]
-
     def update_wb_roi(self, x, y, width, height):
         self.wb_x, self.wb_y, self.wb_width, self.wb_height = x, y, width, height
         self.refresh_paint()
 
-    def take_snapshot(self) -> Snapshot:
+    def hold_image(self) -> Image:
+        """ 표시 중인 프레임을 복사 없이 Image로 감쌈, Image가 사라질 때까지 풀이 그 프레임을 덮어쓰지 않음 """
+        image = Image(self.image)
+        if self.frame is not None and self.frame.array is self.image:
+            self.frame.hold(image)
+        return image
+
+    def take_snapshot(self, frame: Frame = None) -> Snapshot:
+        """ frame: 트리거로 찍은 프레임, None이면 표시 중인 프레임 """
+        if frame is not None:
+            snapshot: Snapshot = self.status.snapshot_instance
+            image = Image(frame.array)
+            frame.hold(image)
+            snapshot.change_origin_image(image)
+            # 캡처 시각은 트리거로 찍은 시각
+            snapshot.snapshot_time = datetime.fromtimestamp(frame.timestamp)
+            return snapshot
+
         if self.image is not None:
             snapshot: Snapshot = self.status.snapshot_instance
-            snapshot.change_origin_image(Image(self.image))
+            snapshot.change_origin_image(self.hold_image())
             return snapshot
 
     def set_sensor_indexes(self, indexes: list, colors: list):
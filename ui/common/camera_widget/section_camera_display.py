@@ -177,9 +177,9 @@ class SectionCameraDisplay(QWidget):
             manager_view.view_radio.set_visibility(2, False)
             mask_manager.view.exec()
 
-    def take_snapshot(self) -> Snapshot:
+    def take_snapshot(self, frame=None) -> Snapshot:
         lb_camera: LabelCamera = self.lb_camera
-        return lb_camera.take_snapshot()
+        return lb_camera.take_snapshot(frame)
 
     def set_sensor_indexes(self, indexes: list, colors: list):
         lb_camera: LabelCamera = self.lb_camera
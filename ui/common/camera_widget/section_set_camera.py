@@ -1,7 +1,7 @@
 import os
 
 import numpy as np
-from PySide6.QtCore import Qt, QSignalBlocker, Signal
+from PySide6.QtCore import Qt, QSignalBlocker, QTimer, Signal
 from PySide6.QtWidgets import QScrollArea, QHBoxLayout, QVBoxLayout, QComboBox, QCheckBox, QLabel, QSlider, \
     QPushButton, QWidget, QSizePolicy, QLayout, QButtonGroup, QRadioButton, QLineEdit
 
@@ -9,6 +9,7 @@ from ui.common import ImageButton
 from ui.common.camera_widget.camera_widget_status import CameraWidgetStatus
 from util import local_storage_manager as lsm
 from util.camera_manager import CameraUnit, toupcam
+from util.camera_manager.acquisition import PREVIEW_FPS
 from util.setting_manager import SettingManager
 
 
@@ -141,7 +142,7 @@ class SectionSetCamera(QScrollArea):
         camera_unit: CameraUnit = self.camera_unit
         time_min, time_max = camera_unit.get_expo_time_range()
         self.exponential_function = ExponentialFunction(0, time_min, 100, time_max)
-        self.camera_started = camera_unit.pData is not None
+        self.camera_started = camera_unit.frame_pool is not None
         self.view_initialized = False
         self.status = status
 
@@ -168,6 +169,23 @@ class SectionSetCamera(QScrollArea):
         self.cmb_res.currentIndexChanged.connect(lambda index: self.camera_unit.set_resolution(index))
         self.cmb_res.currentIndexChanged.connect(lambda index: self.setting_manager.set_camera_resolution_index(index))
 
+        """ 미리보기 """
+        self.lb_preview_fps = QLabel(str(PREVIEW_FPS))
+        self.slider_preview_fps = QSlider(Qt.Horizontal)
+        self.slider_preview_fps.setRange(1, 30)
+        self.slider_preview_fps.setValue(PREVIEW_FPS)
+        self.slider_preview_fps.setEnabled(self.camera_started)
+        self.slider_preview_fps.valueChanged.connect(self.on_preview_fps_changed)
+        self.lb_frame_stats = QLabel()
+        lyt_preview = QVBoxLayout()
+        lyt_preview.addLayout(get_slider_layout(QLabel("최대 FPS:"), self.lb_preview_fps, self.slider_preview_fps))
+        lyt_preview.addWidget(self.lb_frame_stats)
+        gbox_preview = GroupBox("미리보기")
+        gbox_preview.set_content(lyt_preview)
+        self.timer_frame_stats = QTimer(self)
+        self.timer_frame_stats.setInterval(1000)
+        self.timer_frame_stats.timeout.connect(self.update_frame_stats)
+
         """ 노출 및 게인"""
         self.cb_auto_expo = QCheckBox("자동 노출")
         self.cb_auto_expo.setEnabled(self.camera_started)
@@ -399,6 +417,7 @@ class SectionSetCamera(QScrollArea):
         lyt_content.setContentsMargins(2, 2, 2, 2)
         lyt_content.addWidget(gbox_ffc)
         lyt_content.addWidget(gbox_res)
+        lyt_content.addWidget(gbox_preview)
         lyt_content.addWidget(gbox_expo)
         lyt_content.addWidget(self.gbox_wb)
         lyt_content.addWidget(gbox_bb)
@@ -428,6 +447,13 @@ class SectionSetCamera(QScrollArea):
                 self.cmb_res.setCurrentIndex(res_index)
                 camera_unit.set_resolution(res_index)
 
+            """ 미리보기 """
+            preview_fps = self.setting_manager.get_camera_preview_fps()
+            if preview_fps is not None:
+                self.slider_preview_fps.setValue(int(preview_fps))
+                self.on_preview_fps_changed(int(preview_fps))
+            self.update_frame_stats()
+
             """ 노출 및 게인"""
             auto_expo = self.setting_manager.get_camera_auto_expo()
             if auto_expo is not None:
@@ -564,6 +590,31 @@ class SectionSetCamera(QScrollArea):
                 self.cmb_res.setCurrentIndex(camera_unit.res)
         self.cmb_res.setEnabled(True)
 
+    """ 미리보기 """
+
+    def on_preview_fps_changed(self, value):
+        self.camera_unit.set_preview_fps(value)
+        self.setting_manager.set_camera_preview_fps(value)
+        self.lb_preview_fps.setText(str(value))
+
+    def update_frame_stats(self):
+        stats = self.camera_unit.acquisition_stats
+        self.lb_frame_stats.setText(
+            f"받은 프레임: {stats['delivered']}\n"
+            f"표시한 프레임: {stats['displayed']}\n"
+            f"버린 프레임: {stats['dropped']}\n"
+            f"SDK 드롭 프레임: {stats['sdk_dropped']}"
+        )
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_frame_stats()
+        self.timer_frame_stats.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer_frame_stats.stop()
+
     """ 노출 및 게인"""
 
     def on_auto_expo_changed(self, state):
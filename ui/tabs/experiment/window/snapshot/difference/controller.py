@@ -4,6 +4,7 @@ from ui.common.toast import Toast
 from ui.tabs.experiment.window.snapshot.difference import ColorDifferenceModel, ColorDifferenceView
 from ui.tabs.experiment.window.snapshot.difference.difference_table import ColorDifferenceTableView
 from ui.tabs.experiment.window.snapshot.difference.excel_manager import ExcelManager
+from util import colorimetry
 
 
 class ColorDifferenceController(BaseController):
@@ -20,6 +21,7 @@ class ColorDifferenceController(BaseController):
 
         view.cmb_control.currentIndexChanged.connect(lambda index: self.on_cmb_control_changed(index))
         view.cmb_target.currentIndexChanged.connect(lambda index: self.on_cmb_target_changed(index))
+        view.cmb_metric.currentIndexChanged.connect(lambda index: self.on_cmb_metric_changed(index))
         view.radio.selected.connect(lambda index: self.on_radio_select_changed(index))
         view.btn_to_excel.clicked.connect(self.to_excel)
 
@@ -34,6 +36,10 @@ class ColorDifferenceController(BaseController):
         self.model.target_index = index
         self.update_table_color_datas()
 
+    def on_cmb_metric_changed(self, index):
+        self.model.distance_metric = list(colorimetry.DISTANCE_METRIC_NAMES)[index]
+        self.update_table_color_datas()
+
     def on_radio_select_changed(self, index):
         self.model.color_index = index
         self.update_table_color_datas()
@@ -65,7 +71,7 @@ class ColorDifferenceController(BaseController):
 
     def add_new_snapshot(self, snapshot: Snapshot):
         model: ColorDifferenceModel = self.model
-        model.snapshots.append(snapshot)
+        model.add_snapshot(snapshot)  # processed 시 색 캐시 해제가 표 갱신보다 먼저 연결됨
 
         self.set_cmb_items()
         snapshot.target_changed.connect(self.set_cmb_items)
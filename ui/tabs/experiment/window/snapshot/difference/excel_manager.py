@@ -6,7 +6,8 @@ from PySide6.QtCore import QThread, Signal
 from openpyxl.workbook import Workbook
 
 from ui.tabs.experiment.window.snapshot.difference import ColorDifferenceModel
-from util import local_storage_manager as lsm
+from util import colorimetry, local_storage_manager as lsm
+from util.enums import ColorDistanceMetric
 
 
 class ExcelManager:
@@ -33,11 +34,17 @@ class ExcelManager:
         self._save_rgb_colors(wb, target_index)
         self._save_color_differences(wb, target_index, "xyy")
         self._save_color_differences(wb, target_index, "lab")
+        if self.model.distance_metric != ColorDistanceMetric.EUCLIDEAN:
+            self._save_delta_e(wb, target_index)
         wb.remove(wb["Sheet"])
         wb.save(self.get_path_to_save(target_index))
 
     def _save_rgb_colors(self, wb, target_index):
-        target_rgb_colors, control_rgb_colors, rgb_differences = self.model.get_color_datas("rgb", target_index)
+        model: ColorDifferenceModel = self.model
+        # get_color_datas는 ΔE 공식을 고르면 ΔE를 주므로, RGB 차이 시트는 항상 RGB 유클리드 거리로 씀
+        target_rgb_colors = model.get_rgb_colors(target_index)
+        control_rgb_colors = model.get_rgb_colors(self.control_index)
+        rgb_differences = model.get_color_differences(target_rgb_colors, control_rgb_colors)
         target_name = self.targets.item_name(target_index)
         control_name = self.control_name
 
@@ -98,6 +105,21 @@ class ExcelManager:
             sheet.cell(i + 2, 1, cell_name)
             sheet.cell(i + 2, 2, color_difference)
 
+    def _save_delta_e(self, wb, target_index):
+        model: ColorDifferenceModel = self.model
+        sheet_name = f"{colorimetry.DISTANCE_METRIC_NAMES[model.distance_metric]} difference"
+        delta_e = model.get_delta_e(target_index, self.control_index)
+
+        sheet = wb.create_sheet(sheet_name)
+        sheet.cell(1, 1, "Cell Info")
+        sheet.cell(1, 2, sheet_name)
+
+        for i, color_difference in enumerate(delta_e):
+            solvent_i, additive_i = divmod(i, 8)
+            cell_name = f"{chr(ord('A') + additive_i)}-{solvent_i + 1}"
+            sheet.cell(i + 2, 1, cell_name)
+            sheet.cell(i + 2, 2, float(color_difference))
+
 
 class TimelineExcelWorker(QThread):
     finished = Signal(object, bool)
@@ -1,9 +1,9 @@
 import numpy as np
-from colormath.color_conversions import convert_color
-from colormath.color_objects import sRGBColor, xyYColor, LabColor
 
 from models import Targets
 from models.snapshot import Snapshot
+from util import colorimetry
+from util.enums import ColorDistanceMetric
 
 
 class ColorDifferenceModel:
@@ -14,12 +14,16 @@ class ColorDifferenceModel:
         self.control_index = 0
         self.color_types = ["rgb", "xyy", "lab"]
         self.color_index = 0
+        self.distance_metric = ColorDistanceMetric.EUCLIDEAN  # EUCLIDEAN은 선택한 색 공간의 거리, 그 외는 Lab ΔE
 
         self.base_headers = ["Target", "Target", "Target", "Control", "Control", "Control", "Color"]
         self.rgb_headers = ["R", "G", "B", "R", "G", "B", "Distance"]
         self.xyy_headers = ["x", "y", "Y", "x", "y", "Y", "Distance"]
         self.lab_headers = ["L", "a", "b", "L", "a", "b", "Distance"]
 
+        # (snapshot, color_type): (96, 3) 셀 순서 색 배열, 스냅샷의 processed, colors_changed 시그널에서 해제
+        self._color_cache = {}
+
     @property
     def targets(self):
         targets = Targets()
@@ -28,6 +32,19 @@ class ColorDifferenceModel:
 
         return targets
 
+    def add_snapshot(self, snapshot: Snapshot):
+        self.snapshots.append(snapshot)
+        snapshot.processed.connect(lambda: self.invalidate_colors(snapshot))
+        snapshot.colors_changed.connect(lambda: self.invalidate_colors(snapshot))
+
+    def invalidate_colors(self, snapshot: Snapshot = None):
+        if snapshot is None:
+            self._color_cache.clear()
+            return
+
+        for key in [key for key in self._color_cache if key[0] is snapshot]:
+            del self._color_cache[key]
+
     def get_origin_rgb_colors(self, index):
         snapshot: Snapshot = self.snapshots[index]
         return snapshot.mean_rgb_colors
@@ -39,72 +56,70 @@ class ColorDifferenceModel:
             sub_headers = self.lab_headers
         else:
             sub_headers = self.rgb_headers
-        return [f"{base} {sub}" for base, sub in zip(self.base_headers, sub_headers)]
+        headers = [f"{base} {sub}" for base, sub in zip(self.base_headers, sub_headers)]
+        if self.distance_metric != ColorDistanceMetric.EUCLIDEAN:
+            headers[-1] = f"Color {colorimetry.DISTANCE_METRIC_NAMES[self.distance_metric]}"
+        return headers
 
     def get_color_datas(self, color_type="rgb", target_index=None):
         if target_index is None:
             target_index = self.target_index
         control_index = self.control_index
 
-        if color_type == "xyy":
-            get_colors = self.get_xyy_colors
-        elif color_type == "lab":
-            get_colors = self.get_lab_colors
-        else:
-            get_colors = self.get_rgb_colors
-        target_colors = get_colors(target_index)
-        control_colors = get_colors(control_index)
+        target_colors = self.get_colors(color_type, target_index)
+        control_colors = self.get_colors(color_type, control_index)
 
-        return target_colors, control_colors, self.get_color_differences(target_colors, control_colors)
+        if self.distance_metric == ColorDistanceMetric.EUCLIDEAN:
+            differences = self.get_color_differences(target_colors, control_colors)
+        else:
+            differences = self.get_delta_e(target_index, control_index)
+        return target_colors, control_colors, differences
 
     def get_selected_color_type(self):
         return self.color_types[self.color_index]
 
-    def get_rgb_colors(self, target_index):
-        pixmap_rgb_colors = self.get_origin_rgb_colors(target_index)
-        cell_rgb_colors = []
-
-        row_count = len(pixmap_rgb_colors)
-        column_count = len(pixmap_rgb_colors[0])
-        for row in list(range(row_count - 1, -1, -1)):
-            for column in range(column_count):
-                cell_rgb_colors.append(pixmap_rgb_colors[row][column])
-
-        return cell_rgb_colors
-
-    def get_xyy_colors(self, target_index):
-        target_rgb_colors = self.get_rgb_colors(target_index)
-        xyy_colors = []
+    def get_colors(self, color_type, target_index) -> np.ndarray:
+        snapshot: Snapshot = self.snapshots[target_index]
+        key = (snapshot, color_type)
+        if key in self._color_cache:
+            return self._color_cache[key]
 
-        for rgb in target_rgb_colors:
-            normalized = [value / 255 for value in rgb]
-            srgb = sRGBColor(*normalized)
-            xyy = convert_color(srgb, xyYColor)
-            xyy_colors.append([xyy.xyy_x, xyy.xyy_y, xyy.xyy_Y])
-
-        return xyy_colors
-
-    def get_lab_colors(self, target_index):
-        target_rgb_colors = self.get_rgb_colors(target_index)
-        lab_colors = []
-
-        for rgb in target_rgb_colors:
-            normalized = [value / 255 for value in rgb]
-            srgb = sRGBColor(*normalized)
-            lab = convert_color(srgb, LabColor)
-            lab_colors.append([lab.lab_l, lab.lab_a, lab.lab_b])
-
-        return lab_colors
-
-    def get_color_differences(self, target_colors, control_colors):
-        differences = []
-
-        for target_color, control_color in zip(target_colors, control_colors):
-            difference = round(np.sqrt(
-                (target_color[0] - control_color[0]) ** 2 +
-                (target_color[1] - control_color[1]) ** 2 +
-                (target_color[2] - control_color[2]) ** 2
-            ), 3)
-            differences.append(difference)
-
-        return differences
+        rgb_colors = self.get_rgb_colors(target_index)
+        if color_type == "xyy":
+            colors = colorimetry.rgb_to_xyy(rgb_colors)
+        elif color_type == "lab":
+            colors = colorimetry.rgb_to_lab(rgb_colors)
+        else:
+            colors = rgb_colors
+
+        self._color_cache[key] = colors
+        return colors
+
+    def get_rgb_colors(self, target_index) -> np.ndarray:
+        key = (self.snapshots[target_index], "rgb")
+        if key not in self._color_cache:
+            # 아래 행부터 셀 순서로 펼침
+            pixmap_rgb_colors = np.asarray(self.get_origin_rgb_colors(target_index), dtype=np.float64)
+            self._color_cache[key] = pixmap_rgb_colors[::-1].reshape(-1, 3)
+
+        return self._color_cache[key]
+
+    def get_xyy_colors(self, target_index) -> np.ndarray:
+        return self.get_colors("xyy", target_index)
+
+    def get_lab_colors(self, target_index) -> np.ndarray:
+        return self.get_colors("lab", target_index)
+
+    def get_color_differences(self, target_colors, control_colors) -> np.ndarray:
+        differences = np.linalg.norm(np.asarray(target_colors) - np.asarray(control_colors), axis=1)
+        return np.round(differences, 3)
+
+    def get_delta_e(self, target_index, control_index=None, metric=None) -> np.ndarray:
+        """ control 색을 기준으로 한 (96,) ΔE """
+        if control_index is None:
+            control_index = self.control_index
+        if metric is None:
+            metric = self.distance_metric
+        target_colors = self.get_lab_colors(target_index)
+        control_colors = self.get_lab_colors(control_index)
+        return np.round(colorimetry.delta_e(control_colors, target_colors, metric), 3)
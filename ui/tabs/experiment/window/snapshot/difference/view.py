@@ -2,6 +2,7 @@ from PySide6.QtWidgets import QLabel, QComboBox, QHBoxLayout, QVBoxLayout
 
 from ui.common import BaseWidgetView, ColoredButton, MileStoneRadio
 from ui.tabs.experiment.window.snapshot.difference.difference_table import ColorDifferenceTableController
+from util import colorimetry
 from util.colors import EXCEL_GREEN
 
 
@@ -16,6 +17,9 @@ class ColorDifferenceView(BaseWidgetView):
         lb_control = QLabel("Control")
         self.cmb_target = QComboBox()
         self.cmb_control = QComboBox()
+        lb_metric = QLabel("색차 공식")
+        self.cmb_metric = QComboBox()
+        self.cmb_metric.addItems(list(colorimetry.DISTANCE_METRIC_NAMES.values()))
         self.btn_to_excel = ColoredButton("엑셀로 저장", background_color=EXCEL_GREEN)
 
         lyt_top = QHBoxLayout()
@@ -23,6 +27,8 @@ class ColorDifferenceView(BaseWidgetView):
         lyt_top.addWidget(self.cmb_target)
         lyt_top.addWidget(lb_control)
         lyt_top.addWidget(self.cmb_control)
+        lyt_top.addWidget(lb_metric)
+        lyt_top.addWidget(self.cmb_metric)
         lyt_top.addStretch()
         lyt_top.addWidget(self.btn_to_excel)
 
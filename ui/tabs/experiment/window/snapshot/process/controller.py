@@ -28,12 +28,16 @@ class SnapshotProcessController(BaseController):
 
         if capture_list_view.units:
             try:
-                image = camera_manager.get_current_image()
+                frame = camera_manager.get_current_frame()
             except Exception:
-                image = None
-
-            if image is not None:
-                capture_list.set_unit_image(Image(image, True))
+                frame = None
+
+            if frame is not None:
+                # 복사 없이 최신 프레임을 쓰고, 캡처 이미지가 살아 있는 동안 프레임을 잡아 둠
+                with frame:
+                    image = Image(frame.array, True)
+                    frame.hold(image)
+                capture_list.set_unit_image(image)
             else:
                 msg = "카메라 상태를 확인하세요."
                 Toast().toast(msg)
@@ -4,8 +4,6 @@ from PySide6.QtCore import QObject, QTimer, Signal
 from models.snapshot import Snapshot
 
 WINDOW_NAME = "draw_mask"
-MASK_COLOR = (255, 255, 255)
-UNMASK_COLOR = (0, 0, 0)
 
 
 class DrawMask(QObject):
@@ -21,13 +19,15 @@ class DrawMask(QObject):
         self.drawing_thickness = 5
         self.overlay_k = 25
         self.zoom_level = 200
+        self.display_image = None  # 마스크 적용된 BGR 이미지, 브러시 영역만 갱신
 
         self.timer_detect_closed = QTimer()
         self.timer_detect_closed.setInterval(100)
         self.timer_detect_closed.timeout.connect(self.detect_closed)
 
     def open_window(self):
-        converted_image = cv2.cvtColor(self.snapshot.mask.mask_filled_array, cv2.COLOR_RGB2BGR)
+        self.display_image = cv2.cvtColor(self.snapshot.mask.well_patches.to_dense(), cv2.COLOR_RGB2BGR)
+        converted_image = self.display_image
 
         height, width, _ = converted_image.shape
         window_width, window_height = 1920 * 0.7, 1080 * 0.7
@@ -54,40 +54,38 @@ class DrawMask(QObject):
     def mouse_callback(self, event, x, y, flags, params):
         if event == cv2.EVENT_LBUTTONDOWN:
             self.drawing = True
-            cv2.circle(self.snapshot.mask.custom_mask, (x, y), self.drawing_thickness, MASK_COLOR,
-                       thickness=cv2.FILLED)
+            self.paint(x, y, True)
             self.update_overlay(x, y)
         elif event == cv2.EVENT_LBUTTONUP:
             self.drawing = False
 
         elif event == cv2.EVENT_RBUTTONDOWN:
             self.removing = True
-            cv2.circle(self.snapshot.mask.custom_mask, (x, y), self.drawing_thickness, UNMASK_COLOR,
-                       thickness=cv2.FILLED)
+            self.paint(x, y, False)
             self.update_overlay(x, y)
         elif event == cv2.EVENT_RBUTTONUP:
             self.removing = False
 
         elif event == cv2.EVENT_MOUSEMOVE:
             if self.drawing:
-                cv2.circle(self.snapshot.mask.custom_mask, (x, y), self.drawing_thickness, MASK_COLOR,
-                           thickness=cv2.FILLED)
-                mask_changed = True
-
+                self.paint(x, y, True)
             elif self.removing:
-                cv2.circle(self.snapshot.mask.custom_mask, (x, y), self.drawing_thickness, UNMASK_COLOR,
-                           thickness=cv2.FILLED)
-                mask_changed = True
-            else:
-                mask_changed = False
-            self.update_overlay(x, y, mask_changed)
-
-    def update_overlay(self, mouse_x, mouse_y, mask_changed=True):
+                self.paint(x, y, False)
+            self.update_overlay(x, y)
+
+    # 브러시 영역만 마스크 합성, 홀 통계, 표시 이미지를 갱신함
+    def paint(self, x, y, masked):
         mask_info = self.snapshot.mask
-        if mask_changed:
-            mask_info.on_mask_changed()
+        x1, y1, x2, y2 = mask_info.paint_custom_mask(x, y, self.drawing_thickness, masked)
+        if x1 == x2 or y1 == y2:
+            return
 
-        converted_image = cv2.cvtColor(mask_info.mask_filled_array, cv2.COLOR_RGB2BGR)
+        mask_info.update_mask_region(x1, y1, x2, y2)
+        region = mask_info.get_mask_filled_region(x1, y1, x2, y2)
+        self.display_image[y1:y2, x1:x2] = region[:, :, ::-1]  # RGB -> BGR
+
+    def update_overlay(self, mouse_x, mouse_y):
+        converted_image = self.display_image
         height, width, _ = converted_image.shape
         k = self.overlay_k
         crop_x_start = max(0, mouse_x - k)
@@ -124,10 +122,13 @@ class DrawMask(QObject):
             overlay_y_end = crop_y_end + bound_k
             zoomed_y_end = len(zoomed_in)
 
-        overlay = converted_image.copy()
+        # 전체 이미지를 복사하지 않고 확대 영역만 덮어쓴 뒤 표시하고 되돌림
+        overlay_region = converted_image[overlay_y_start:overlay_y_end, overlay_x_start:overlay_x_end]
+        backup = overlay_region.copy()
         try:
             cropped_zoomed = zoomed_in[zoomed_y_start: zoomed_y_end, zoomed_x_start: zoomed_x_end]
-            overlay[overlay_y_start:overlay_y_end, overlay_x_start:overlay_x_end] = cropped_zoomed
+            overlay_region[:] = cropped_zoomed
         except:
             pass
-        cv2.imshow(WINDOW_NAME, overlay)
+        cv2.imshow(WINDOW_NAME, converted_image)
+        overlay_region[:] = backup
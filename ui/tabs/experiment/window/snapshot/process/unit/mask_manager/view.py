@@ -219,7 +219,8 @@ class MaskManagerView(BaseDialogView):
             if masking_view is not None:
                 masking_view.closed.disconnect()
 
-            self.snapshot.mask.update_mask()
+            # 브러시 영역은 그릴 때마다 반영되었으므로 참조만 갱신함
+            self.snapshot.mask.mask_updated.emit()
             self.update_scene()
 
         masking_view = DrawMask(self.snapshot)
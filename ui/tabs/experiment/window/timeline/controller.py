@@ -1,3 +1,6 @@
+import logging
+import time
+
 import numpy as np
 from PySide6.QtCore import QTimer
 
@@ -10,6 +13,11 @@ from ui.tabs.experiment.window.snapshot.difference.excel_manager import Timeline
 from ui.tabs.experiment.window.timeline import PlateTimelineModel, PlateTimelineView
 from ui.tabs.experiment.window.timeline.widgets.color_graph import ColorGraphController
 from ui.tabs.experiment.window.timeline.widgets.select_combination_table import SelectCombinationTableController
+from util import colorimetry
+from util.camera_manager import CameraUnit, Frame
+
+TIMELINE_WAKE_SECONDS = 3  # 캡처 몇 초 전에 센서 프레임 제한을 풀어 자동 노출이 따라오도록 함
+FALLBACK_FRAME_MAX_AGE = 2  # 초, 캡처가 실패했을 때 대신 쓸 수 있는 최신 프레임의 나이
 
 
 class PlateTimelineController(BaseController):
@@ -21,6 +29,8 @@ class PlateTimelineController(BaseController):
         self.timeline_path = args["timeline_path"]
         self.association_indexes = []
         self.velocity_visibility = True
+        self.pending_captures = set()  # 결과를 기다리는 캡처 요청 id
+        self.next_capture_time = 0.0  # time.monotonic() 기준 다음 캡처 시각
 
         model: PlateTimelineModel = self.model
         model.init_timeline_instance(self.timeline_path, self.target.name)
@@ -30,7 +40,9 @@ class PlateTimelineController(BaseController):
         view.camera_widget.camera_display.lb_camera.snapshot_initialized_signal.connect(self.load_timeline)
         view.cb_apply_lab_correction.stateChanged.connect(self.update_graph)
         view.cb_hide_velocity.clicked.connect(self.on_velocity_visibility_changed)
+        view.cmb_distance_metric.currentIndexChanged.connect(self.on_distance_metric_changed)
         view.btn_export_to_excel.clicked.connect(self.export_to_excel)
+        CameraUnit().signal_captured.connect(self.on_frame_captured)
 
         combination_table: SelectCombinationTableController = view.combination_table
         combination_table.display_associations_changed.connect(self.on_associations_changed)
@@ -73,6 +85,7 @@ class PlateTimelineController(BaseController):
         timeline: Timeline = model.timeline
         snapshot_instance: Snapshot = view.camera_widget.status.snapshot_instance
 
+        # 그래프와 엑셀 저장은 선택한 홀만 쓰므로 색 차이는 불러올 때 계산하지 않음
         worker, camera_settings = timeline.load_timeline(snapshot_instance)
         if worker is not None:
             worker.finished.connect(self.on_timeline_loaded)
@@ -89,8 +102,8 @@ class PlateTimelineController(BaseController):
         timeline: Timeline = self.model.timeline
         apply_lab_correct = view.cb_apply_lab_correction.isChecked()
 
-        color_graph.update_graph(
-            *timeline.get_datas(self.association_indexes, apply_lab_correct, self.velocity_visibility))
+        color_graph.update_graph(*timeline.get_datas(self.association_indexes, apply_lab_correct,
+                                                     self.velocity_visibility, color_graph.plot_width))
 
     def on_timeline_loaded(self):
         view: PlateTimelineView = self.view
@@ -125,13 +138,27 @@ class PlateTimelineController(BaseController):
         self.velocity_visibility = not state
         self.update_graph()
 
+    def on_distance_metric_changed(self, index):
+        timeline: Timeline = self.model.timeline
+        timeline.set_distance_metric(list(colorimetry.DISTANCE_METRIC_NAMES)[index])
+        self.update_graph()
+
     def on_run_timeline_clicked(self):
         view: PlateTimelineView = self.view
         model: PlateTimelineModel = self.model
         model.is_running = not model.is_running
 
         view.cb_apply_lab_correction.setEnabled(not model.is_running)
+        view.cb_trigger_capture.setEnabled(not model.is_running)
+        view.sb_average_frames.setEnabled(not model.is_running)
         view.switch_btn_run_timeline(model.is_running)
+        if not model.is_running:
+            self.release_camera()
+        elif view.cb_trigger_capture.isChecked() and not CameraUnit().set_trigger_mode(True):
+            view.cb_trigger_capture.setChecked(False)
+            msg = "소프트웨어 트리거를 지원하지 않는 카메라입니다. 실시간 영상으로 촬영합니다."
+            Toast().toast(msg)
+            logging.warning(msg)
 
         if model.is_running:
             model.get_camera_setting()
@@ -139,6 +166,7 @@ class PlateTimelineController(BaseController):
 
             timeline: Timeline = model.timeline
             timeline.init_plate_info(view.camera_widget.snapshot_instance)
+            self.pending_captures.clear()  # 이전 실행에서 늦게 오는 결과는 버림
             QTimer.singleShot(0, self.take_snapshot)
 
     def take_snapshot(self):
@@ -152,20 +180,88 @@ class PlateTimelineController(BaseController):
         timeline: Timeline = model.timeline
         # snapshot_instance: Snapshot = camera_display.status.snapshot_instance
 
+        camera_unit = CameraUnit()
         if timeline.current_count >= timeline.end_count:
             model.is_running = False
             view.switch_btn_run_timeline(False)
             view.update_lb_interval_info()
+            view.cb_trigger_capture.setEnabled(True)
+            view.sb_average_frames.setEnabled(True)
+            self.release_camera()
+            return
+
+        interval = timeline.current_interval
+        QTimer.singleShot(interval * 1000, self.take_snapshot)
+        self.next_capture_time = time.monotonic() + interval
+
+        if self.pending_captures:
+            logging.warning(f"{len(self.pending_captures)} capture(s) still pending from earlier intervals")
+        request_id = camera_unit.capture(view.sb_average_frames.value())
+        if request_id is not None:
+            # 트리거 모드거나 여러 장을 평균 낼 때는 수집 스레드에서 찍고, 결과는 on_frame_captured
+            self.pending_captures.add(request_id)
+        else:
+            self.append_snapshot(camera_display.take_snapshot())
+            self.wait_next_capture()
+
+    def wait_next_capture(self):
+        """ 캡처 결과를 받은 뒤 다음 캡처까지는 센서 프레임 수를 줄였다가 캡처 직전에 되돌림 """
+        if self.pending_captures or not self.model.is_running:
+            # 평균을 모으는 중에는 줄이지 않음
+            return
+        remaining = self.next_capture_time - time.monotonic()
+        if remaining <= TIMELINE_WAKE_SECONDS:
             return
 
-        QTimer.singleShot(timeline.current_interval * 1000, self.take_snapshot)
+        camera_unit = CameraUnit()
+        camera_unit.set_timeline_waiting(True)
+        QTimer.singleShot(int((remaining - TIMELINE_WAKE_SECONDS) * 1000),
+                          lambda: camera_unit.set_timeline_waiting(False))
 
-        snapshot_instance = camera_display.take_snapshot()
+    def on_frame_captured(self, request_id: int, frame: Frame):
+        if request_id not in self.pending_captures:
+            return
+        self.pending_captures.discard(request_id)
+        if not self.model.is_running:
+            return
+
+        self.append_captured_snapshot(request_id, frame)
+        self.wait_next_capture()
+
+    def append_captured_snapshot(self, request_id: int, frame: Frame):
+        camera_display: SectionCameraDisplay = self.view.camera_widget.camera_display
+        if frame is not None:
+            self.append_snapshot(camera_display.take_snapshot(frame))
+            return
+
+        # 트리거 모드에서 화면이 숨겨져 있으면 최신 프레임이 몇 분 전 것일 수 있으므로 최근 프레임만 대신 씀
+        latest = CameraUnit().get_current_frame()
+        if latest is None:
+            logging.error(f"Capture {request_id} failed and no frame is available, the point is skipped")
+            return
+        with latest:
+            age = time.time() - latest.timestamp
+            if age > FALLBACK_FRAME_MAX_AGE:
+                logging.error(f"Capture {request_id} failed and the latest frame is {age:.0f}s old, "
+                              f"the point is skipped")
+                return
+            logging.error(f"Capture {request_id} failed, the latest live frame is used instead")
+            # 프레임을 직접 넘겨 캡처 시각이 지금이 아닌 프레임 시각으로 기록되도록 함
+            self.append_snapshot(camera_display.take_snapshot(latest))
+
+    def append_snapshot(self, snapshot_instance: Snapshot):
+        view: PlateTimelineView = self.view
+        timeline: Timeline = self.model.timeline
         view.update_lb_interval_info()
         timeline.append_snapshot(snapshot_instance)
 
         self.update_graph()
 
+    def release_camera(self):
+        camera_unit = CameraUnit()
+        camera_unit.set_timeline_waiting(False)
+        camera_unit.set_trigger_mode(False)
+
 
 def main():
     from PySide6.QtWidgets import QApplication
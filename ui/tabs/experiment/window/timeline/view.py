@@ -1,6 +1,6 @@
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QPixmap
-from PySide6.QtWidgets import QHBoxLayout, QLabel, QVBoxLayout, QCheckBox, QWidget
+from PySide6.QtWidgets import QHBoxLayout, QLabel, QVBoxLayout, QCheckBox, QWidget, QComboBox, QSpinBox
 
 from models.snapshot import Timeline
 from ui.common import BaseWidgetView, ImageButton, ColoredButton
@@ -9,7 +9,7 @@ from ui.tabs.experiment.window.timeline import PlateTimelineModel
 from ui.tabs.experiment.window.timeline.widgets.color_graph import ColorGraphController
 from ui.tabs.experiment.window.timeline.widgets.interval_config import IntervalConfig
 from ui.tabs.experiment.window.timeline.widgets.select_combination_table import SelectCombinationTableController
-from util import local_storage_manager as lsm
+from util import colorimetry, local_storage_manager as lsm
 from util.colors import EXCEL_GREEN
 
 
@@ -36,10 +36,21 @@ class PlateTimelineView(BaseWidgetView):
         self.lb_camera_setting = QLabel()
         self.lb_camera_setting.setTextInteractionFlags(Qt.TextSelectableByMouse | Qt.TextSelectableByKeyboard)
 
+        self.cb_trigger_capture = QCheckBox("소프트웨어 트리거로 촬영")
+        self.cb_trigger_capture.setToolTip("촬영 시각에만 카메라를 트리거하고, 미리보기는 화면을 볼 때만 받음")
+        self.sb_average_frames = QSpinBox()
+        self.sb_average_frames.setRange(1, 32)
+        self.sb_average_frames.setToolTip("연속으로 찍은 프레임을 평균 내서 센서 노이즈를 줄임")
+        lyt_average_frames = QHBoxLayout()
+        lyt_average_frames.addWidget(QLabel("평균 프레임 수"))
+        lyt_average_frames.addWidget(self.sb_average_frames, 1)
+
         wig_timeline_content = QWidget()
         lyt_timeline_content = QVBoxLayout(wig_timeline_content)
         lyt_timeline_content.setContentsMargins(0, 0, 0, 0)
         lyt_timeline_content.addWidget(self.btn_run_timeline)
+        lyt_timeline_content.addWidget(self.cb_trigger_capture)
+        lyt_timeline_content.addLayout(lyt_average_frames)
         lyt_timeline_content.addLayout(lyt_interval_info)
         lyt_timeline_content.addWidget(self.lb_camera_setting)
 
@@ -53,12 +64,18 @@ class PlateTimelineView(BaseWidgetView):
         self.cb_apply_lab_correction = QCheckBox("Lab 보정 적용")
         self.cb_apply_lab_correction.setEnabled(False)
         self.cb_hide_velocity = QCheckBox("Velocity 숨기기")
+        self.cmb_distance_metric = QComboBox()
+        self.cmb_distance_metric.addItems(list(colorimetry.DISTANCE_METRIC_NAMES.values()))
+        lyt_distance_metric = QHBoxLayout()
+        lyt_distance_metric.addWidget(QLabel("색차 공식"))
+        lyt_distance_metric.addWidget(self.cmb_distance_metric, 1)
         self.btn_export_to_excel = ColoredButton("엑셀로 저장", background_color=EXCEL_GREEN)
         self.combination_table = SelectCombinationTableController(combination_id=self.combination_id)
         lyt_combination = QVBoxLayout()
         lyt_combination.setContentsMargins(0, 0, 0, 0)
         lyt_combination.addWidget(self.cb_apply_lab_correction)
         lyt_combination.addWidget(self.cb_hide_velocity)
+        lyt_combination.addLayout(lyt_distance_metric)
         lyt_combination.addWidget(self.btn_export_to_excel)
         lyt_combination.addWidget(self.combination_table.view)
 
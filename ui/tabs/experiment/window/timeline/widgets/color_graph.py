@@ -7,6 +7,10 @@ from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
 
 from ui.common import BaseWidgetView, BaseController
 
+LIMIT_HEADROOM = 0.25  # 시간 축이 늘어날 때 미리 넓혀 둘 비율
+LIMIT_MARGIN = 0.1  # 값 축의 위아래 여유 비율
+LIMIT_SHRINK_RATIO = 0.5  # 새 범위가 현재 범위의 이 비율보다 작아질 때만 줄임 (hysteresis)
+
 
 class ColorGraphModel:
     def __init__(self):
@@ -28,9 +32,15 @@ class ColorGraphView(BaseWidgetView):
 
         self.ax1.set_ylabel("distance")
         self.ax2.set_ylabel("velocity")
-        self.canvas.draw()
         self.colors = []
 
+        self.distance_lines = []
+        self.velocity_lines = []
+        self.line_key = None
+        self.background = None
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+        self.canvas.draw()
+
         lyt = QVBoxLayout(self)
         lyt.setContentsMargins(0, 0, 0, 0)
 
@@ -47,19 +57,60 @@ class ColorGraphView(BaseWidgetView):
         self.colors.clear()
         self.colors.extend(new_colors)
 
-    def update_graph(self, elapsed_times: list, distance_datas: pd.DataFrame, velocity_datas: pd.DataFrame):
+    def update_graph(self, elapsed_times, distance_datas: pd.DataFrame, velocity_datas: pd.DataFrame,
+                     velocity_times=None):
+        """ 선 구성(홀 조합, 보정 여부, velocity 표시)이 바뀔 때만 다시 그리고, 나머지는 set_data 후 blit
+
+        elapsed_times: 모든 선이 같이 쓰는 (n,) 또는 선 별 (n, k) x 값, velocity_times가 None이면 velocity도 같은 x
+        """
+        show_v = velocity_datas is not None
+        line_key = (tuple(distance_datas.columns), tuple(velocity_datas.columns) if show_v else None,
+                    tuple(self.colors))
+        if line_key != self.line_key:
+            self.line_key = line_key
+            self.create_lines(distance_datas, velocity_datas)
+
+        x = np.asarray(elapsed_times, dtype=np.float64)
+        distances = distance_datas.to_numpy()
+        self.set_line_datas(self.distance_lines, x, distances)
+        velocities = velocity_datas.to_numpy() if show_v else None
+        if show_v:
+            velocity_x = x if velocity_times is None else np.asarray(velocity_times, dtype=np.float64)
+            self.set_line_datas(self.velocity_lines, velocity_x, velocities)
+
+        limits_changed = self.update_limits(self.ax1, x, distances, True)
+        if show_v:
+            limits_changed = self.update_limits(self.ax2, x, velocities, False) or limits_changed
+
+        if limits_changed or self.background is None:
+            # 눈금이 바뀌면 전체를 다시 그림, 여러 번 호출되어도 이벤트 루프에서 한 번만 그림
+            self.background = None
+            self.canvas.draw_idle()
+        else:
+            self.blit_lines()
+
+    @staticmethod
+    def set_line_datas(lines: list, x: np.ndarray, values: np.ndarray):
+        for idx, (line, line_values) in enumerate(zip(lines, values.T)):
+            line.set_data(x if x.ndim == 1 else x[:, idx], line_values)
+
+    def create_lines(self, distance_datas: pd.DataFrame, velocity_datas: pd.DataFrame):
         ax1 = self.ax1
         ax2 = self.ax2
         ax1.clear()
         ax2.clear()
         show_v = velocity_datas is not None
 
+        # animated 선은 배경 그리기에서 빠지고 blit_lines에서만 그려짐
+        self.distance_lines = [
+            ax1.plot([], [], color=self.colors[idx], label=distance_column, linestyle="-", animated=True)[0]
+            for idx, distance_column in enumerate(distance_datas)]
+        self.velocity_lines = []
+
         if show_v:
-            for idx, (distance_column, velocity_column) in enumerate(zip(distance_datas, velocity_datas)):
-                distance_values = distance_datas[distance_column].tolist()
-                velocity_values = velocity_datas[velocity_column].tolist()
-                ax1.plot(elapsed_times, distance_values, color=self.colors[idx], label=distance_column, linestyle="-")
-                ax2.plot(elapsed_times, velocity_values, color=self.colors[idx], label=velocity_column, linestyle="--")
+            self.velocity_lines = [
+                ax2.plot([], [], color=self.colors[idx], label=velocity_column, linestyle="--", animated=True)[0]
+                for idx, velocity_column in enumerate(velocity_datas)]
 
             ax1.set_ylabel("distance")
             ax2.set_ylabel("velocity")
@@ -72,10 +123,6 @@ class ColorGraphView(BaseWidgetView):
             labels = labels1 + labels2
             ax1.legend(lines, labels)
         else:
-            for idx, distance_column in enumerate(distance_datas):
-                distance_values = distance_datas[distance_column].tolist()
-                ax1.plot(elapsed_times, distance_values, color=self.colors[idx], label=distance_column, linestyle="-")
-
             ax1.set_ylabel("distance")
             ax2.set_ylabel("")
             ax2.set_yticks([])
@@ -83,7 +130,50 @@ class ColorGraphView(BaseWidgetView):
             lines1, labels1 = ax1.get_legend_handles_labels()
             ax1.legend(lines1, labels1)
 
-        self.canvas.draw()
+        self.background = None
+
+    def update_limits(self, ax, x: np.ndarray, values: np.ndarray, update_x: bool) -> bool:
+        """ 데이터가 범위를 벗어나거나 다시 잡을 범위가 훨씬 작아지면 여유를 두고 다시 잡음, return 변경 여부 """
+        changed = False
+        finite_x = x[np.isfinite(x)]
+        if update_x and len(finite_x):
+            x_min, x_max = float(finite_x.min()), float(finite_x.max())
+            changed = self.set_limits(ax.get_xlim, ax.set_xlim, x_min, x_max, x_min, LIMIT_HEADROOM)
+
+        finite_values = values[np.isfinite(values)]
+        if len(finite_values):
+            y_min, y_max = float(finite_values.min()), float(finite_values.max())
+            changed = self.set_limits(ax.get_ylim, ax.set_ylim, y_min, y_max, None, LIMIT_MARGIN) or changed
+        return changed
+
+    @staticmethod
+    def set_limits(get_lim, set_lim, data_min, data_max, lower, headroom) -> bool:
+        current_min, current_max = get_lim()
+        margin = max(data_max - data_min, abs(data_max), 1) * headroom
+        new_min, new_max = data_min - margin if lower is None else lower, data_max + margin
+        # 0에서 떨어진 평평한 데이터는 여유가 데이터 폭보다 커서, 폭만 비교하면 매번 같은 범위를 다시 잡고 전체를 다시 그림
+        inside = current_min <= data_min and data_max <= current_max
+        if inside and new_max - new_min >= (current_max - current_min) * LIMIT_SHRINK_RATIO:
+            return False
+
+        set_lim(new_min, new_max)
+        return True
+
+    def on_draw(self, _):
+        # 전체 그리기가 끝나면 선을 뺀 배경을 저장하고 선만 올림 (창 크기 변경 포함)
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_lines()
+
+    def draw_lines(self):
+        for line in self.distance_lines:
+            self.ax1.draw_artist(line)
+        for line in self.velocity_lines:
+            self.ax2.draw_artist(line)
+
+    def blit_lines(self):
+        self.canvas.restore_region(self.background)
+        self.draw_lines()
+        self.canvas.blit(self.fig.bbox)
 
 
 class ColorGraphController(BaseController):
@@ -93,9 +183,10 @@ class ColorGraphController(BaseController):
     def init_controller(self):
         super().init_controller()
 
-    def update_graph(self, elapsed_times: list, distance_datas: pd.DataFrame, velocity_datas: pd.DataFrame):
+    def update_graph(self, elapsed_times, distance_datas: pd.DataFrame, velocity_datas: pd.DataFrame,
+                     velocity_times=None):
         view: ColorGraphView = self.view
-        view.update_graph(elapsed_times, distance_datas, velocity_datas)
+        view.update_graph(elapsed_times, distance_datas, velocity_datas, velocity_times)
 
     def set_colors(self, num_display: int):
         view: ColorGraphView = self.view
@@ -108,6 +199,12 @@ class ColorGraphController(BaseController):
         view: ColorGraphView = self.view
         return view.colors
 
+    @property
+    def plot_width(self) -> int:
+        """ 그래프 영역의 픽셀 폭, 이보다 많은 점은 화면에서 구분되지 않음 """
+        view: ColorGraphView = self.view
+        return max(1, int(view.ax1.bbox.width))
+
     @property
     def q_colors(self):
         colors = self.colors
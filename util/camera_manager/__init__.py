@@ -1 +1,3 @@
+from util.camera_manager.frame_pool import Frame, FramePool
+from util.camera_manager.acquisition import AcquisitionWorker, make_preview
 from util.camera_manager.main import CameraManager, CameraUnit
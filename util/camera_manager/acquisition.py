@@ -0,0 +1,268 @@
+import collections
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+
+from util.camera_manager import toupcam
+from util.camera_manager.frame_pool import Frame, FramePool
+
+ACQUISITION_QUEUE_SIZE = 1
+DROP_FRAME_POLL_INTERVAL = 1.0  # 초
+PREVIEW_FPS = 15  # 화면에 표시하는 최대 프레임 수
+
+
+def make_preview(image: np.ndarray, height: int) -> tuple:
+    """ return (height 높이로 줄인 이미지, 비율), 원본보다 크게 늘리지는 않음 """
+    if not height or height >= image.shape[0]:
+        return image, 1.0
+
+    scale = height / image.shape[0]
+    width = max(1, round(image.shape[1] * scale))
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA), scale
+
+
+class FrameAccumulator:
+    """ 연속 프레임을 float32 버퍼 하나에 더해 평균 프레임을 만듦
+
+    프레임은 더한 뒤 바로 풀로 돌아가므로 count와 관계없이 메모리는 누적 버퍼 하나와 프레임 한 장
+    """
+
+    def __init__(self, count: int):
+        self.count = count
+        self.added = 0
+        self.buffer: np.ndarray = None
+        self.last_frame_info = (0, 0.0, 0, 0)  # sequence, timestamp, device_sequence, device_timestamp
+
+    @property
+    def is_done(self) -> bool:
+        return self.added >= self.count
+
+    def add(self, frame: Frame) -> bool:
+        """ return count장을 모두 더했는지 여부 """
+        if self.buffer is None or self.buffer.shape != frame.shape:
+            # 중간에 해상도나 회전이 바뀌면 처음부터 다시 모음
+            self.buffer = np.zeros(frame.shape, dtype=np.float32)
+            self.added = 0
+
+        np.add(self.buffer, frame.array, out=self.buffer)
+        self.added += 1
+        self.last_frame_info = (frame.sequence, frame.timestamp, frame.device_sequence, frame.device_timestamp)
+        return self.is_done
+
+    def to_frame(self, pool: FramePool) -> Frame:
+        """ return 평균 프레임 (acquire 된 상태), 최신 프레임으로 publish 하지는 않음 """
+        frame = pool.acquire_writable(self.buffer.shape)
+        np.multiply(self.buffer, 1 / self.added, out=self.buffer)
+        np.rint(self.buffer, out=self.buffer)
+        np.copyto(frame.array, self.buffer, casting="unsafe")
+        frame.sequence, frame.timestamp, frame.device_sequence, frame.device_timestamp = self.last_frame_info
+        self.buffer = None
+        return frame
+
+
+class AcquisitionWorker(QThread):
+    """ 카메라 이미지를 UI 스레드 대신 전용 스레드에서 당겨 오는 작업자
+
+    SDK 콜백 스레드는 notify_image()로 이벤트만 알리고, 이 스레드가 PullImageV3로 풀 프레임을 채워
+    화면 크기의 preview를 만든 뒤 크기가 정해진 큐에 넣음. UI 스레드는 frame_ready를 받아 take()로 표시할 프레임만 꺼냄
+    큐가 가득 차면 drop_oldest가 True일 때 가장 오래된 프레임을, False일 때 새 프레임을 버림
+    화면 표시는 preview_fps로 제한하고, 이전 프레임이 아직 표시되지 않았으면 preview를 만들지 않고 건너뜀
+    캡처 요청은 트리거 모드면 TriggerSync로, 아니면 이어서 들어오는 프레임을 모아 평균을 내서 frame_captured로 보냄
+    모든 요청은 id와 함께 한 번 답을 받음, clear()로 취소된 요청은 None으로 받음
+    """
+    frame_ready = Signal()
+    frame_captured = Signal(int, object)  # 요청 id, 캡처한 Frame (acquire 된 상태), 실패하거나 취소되면 None
+
+    def __init__(self, camera_unit, queue_size: int = ACQUISITION_QUEUE_SIZE, drop_oldest: bool = True,
+                 parent=None):
+        super().__init__(parent)
+        self.camera_unit = camera_unit
+        self.queue_size = max(1, queue_size)
+        self.drop_oldest = drop_oldest
+
+        self.condition = threading.Condition()
+        self.frames: collections.deque[Frame] = collections.deque()  # 표시를 기다리는 프레임
+        self.pending_events = 0
+        self.capture_requests: collections.deque[tuple] = collections.deque()  # (요청 id, 평균 낼 프레임 수)
+        self.next_request_id = 0
+        self.accumulator: FrameAccumulator = None  # 실시간 영상에서 평균을 모으는 중
+        self.accumulating_request = -1  # accumulator로 모으는 요청 id
+        self.running = False
+
+        self.preview_fps = PREVIEW_FPS
+        self.last_preview_time = 0.0
+        self.awaiting_display = False  # 큐에 넣은 프레임이 아직 화면에 표시되지 않음
+
+        self.pulled_count = 0  # 카메라에서 받은 프레임
+        self.displayed_count = 0  # 화면에 표시한 프레임
+        self.skipped_count = 0  # 표시 제한으로 건너뛴 프레임
+        self.dropped_count = 0  # 큐가 가득 차서 버린 프레임
+        self.sdk_dropped_count = 0  # TOUPCAM_OPTION_NUMBER_DROP_FRAME, USB에서 받았지만 SDK가 버린 프레임
+
+    def start(self, *args, **kwargs):
+        self.running = True
+        super().start(*args, **kwargs)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.wait()
+        self.clear()
+
+    def notify_image(self):
+        """ SDK 콜백 스레드에서 호출, 여기서는 카메라를 건드리지 않음 """
+        with self.condition:
+            self.pending_events += 1
+            self.condition.notify()
+
+    def request_capture(self, count: int = 1) -> int:
+        """ UI 스레드에서 호출, count장의 평균을 캡처, return 요청 id, 결과는 frame_captured로 받음 """
+        with self.condition:
+            request_id = self.next_request_id
+            self.next_request_id += 1
+            self.capture_requests.append((request_id, max(1, count)))
+            self.condition.notify()
+        return request_id
+
+    def run(self):
+        last_poll_time = 0.0
+        while True:
+            with self.condition:
+                # 평균을 모으는 중이면 다음 캡처 요청은 끝날 때까지 기다림
+                has_capture = bool(self.capture_requests) and self.accumulator is None
+                if self.running and not self.pending_events and not has_capture:
+                    # 이벤트가 없어도 주기적으로 깨어나 SDK 드롭 수를 갱신
+                    self.condition.wait(DROP_FRAME_POLL_INTERVAL)
+                    has_capture = bool(self.capture_requests) and self.accumulator is None
+                if not self.running:
+                    break
+                request_id, count = self.capture_requests.popleft() if has_capture else (-1, 0)
+                if has_capture and not self.camera_unit.trigger_mode:
+                    # 요청을 꺼내는 것과 같은 잠금 안에서 넘겨야 clear()가 놓치지 않음
+                    self.accumulator = FrameAccumulator(count)
+                    self.accumulating_request = request_id
+                    has_capture = False
+                has_event = self.pending_events > 0
+                if has_event:
+                    self.pending_events -= 1
+
+            if has_capture:
+                # TriggerSync는 노출 시간만큼 기다리므로 UI 스레드가 아닌 여기서 호출
+                self.frame_captured.emit(request_id, self.trigger_capture(count))
+
+            if has_event:
+                frame = self.camera_unit.pull_frame()
+                if frame is not None:
+                    self.pulled_count += 1
+                    with self.condition:
+                        accumulator, accumulating_request = self.accumulator, self.accumulating_request
+                    if accumulator is not None and accumulator.add(frame):
+                        with self.condition:
+                            # 그 사이 clear()로 취소됐으면 이미 None으로 답했으므로 보내지 않음
+                            done = self.accumulator is accumulator
+                            if done:
+                                self.accumulator = None
+                        if done:
+                            self.frame_captured.emit(accumulating_request,
+                                                     accumulator.to_frame(self.camera_unit.frame_pool))
+                    if self.should_preview():
+                        frame.preview, frame.preview_scale = make_preview(frame.array, self.camera_unit.preview_height)
+                        self.put(frame)
+                    else:
+                        # 캡처는 풀의 최신 프레임을 쓰므로 화면에만 보내지 않음
+                        self.skipped_count += 1
+
+            if time.monotonic() - last_poll_time >= DROP_FRAME_POLL_INTERVAL:
+                last_poll_time = time.monotonic()
+                self.poll_sdk_dropped_count()
+
+    def trigger_capture(self, count: int) -> Frame:
+        """ return count장을 트리거해서 평균 낸 프레임 (acquire 된 상태), 실패하면 None """
+        if count <= 1:
+            return self.camera_unit.trigger_frame()
+
+        accumulator = FrameAccumulator(count)
+        while not accumulator.is_done:
+            frame = self.camera_unit.trigger_frame()
+            if frame is None:
+                return None
+            with frame:
+                accumulator.add(frame)
+        return accumulator.to_frame(self.camera_unit.frame_pool)
+
+    def should_preview(self) -> bool:
+        now = time.monotonic()
+        if self.awaiting_display:
+            return False
+        if self.preview_fps and now - self.last_preview_time < 1 / self.preview_fps:
+            return False
+        self.last_preview_time = now
+        return True
+
+    def mark_displayed(self):
+        """ UI 스레드에서 프레임을 표시한 뒤 호출 """
+        self.displayed_count += 1
+        with self.condition:
+            self.awaiting_display = bool(self.frames)  # 큐에 남은 프레임이 있으면 계속 기다림
+
+    def poll_sdk_dropped_count(self):
+        cam = self.camera_unit.cam
+        if cam:
+            try:
+                self.sdk_dropped_count = cam.get_Option(toupcam.TOUPCAM_OPTION_NUMBER_DROP_FRAME)
+            except toupcam.HRESULTException:
+                pass
+
+    def put(self, frame: Frame):
+        frame.acquire()  # 큐가 가지는 참조
+        with self.condition:
+            dropped = None
+            if len(self.frames) >= self.queue_size:
+                dropped = self.frames.popleft() if self.drop_oldest else frame
+                self.dropped_count += 1
+            if dropped is not frame:
+                self.frames.append(frame)
+                self.awaiting_display = True
+        if dropped is not None:
+            dropped.release()
+        if dropped is not frame:
+            self.frame_ready.emit()
+
+    def take(self) -> Frame:
+        """ return 큐에서 가장 오래된 프레임 (acquire 된 상태), 비어 있으면 None """
+        with self.condition:
+            if self.frames:
+                return self.frames.popleft()
+        return None
+
+    def clear(self):
+        """ 표시 대기 프레임과 캡처 요청을 버림, 버린 요청은 frame_captured에 None으로 답함 """
+        with self.condition:
+            while self.frames:
+                self.frames.popleft().release()
+            self.pending_events = 0
+            self.awaiting_display = False
+            cancelled = [request_id for request_id, _ in self.capture_requests]
+            if self.accumulator is not None:
+                cancelled.insert(0, self.accumulating_request)
+            self.capture_requests.clear()
+            self.accumulator = None
+            self.accumulating_request = -1
+
+        for request_id in cancelled:
+            logging.warning(f"Capture request {request_id} cancelled")
+            self.frame_captured.emit(request_id, None)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "delivered": self.pulled_count,
+            "displayed": self.displayed_count,
+            "dropped": self.skipped_count + self.dropped_count,
+            "sdk_dropped": self.sdk_dropped_count,
+        }
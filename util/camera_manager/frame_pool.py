@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+import weakref
+
+import numpy as np
+
+
+class Frame:
+    """ 풀에서 빌려 쓰는 카메라 프레임 한 장
+
+    ref_count가 0이 될 때까지 풀이 이 버퍼에 다음 프레임을 쓰지 않으므로,
+    acquire() 한 쪽은 복사 없이 array를 그대로 써도 내용이 바뀌지 않음
+    """
+
+    def __init__(self, pool: "FramePool", shape: tuple):
+        self.pool = pool
+        self.array = np.empty(shape, dtype=np.uint8)
+        self.sequence = -1  # 풀이 publish 할 때마다 1씩 증가
+        self.timestamp = 0.0  # 캡처 시각 (time.time())
+        self.device_sequence = 0  # 카메라가 붙인 프레임 번호
+        self.device_timestamp = 0  # 카메라 시각 (µs)
+        self.preview: np.ndarray = None  # 화면 크기로 줄인 이미지, 수집 스레드가 채움
+        self.preview_scale = 1.0  # preview / array 크기 비율
+        self.ref_count = 0
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    def acquire(self) -> "Frame":
+        with self.pool.lock:
+            self.ref_count += 1
+        return self
+
+    def release(self):
+        with self.pool.lock:
+            if self.ref_count <= 0:
+                logging.error(f"Frame {self.sequence} released more than acquired")
+                return
+            self.ref_count -= 1
+
+    def hold(self, owner) -> "Frame":
+        """ owner 객체(ex. Image)가 사라질 때까지 프레임을 잡아 둠 """
+        self.acquire()
+        weakref.finalize(owner, self.release)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class FramePool:
+    """ 미리 할당한 N장의 프레임을 돌려 쓰는 링 버퍼
+
+    acquire_writable()로 비어 있는 프레임을 받아 카메라 이미지를 채우고 publish() 하면
+    그 프레임이 최신 프레임이 되고, 이전 최신 프레임은 아무도 잡고 있지 않을 때 다시 쓰임
+    모든 프레임이 잡혀 있으면 한 장을 새로 할당하고, num_slots를 넘는 프레임은 놓이는 대로 버림
+    """
+
+    def __init__(self, num_slots: int = 4):
+        self.lock = threading.Lock()
+        self.num_slots = num_slots
+        self.frames: list[Frame] = []
+        self.next_slot = 0
+        self.sequence = 0
+        self.latest: Frame = None
+
+    def acquire_writable(self, shape: tuple) -> Frame:
+        """ return 쓰기용 프레임 (ref_count 1), 모양이 다르면 (해상도, 회전 변경) 버퍼를 다시 할당 """
+        with self.lock:
+            self._shrink()
+            frame = self._find_free_frame()
+            if frame is None:
+                frame = Frame(self, shape)
+                self.frames.append(frame)
+                if len(self.frames) > self.num_slots:
+                    logging.warning(f"All {len(self.frames) - 1} frames are held, frame pool grown")
+            elif frame.array.shape != shape:
+                frame.array = np.empty(shape, dtype=np.uint8)
+
+            frame.preview = None
+            frame.preview_scale = 1.0
+            frame.ref_count = 1
+            return frame
+
+    def _shrink(self):
+        # 모두 잡혀 있을 때 늘린 만큼, 아무도 잡고 있지 않은 프레임부터 버려 num_slots로 되돌림
+        for index in range(len(self.frames) - 1, -1, -1):
+            if len(self.frames) <= self.num_slots:
+                break
+            if self.frames[index].ref_count == 0:
+                del self.frames[index]
+        if self.frames:
+            self.next_slot %= len(self.frames)
+
+    def _find_free_frame(self):
+        if len(self.frames) < self.num_slots:
+            return None
+
+        # 다음 슬롯부터 돌면서 아무도 잡고 있지 않은 프레임을 찾음
+        for offset in range(len(self.frames)):
+            index = (self.next_slot + offset) % len(self.frames)
+            frame = self.frames[index]
+            if frame.ref_count == 0:
+                self.next_slot = (index + 1) % len(self.frames)
+                return frame
+        return None
+
+    def publish(self, frame: Frame, device_sequence=0, device_timestamp=0) -> Frame:
+        """ 채운 프레임을 최신 프레임으로 바꿈, acquire_writable의 참조는 풀이 최신 프레임으로 이어서 가짐 """
+        with self.lock:
+            frame.sequence = self.sequence
+            frame.timestamp = time.time()
+            frame.device_sequence = device_sequence
+            frame.device_timestamp = device_timestamp
+            self.sequence += 1
+
+            previous, self.latest = self.latest, frame
+            if previous is not None:
+                previous.ref_count -= 1
+        return frame
+
+    def discard(self, frame: Frame):
+        """ 채우지 못한 쓰기용 프레임을 돌려줌 """
+        frame.release()
+
+    def get_latest(self) -> Frame:
+        """ return 최신 프레임 (acquire 된 상태, 다 쓰면 release), 없으면 None """
+        with self.lock:
+            frame = self.latest
+            if frame is not None:
+                frame.ref_count += 1
+            return frame
+
+    def clear(self):
+        """ 카메라를 닫을 때 호출, 잡혀 있는 프레임은 각자 release 될 때까지 유지됨 """
+        with self.lock:
+            if self.latest is not None:
+                self.latest.ref_count -= 1
+            self.latest = None
+            self.frames = []
+            self.next_slot = 0
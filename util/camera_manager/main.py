@@ -1,10 +1,19 @@
+import ctypes
 import logging
+import threading
 
 import numpy as np
 from PySide6.QtCore import Signal, QObject
 
 from ui.common.toast import Toast
 from util.camera_manager import toupcam
+from util.camera_manager.acquisition import ACQUISITION_QUEUE_SIZE, PREVIEW_FPS, AcquisitionWorker
+from util.camera_manager.frame_pool import Frame, FramePool
+
+FRAME_POOL_SIZE = ACQUISITION_QUEUE_SIZE + 4  # 큐 + 최신 프레임 + 화면 + 쓰기용 + 스냅샷
+IDLE_FRAME_RATE = 2  # 화면을 보는 사람이 없거나 타임라인 캡처 사이일 때 센서 프레임 제한
+TRIGGER_CONTINUOUS = 0xffff  # Trigger(0xffff): 취소할 때까지 계속 트리거
+TRIGGER_SYNC_TIMEOUT = 0  # TriggerSync nWaitMS, 0이면 노출 시간 * 102% + 4000ms
 
 
 class CameraUnitError(Exception):
@@ -16,6 +25,7 @@ class CameraUnitError(Exception):
 class CameraManager(QObject):
     _instance = None
     signal_image = Signal(np.ndarray)
+    signal_frame = Signal(Frame)
 
     def __new__(cls, parent=None):
         if not cls._instance:
@@ -33,6 +43,7 @@ class CameraManager(QObject):
                 self.camera_unit = CameraUnit(parent)
                 self.camera_unit.open_camera()
                 self.camera_unit.signal_image.connect(self.signal_image.emit)
+                self.camera_unit.signal_frame.connect(self.signal_frame.emit)
 
     def get_current_image(self):
         if hasattr(self, "camera_unit") and self.camera_unit is not None:
@@ -40,6 +51,13 @@ class CameraManager(QObject):
             return unit.current_image
         return None
 
+    def get_current_frame(self) -> Frame:
+        """ return 최신 프레임 (acquire 된 상태), 다 쓰면 release 해야 함 """
+        if hasattr(self, "camera_unit") and self.camera_unit is not None:
+            unit: CameraUnit = self.camera_unit
+            return unit.get_current_frame()
+        return None
+
     def set_direction(self):
         self.rotate_direction()
 
@@ -55,6 +73,8 @@ class CameraUnit(QObject):
 
     video_started = Signal(bool)
     signal_image = Signal(np.ndarray)
+    signal_frame = Signal(Frame)
+    signal_captured = Signal(int, object)  # capture()가 준 요청 id, 캡처한 Frame, 실패하거나 취소되면 None
     direction = 1
 
     def __new__(cls, parent=None):
@@ -72,19 +92,33 @@ class CameraUnit(QObject):
                 self.cam = None
                 self.imgWidth = 0
                 self.imgHeight = 0
-                self.pData = None
+                self.frame_pool: FramePool = None
+                self.acquisition: AcquisitionWorker = None
+                self.pull_lock = threading.Lock()  # 해상도를 바꾸는 동안 작업자가 이전 크기로 당겨 오지 않도록 막음
+                self.trigger_idle = threading.Event()  # 잠금 밖에서 기다리는 TriggerSync가 없음
+                self.trigger_idle.set()
+                self.preview_heights = {}  # 화면 라벨 별 표시 높이, 수집 스레드가 이 높이로 preview를 만듦
+                self.preview_height = 0
+                self.preview_fps = PREVIEW_FPS
+                self.timeline_waiting = False  # 타임라인이 다음 캡처를 기다리는 중
+                self.pending_capture_count = 0  # 수집 스레드가 아직 답하지 않은 캡처 요청 수, 그동안은 프레임을 줄이지 않음
+                self.frame_rate_limit = 0  # TOUPCAM_OPTION_FRAMERATE, 0이면 제한 없음
+                self.trigger_mode = False  # TOUPCAM_OPTION_TRIGGER 소프트웨어 트리거 모드
+                self.trigger_streaming = False  # 트리거 모드에서 미리보기용 연속 트리거 중
                 self.res = 0
                 self.temp = toupcam.TOUPCAM_TEMP_DEF
                 self.tint = toupcam.TOUPCAM_TINT_DEF
 
                 self.initialized = True
-                self.evtCallback.connect(self.onevtCallback)
 
     def close_camera(self):
+        self.stop_acquisition()
         if self.cam:
             self.cam.Close()
         self.cam = None
-        self.pData = None
+        if self.frame_pool is not None:
+            self.frame_pool.clear()
+        self.frame_pool = None
 
     def open_camera(self):
         logging.info("open Camera Unit")
@@ -104,10 +138,14 @@ class CameraUnit(QObject):
             self.imgHeight = self.cur.model.res[self.res].height
             self.cam.put_Option(toupcam.TOUPCAM_OPTION_BYTEORDER, 0)
             self.cam.put_AutoExpoEnable(1)
+            self.frame_rate_limit = 0
+            self.update_frame_rate_limit()
             self.start_camera()
 
     def start_camera(self):
-        self.pData = bytes(toupcam.TDIBWIDTHBYTES(self.imgWidth * 24) * self.imgHeight)
+        if self.frame_pool is None:
+            self.frame_pool = FramePool(FRAME_POOL_SIZE)
+        self.start_acquisition()
         try:
             self.cam.StartPullModeWithCallback(self.eventCallBack, self)
         except toupcam.HRESULTException:
@@ -115,33 +153,214 @@ class CameraUnit(QObject):
             raise CameraUnitError("이미지를 받아오는데 실패했습니다.")
         else:
             self.video_started.emit(True)
+            if self.trigger_mode:
+                self.apply_trigger_mode()
+
+    def start_acquisition(self):
+        if self.acquisition is None:
+            self.acquisition = AcquisitionWorker(self)
+            self.acquisition.preview_fps = self.preview_fps
+            self.acquisition.frame_ready.connect(self.on_frame_ready)
+            self.acquisition.frame_captured.connect(self.on_frame_captured)
+            self.acquisition.start()
+
+    def stop_acquisition(self):
+        if self.acquisition is not None:
+            self.acquisition.stop()
+            self.acquisition = None
 
     @staticmethod
     def eventCallBack(nEvent, self):
         '''callbacks come from toupcam.dll/so internal threads, so we use qt signal to post this event to the UI thread'''
-        self.evtCallback.emit(nEvent)
+        # 이미지 이벤트는 UI 스레드를 거치지 않고 수집 스레드가 바로 당겨 옴
+        if toupcam.TOUPCAM_EVENT_IMAGE == nEvent and self.acquisition is not None:
+            self.acquisition.notify_image()
+        else:
+            self.evtCallback.emit(nEvent)
+
+    def pull_frame(self) -> Frame:
+        """ 수집 스레드에서 호출, return 받아 온 프레임 (풀의 최신 프레임), 실패하면 None """
+        with self.pull_lock:
+            pool: FramePool = self.frame_pool
+            if not self.cam or pool is None:
+                return None
+
+            # 아무도 잡고 있지 않은 풀 버퍼에 바로 받아 오므로, 화면이나 스냅샷이 쓰는 프레임은 덮어쓰지 않음
+            frame = pool.acquire_writable(self.frame_shape)
+            info = toupcam.ToupcamFrameInfoV3()
+            try:
+                # rowPitch -1: 행 패딩 없이 받아서 (h, w, 3) 배열과 메모리 배치를 맞춤
+                self.cam.PullImageV3(frame.array.ctypes.data_as(ctypes.c_char_p), 0, 24, -1, info)
+            except toupcam.HRESULTException:
+                pool.discard(frame)
+                return None
+            return pool.publish(frame, info.seq, info.timestamp)
+
+    def trigger_frame(self) -> Frame:
+        """ 수집 스레드에서 호출, 소프트웨어 트리거로 한 장을 찍어 옴, return 프레임 (acquire 된 상태) 또는 None """
+        # 버퍼만 잠금 안에서 받고, 노출 시간만큼 걸리는 TriggerSync는 잠금 밖에서 기다림
+        # set_resolution은 Stop()으로 이 대기를 끊은 뒤 trigger_idle을 기다려서 이전 크기의 버퍼에 쓰지 않게 함
+        with self.pull_lock:
+            cam, pool = self.cam, self.frame_pool
+            if not cam or pool is None:
+                return None
+            shape = self.frame_shape
+            frame = pool.acquire_writable(shape)
+            self.trigger_idle.clear()
+
+        info = toupcam.ToupcamFrameInfoV3()
+        streaming = self.trigger_mode and self.trigger_streaming
+        try:
+            if streaming:
+                cam.Trigger(0)  # 미리보기용 연속 트리거를 잠시 멈춤
+            cam.TriggerSync(TRIGGER_SYNC_TIMEOUT, frame.array.ctypes.data_as(ctypes.c_char_p), 24, -1, info)
+        except toupcam.HRESULTException as e:
+            logging.error(f"Trigger capture failed: {e}")
+            pool.discard(frame)
+            return None
+        finally:
+            if streaming:
+                try:
+                    cam.Trigger(TRIGGER_CONTINUOUS)
+                except toupcam.HRESULTException as e:
+                    # 예외가 수집 스레드를 멈추지 않도록 함, 다음 update_trigger_streaming에서 다시 시도
+                    logging.error(f"Failed to resume continuous trigger: {e}")
+                    self.trigger_streaming = False
+            self.trigger_idle.set()
+
+        with self.pull_lock:
+            if self.frame_pool is not pool or self.frame_shape != shape:
+                # 기다리는 동안 해상도나 회전이 바뀐 프레임은 버림
+                pool.discard(frame)
+                return None
+            return pool.publish(frame, info.seq, info.timestamp).acquire()
+
+    def capture(self, count: int = 1) -> int:
+        """ 트리거 모드면 count장을 트리거하고, 아니면 이어서 들어오는 count장의 평균을 캡처
+        return 요청 id, 결과는 signal_captured로 전달, 실시간 영상에서 한 장이면 표시 중인 프레임을 쓰면 되므로 None
+        """
+        if self.acquisition is None or (not self.trigger_mode and count <= 1):
+            return None
+        request_id = self.acquisition.request_capture(count)
+        self.pending_capture_count += 1
+        self.update_frame_rate_limit()
+        return request_id
+
+    def on_frame_captured(self, request_id: int, frame: Frame):
+        # 받는 쪽이 다음 캡처까지 프레임을 줄일 수 있도록 먼저 셈
+        self.pending_capture_count = max(0, self.pending_capture_count - 1)
+        self.update_frame_rate_limit()
+        if frame is None:
+            self.signal_captured.emit(request_id, None)
+            return
+        with frame:
+            self.signal_captured.emit(request_id, frame)
 
-    def onevtCallback(self, nEvent):
-        '''this run in the UI thread'''
-        if self.cam:
-            if toupcam.TOUPCAM_EVENT_IMAGE == nEvent:
-                self.handleImageEvent()
+    def set_trigger_mode(self, enabled: bool) -> bool:
+        """ return 트리거 모드 적용 여부, 지원하지 않는 카메라면 False """
+        if self.trigger_mode == enabled:
+            return True
+        self.trigger_mode = enabled
+        if self.cam and not self.apply_trigger_mode():
+            self.trigger_mode = False
+            return False
+        return True
 
-    def handleImageEvent(self):
+    def apply_trigger_mode(self) -> bool:
         try:
-            self.cam.PullImageV3(self.pData, 0, 24, 0, None)
+            self.cam.put_Option(toupcam.TOUPCAM_OPTION_TRIGGER, 1 if self.trigger_mode else 0)
         except toupcam.HRESULTException:
-            pass
+            logging.warning("Software trigger is not supported")
+            return False
+        self.trigger_streaming = False
+        self.update_trigger_streaming()
+        return True
+
+    @property
+    def is_preview_visible(self) -> bool:
+        return bool(self.preview_heights)
+
+    def update_trigger_streaming(self):
+        """ 트리거 모드에서는 화면을 보고 있을 때만 연속 트리거로 미리보기를 받음 """
+        streaming = self.is_preview_visible
+        if not self.trigger_mode or not self.cam or streaming == self.trigger_streaming:
+            return
+        try:
+            self.cam.Trigger(TRIGGER_CONTINUOUS if streaming else 0)
+        except toupcam.HRESULTException:
+            return
+        self.trigger_streaming = streaming
+
+    def on_frame_ready(self):
+        """ UI 스레드, 화면 표시용 프레임만 받음 """
+        if self.acquisition is None:
+            return
+        frame = self.acquisition.take()
+        if frame is None:
+            return
+        with frame:
+            self.signal_frame.emit(frame)
+            self.signal_image.emit(frame.array)
+        self.acquisition.mark_displayed()
+
+    @property
+    def acquisition_stats(self) -> dict:
+        """ return 받은/표시한/버린 프레임 수와 TOUPCAM_OPTION_NUMBER_DROP_FRAME """
+        if self.acquisition is None:
+            return {"delivered": 0, "displayed": 0, "dropped": 0, "sdk_dropped": 0}
+        return self.acquisition.stats
+
+    def set_preview_fps(self, fps: int):
+        self.preview_fps = fps
+        if self.acquisition is not None:
+            self.acquisition.preview_fps = fps
+
+    def set_timeline_waiting(self, waiting: bool):
+        self.timeline_waiting = waiting
+        self.update_frame_rate_limit()
+
+    def update_frame_rate_limit(self):
+        """ 화면을 보는 라벨이 없거나 타임라인 캡처 사이면 센서 프레임 수를 줄임, 캡처 중에는 줄이지 않음 """
+        idle = (not self.is_preview_visible or self.timeline_waiting) and not self.pending_capture_count
+        limit = IDLE_FRAME_RATE if idle else 0
+        if limit == self.frame_rate_limit or not self.cam:
+            return
+        try:
+            self.cam.put_Option(toupcam.TOUPCAM_OPTION_FRAMERATE, limit)
+        except toupcam.HRESULTException:
+            logging.warning("Frame rate limit is not supported")
+        self.frame_rate_limit = limit
+
+    def set_preview_height(self, key, height: int):
+        """ key: 화면 라벨, height가 0이면 (라벨이 숨겨짐) 그 라벨은 제외 """
+        if height:
+            self.preview_heights[key] = height
         else:
-            self.signal_image.emit(self.current_image)
+            self.preview_heights.pop(key, None)
+        # 수집 스레드는 이 값만 읽음, 라벨들 중 가장 큰 표시 높이 (0이면 줄이지 않음)
+        self.preview_height = max(self.preview_heights.values(), default=0)
+        self.update_frame_rate_limit()
+        self.update_trigger_streaming()
 
     @property
-    def current_image(self):
+    def frame_shape(self):
         if self.direction % 2 == 0:
-            img = np.frombuffer(self.pData, dtype=np.uint8).reshape((self.imgHeight, self.imgWidth, 3))
-        else:
-            img = np.frombuffer(self.pData, dtype=np.uint8).reshape((self.imgWidth, self.imgHeight, 3))
-        return img
+            return self.imgHeight, self.imgWidth, 3
+        return self.imgWidth, self.imgHeight, 3
+
+    def get_current_frame(self) -> Frame:
+        if self.frame_pool is None:
+            return None
+        return self.frame_pool.get_latest()
+
+    @property
+    def current_image(self):
+        """ 최신 프레임의 복사본, 복사 없이 쓰려면 get_current_frame()으로 프레임을 잡아서 사용 """
+        frame = self.get_current_frame()
+        if frame is None:
+            return None
+        with frame:
+            return frame.array.copy()
 
     @property
     def resolutions(self):
@@ -165,13 +384,18 @@ class CameraUnit(QObject):
         self.cam.put_Option(toupcam.TOUPCAM_OPTION_ROTATE, index % 4 * 90)
 
     def set_resolution(self, index):
-        if self.cam:
-            self.cam.Stop()
-
-        self.res = index
-        self.imgWidth = self.cur.model.res[index].width
-        self.imgHeight = self.cur.model.res[index].height
-
+        with self.pull_lock:
+            if self.cam:
+                self.cam.Stop()
+            # 진행 중인 TriggerSync가 끝나야 버퍼 크기를 바꿀 수 있음, Stop()으로 끊기고 길어도 TRIGGER_SYNC_TIMEOUT
+            self.trigger_idle.wait()
+
+            self.res = index
+            self.imgWidth = self.cur.model.res[index].width
+            self.imgHeight = self.cur.model.res[index].height
+
+        if self.acquisition is not None:
+            self.acquisition.clear()
         if self.cam:
             self.cam.put_eSize(self.res)
             self.start_camera()
@@ -0,0 +1,257 @@
+import math
+import time
+
+import numpy as np
+
+from util.enums import ColorDistanceMetric
+
+# sRGB(D65) <-> CIE Lab 변환, skimage.color.rgb2lab / lab2rgb와 같은 상수 사용
+# rgb는 이 프로젝트의 평균색과 같은 0~255 범위를 사용함
+
+XYZ_FROM_RGB = np.array([[0.412453, 0.357580, 0.180423],
+                         [0.212671, 0.715160, 0.072169],
+                         [0.019334, 0.119193, 0.950227]])
+WHITE_POINT = np.array([0.95047, 1., 1.08883])  # D65, 2도 시야
+
+# 선형 rgb -> 백색점으로 정규화된 xyz 를 한 번에 계산하는 행렬 (행 벡터 @ 행렬)
+NORMALIZED_XYZ_FROM_RGB = (XYZ_FROM_RGB / WHITE_POINT[:, None]).T.astype(np.float32)
+RGB_FROM_NORMALIZED_XYZ = np.linalg.inv(NORMALIZED_XYZ_FROM_RGB.astype(np.float64)).astype(np.float32)
+
+DELTA = 6 / 29
+DELTA_CUBE = DELTA ** 3
+LINEAR_SLOPE = 1 / (3 * DELTA ** 2)
+
+POW_25_7 = np.float32(25.0 ** 7)
+TWO_PI = np.float32(2 * np.pi)
+HUE_WRAP_LIMIT = np.float32(np.pi + 2e-6)  # 정확히 180도인 쌍이 float32 반올림(수 ulp)으로 넘어가지 않도록
+
+
+def linearize_exact(rgb: np.ndarray) -> np.ndarray:
+    """ 0~255 sRGB -> 0~1 선형 rgb float64 (LUT 생성용) """
+    normalized = np.asarray(rgb, dtype=np.float64) / 255.0
+    return np.where(normalized > 0.04045, ((normalized + 0.055) / 1.055) ** 2.4, normalized / 12.92)
+
+
+LINEAR_LUT_8BIT = linearize_exact(np.arange(256)).astype(np.float32)  # uint8 입력용
+
+
+def linearize(rgb: np.ndarray) -> np.ndarray:
+    """ 0~255 sRGB -> 0~1 선형 rgb float32, uint8은 256 LUT 조회 """
+    rgb = np.asarray(rgb)
+    if rgb.dtype == np.uint8:
+        return LINEAR_LUT_8BIT[rgb]
+
+    # 평균색은 실수이므로 float32로 곡선을 직접 계산, 선형 구간은 드물어서 해당 원소만 다시 계산
+    normalized = rgb.astype(np.float32)
+    normalized *= np.float32(1 / 255)
+    linear = normalized + np.float32(0.055)
+    linear *= np.float32(1 / 1.055)
+    np.power(linear, np.float32(2.4), out=linear)
+
+    low = normalized <= np.float32(0.04045)
+    linear[low] = normalized[low] * np.float32(1 / 12.92)
+    return linear
+
+
+def delinearize(linear_rgb: np.ndarray) -> np.ndarray:
+    """ 0~1 선형 rgb -> 0~1 sRGB, 범위 밖은 잘라냄 """
+    linear_rgb = np.asarray(linear_rgb, dtype=np.float32)
+    rgb = np.power(np.maximum(linear_rgb, 0), np.float32(1 / 2.4))
+    rgb *= np.float32(1.055)
+    rgb -= np.float32(0.055)
+
+    low = linear_rgb <= np.float32(0.0031308)
+    rgb[low] = linear_rgb[low] * np.float32(12.92)
+    return np.clip(rgb, 0, 1, out=rgb)
+
+
+def lab_f(t: np.ndarray) -> np.ndarray:
+    f = np.cbrt(t)
+    low = t <= np.float32(DELTA_CUBE)
+    f[low] = t[low] * np.float32(LINEAR_SLOPE) + np.float32(4 / 29)
+    return f
+
+
+def lab_f_inverse(f: np.ndarray) -> np.ndarray:
+    t = f ** 3
+    low = f <= np.float32(DELTA)
+    t[low] = (f[low] - np.float32(4 / 29)) * np.float32(3 * DELTA ** 2)
+    return t
+
+
+def rgb_to_xyz(rgb: np.ndarray) -> np.ndarray:
+    """ (..., 3) 0~255 rgb -> (..., 3) XYZ float32, Y 범위 0~1 """
+    linear_rgb = linearize(rgb)
+    return (linear_rgb.reshape(-1, 3) @ XYZ_FROM_RGB.T.astype(np.float32)).reshape(linear_rgb.shape)
+
+
+def xyz_to_xyy(xyz: np.ndarray) -> np.ndarray:
+    """ (..., 3) XYZ -> (..., 3) xyY, X + Y + Z = 0 이면 x, y는 0 """
+    xyz = np.asarray(xyz, dtype=np.float32)
+    total = xyz.sum(axis=-1, keepdims=True)
+
+    xyy = np.zeros_like(xyz)
+    np.divide(xyz[..., :2], total, out=xyy[..., :2], where=total != 0)
+    xyy[..., 2] = xyz[..., 1]
+    return xyy
+
+
+def rgb_to_xyy(rgb: np.ndarray) -> np.ndarray:
+    return xyz_to_xyy(rgb_to_xyz(rgb))
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """ (..., 3) 0~255 rgb -> (..., 3) Lab float32 """
+    linear_rgb = linearize(rgb)
+    xyz = (linear_rgb.reshape(-1, 3) @ NORMALIZED_XYZ_FROM_RGB).reshape(linear_rgb.shape)
+    fx, fy, fz = np.moveaxis(lab_f(xyz), -1, 0)
+
+    lab = np.empty(xyz.shape, dtype=np.float32)
+    lab[..., 0] = 116 * fy - 16
+    lab[..., 1] = 500 * (fx - fy)
+    lab[..., 2] = 200 * (fy - fz)
+    return lab
+
+
+def lab_to_rgb(lab: np.ndarray) -> np.ndarray:
+    """ (..., 3) Lab -> (..., 3) 0~255 rgb float32, sRGB 범위 밖은 잘라냄 """
+    lab = np.asarray(lab, dtype=np.float32)
+    fy = (lab[..., 0] + 16) / 116
+    fx = lab[..., 1] / 500 + fy
+    fz = np.maximum(fy - lab[..., 2] / 200, 0)  # skimage와 같이 음수 z는 0으로 처리
+
+    xyz = lab_f_inverse(np.stack([fx, fy, fz], axis=-1))
+    linear_rgb = (xyz.reshape(-1, 3) @ RGB_FROM_NORMALIZED_XYZ).reshape(xyz.shape)
+    return delinearize(linear_rgb) * np.float32(255)
+
+
+def delta_e_cie76(lab1: np.ndarray, lab2: np.ndarray) -> np.ndarray:
+    """ (..., 3) Lab 쌍 -> (...) ΔE*ab """
+    return np.linalg.norm(np.asarray(lab2, dtype=np.float32) - np.asarray(lab1, dtype=np.float32), axis=-1)
+
+
+def delta_e_cie94(lab1: np.ndarray, lab2: np.ndarray, k_l=1, k_c=1, k_h=1, k_1=0.045, k_2=0.015) -> np.ndarray:
+    """ (..., 3) Lab 쌍 -> (...) ΔE*94, lab1이 기준색 (graphic arts 상수) """
+    lab1 = np.asarray(lab1, dtype=np.float32)
+    lab2 = np.asarray(lab2, dtype=np.float32)
+    l1, a1, b1 = np.moveaxis(lab1, -1, 0)
+    l2, a2, b2 = np.moveaxis(lab2, -1, 0)
+
+    c1 = np.hypot(a1, b1)
+    c2 = np.hypot(a2, b2)
+    delta_l = l1 - l2
+    delta_c = c1 - c2
+    delta_h_square = np.maximum((a1 - a2) ** 2 + (b1 - b2) ** 2 - delta_c ** 2, 0)
+
+    s_c = 1 + k_1 * c1
+    s_h = 1 + k_2 * c1
+    return np.sqrt((delta_l / k_l) ** 2 + (delta_c / (k_c * s_c)) ** 2 + delta_h_square / (k_h * s_h) ** 2)
+
+
+def _pow7(x: np.ndarray) -> np.ndarray:
+    # float32 ** 7은 일반 pow로 계산되어 곱셈보다 20배 이상 느림
+    x2 = x * x
+    return x2 * x2 * x2 * x
+
+
+def delta_e_ciede2000(lab1: np.ndarray, lab2: np.ndarray, k_l=1, k_c=1, k_h=1) -> np.ndarray:
+    """ (..., 3) Lab 쌍 -> (...) ΔE00 (Sharma, Wu, Dalal 2005), 각도는 라디안으로 계산 """
+    lab1 = np.asarray(lab1, dtype=np.float32)
+    lab2 = np.asarray(lab2, dtype=np.float32)
+    l1, a1, b1 = np.moveaxis(lab1, -1, 0)
+    l2, a2, b2 = np.moveaxis(lab2, -1, 0)
+
+    c_bar_7 = _pow7((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2)
+    g = 1.5 - 0.5 * np.sqrt(c_bar_7 / (c_bar_7 + POW_25_7))  # 1 + G
+    a1_prime = g * a1
+    a2_prime = g * a2
+    c1_prime = np.hypot(a1_prime, b1)
+    c2_prime = np.hypot(a2_prime, b2)
+    h1_prime = np.arctan2(b1, a1_prime)
+    h1_prime = h1_prime + TWO_PI * (h1_prime < 0)  # 0 ~ 2π
+    h2_prime = np.arctan2(b2, a2_prime)
+    h2_prime = h2_prime + TWO_PI * (h2_prime < 0)  # 0 ~ 2π
+
+    # 무채색(C1'C2' = 0)이면 ΔH' = 0이 되어 h̄'는 결과에 영향을 주지 않으므로 따로 처리하지 않음
+    delta_h_prime = h2_prime - h1_prime
+    h_bar_prime = (h1_prime + h2_prime) / 2
+    wrapped = np.abs(delta_h_prime) > HUE_WRAP_LIMIT
+    # 두 색상각 차이가 180도를 넘으면 반대 방향으로 돌림, 불리언 색인 대신 곱셈으로 처리
+    delta_h_prime -= np.copysign(TWO_PI, delta_h_prime) * wrapped
+    h_bar_prime += (np.float32(np.pi) - TWO_PI * (h_bar_prime >= np.pi)) * wrapped
+    delta_big_h_prime = 2 * np.sqrt(c1_prime * c2_prime) * np.sin(delta_h_prime / 2)
+
+    l_bar_prime = (l1 + l2) / 2
+    c_bar_prime = (c1_prime + c2_prime) / 2
+
+    t = (1 - 0.17 * np.cos(h_bar_prime - math.radians(30)) + 0.24 * np.cos(2 * h_bar_prime)
+         + 0.32 * np.cos(3 * h_bar_prime + math.radians(6)) - 0.20 * np.cos(4 * h_bar_prime - math.radians(63)))
+    delta_theta = math.radians(30) * np.exp(-((h_bar_prime - math.radians(275)) / math.radians(25)) ** 2)
+    c_bar_prime_7 = _pow7(c_bar_prime)
+    r_t = -2 * np.sqrt(c_bar_prime_7 / (c_bar_prime_7 + POW_25_7)) * np.sin(2 * delta_theta)
+    l_offset_square = (l_bar_prime - 50) ** 2
+    s_l = 1 + 0.015 * l_offset_square / np.sqrt(20 + l_offset_square)
+
+    l_term = (l2 - l1) / (k_l * s_l)
+    c_term = (c2_prime - c1_prime) / (k_c * (1 + 0.045 * c_bar_prime))
+    h_term = delta_big_h_prime / (k_h * (1 + 0.015 * c_bar_prime * t))
+    return np.sqrt(np.maximum(l_term ** 2 + c_term ** 2 + h_term ** 2 + r_t * c_term * h_term, 0))
+
+
+DISTANCE_METRIC_NAMES = {
+    ColorDistanceMetric.EUCLIDEAN: "Euclidean",
+    ColorDistanceMetric.CIE76: "ΔE76",
+    ColorDistanceMetric.CIE94: "ΔE94",
+    ColorDistanceMetric.CIEDE2000: "ΔE00",
+}
+
+DELTA_E_FUNCTIONS = {
+    ColorDistanceMetric.CIE76: delta_e_cie76,
+    ColorDistanceMetric.CIE94: delta_e_cie94,
+    ColorDistanceMetric.CIEDE2000: delta_e_ciede2000,
+}
+
+
+def delta_e(lab1: np.ndarray, lab2: np.ndarray, metric=ColorDistanceMetric.CIE76) -> np.ndarray:
+    return DELTA_E_FUNCTIONS[metric](lab1, lab2)
+
+
+def rgb_distances(rgb1: np.ndarray, rgb2: np.ndarray, metric=ColorDistanceMetric.EUCLIDEAN) -> np.ndarray:
+    """ (..., 3) 0~255 rgb 쌍 -> (...) 색 차이, EUCLIDEAN은 RGB 거리, 나머지는 Lab ΔE """
+    if metric == ColorDistanceMetric.EUCLIDEAN:
+        return np.linalg.norm(np.asarray(rgb1, dtype=np.float32) - np.asarray(rgb2, dtype=np.float32), axis=-1)
+    return delta_e(rgb_to_lab(rgb1), rgb_to_lab(rgb2), metric)
+
+
+def main():
+    # skimage 대비 속도 비교: python -m util.colorimetry, 정확도는 tests/test_colorimetry.py
+    from skimage import color
+
+    rng = np.random.default_rng(0)
+    rgb = rng.uniform(0, 255, (10000, 96, 3))
+    lab1 = rgb_to_lab(rgb)
+    lab2 = rgb_to_lab(np.clip(rgb + rng.normal(0, 20, rgb.shape), 0, 255))
+
+    def measure(function, samples, repeat=3):
+        elapsed_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function(samples)
+            elapsed_times.append(time.perf_counter() - start)
+        return min(elapsed_times)
+
+    for name, function, expected_function, samples in [
+        ("rgb_to_lab", rgb_to_lab, lambda x: color.rgb2lab(x / 255.0), rgb),
+        ("rgb_to_lab uint8", rgb_to_lab, lambda x: color.rgb2lab(x / 255.0), rgb.astype(np.uint8)),
+        ("lab_to_rgb", lab_to_rgb, lambda x: color.lab2rgb(x) * 255, lab1),
+        ("delta_e_cie94", lambda x: delta_e_cie94(*x), lambda x: color.deltaE_ciede94(*x), (lab1, lab2)),
+        ("delta_e_ciede2000", lambda x: delta_e_ciede2000(*x), lambda x: color.deltaE_ciede2000(*x), (lab1, lab2)),
+    ]:
+        elapsed = measure(function, samples)
+        expected_elapsed = measure(expected_function, samples)
+        print(f"{name} {np.shape(samples)}: {elapsed * 1000:.1f} ms, skimage {expected_elapsed * 1000:.1f} ms "
+              f"(x{expected_elapsed / elapsed:.1f})")
+
+
+if __name__ == "__main__":
+    main()
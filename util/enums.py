@@ -27,3 +27,10 @@ class LabCorrectionType(Enum):
     WHOLE_HALL_ROI = 0
     SINGLE_HALL_ROI = 1
     MANUAL_COLOR = 2
+
+
+class ColorDistanceMetric(Enum):
+    EUCLIDEAN = 0  # 색 공간 좌표의 유클리드 거리 (타임라인은 RGB)
+    CIE76 = 1
+    CIE94 = 2
+    CIEDE2000 = 3
@@ -10,8 +10,9 @@ import numpy as np
 import pandas as pd
 from PySide6.QtCore import QThread, Signal, QObject
 
-from models import Image
+from models import Image, timeline_store  # 모듈로 참조, models.timeline_store가 util을 불러오는 중에도 import 가능
 from . import image_converter as ic
+from .timeline_log import TimelineLog, TimelineLogReader, get_log_file_name
 
 
 class ModuleFixUnpickler(pickle.Unpickler):
@@ -165,44 +166,37 @@ class SnapshotDataManager:
 
 
 class TimeLineLoadWorker(QThread):
-    finished = Signal(dict, pd.DataFrame)
+    finished = Signal(dict, object)  # timeline_info, timeline_store.TimelineStore
 
-    def __init__(self, timeline, snapshot_instance, timeline_info, mean_colors, parent=None):
+    def __init__(self, timeline, snapshot_instance, timeline_info, reader: TimelineLogReader, parent=None):
         super().__init__(parent)
         self.timeline = timeline
         self.snapshot_instance = snapshot_instance
         self.timeline_info = timeline_info
-        self.mean_colors = mean_colors
+        self.reader = reader
 
     def run(self):
         datas = self.calculate_timeline_datas()
         self.finished.emit(self.timeline_info, datas)
         self.exec()
 
-    def calculate_timeline_datas(self):
-        datas = self.mean_colors.reindex(columns=self.timeline.datas.columns)
-        num_cells = self.timeline.num_cells
+    def calculate_timeline_datas(self) -> "timeline_store.TimelineStore":
+        reader = self.reader
+        store = timeline_store.TimelineStore(self.timeline.num_cells)
 
-        init_colors = datas.iloc[0, 1:289].values.reshape(num_cells, 3)
+        # crc 확인만 구간 단위로 하고, rgb는 store가 memmap에서 필요한 행과 홀만 읽음
+        valid = np.ones(len(reader), dtype=bool)
+        for rows in reader.iter_chunks():
+            valid[rows] = reader.verify(rows)
+        if not valid.all():
+            logging.error(f"Skipped {np.count_nonzero(~valid)} corrupted records: {reader.timeline_log.file_name}")
+        reader_rows = None if valid.all() else np.flatnonzero(valid)
 
-        current_colors_matrix = datas.iloc[1:, 1:289].values.reshape(-1, num_cells, 3)
-        distances = np.linalg.norm(init_colors - current_colors_matrix, axis=2)
+        indexes = [index for index, is_valid in zip(reader.get_indexes(), valid) if is_valid]
+        store.set_base(reader, indexes, reader.get_elapsed_times()[valid], reader_rows)
 
-        for idx in range(num_cells):
-            datas.iloc[1:, datas.columns.get_loc(f"ColorDistance{idx + 1}")] = distances[:, idx]
-
-        distance_columns = [f"ColorDistance{idx + 1}" for idx in range(num_cells)]
-        prev_distances = datas.iloc[1:-1, datas.columns.get_loc(distance_columns[0]):datas.columns.get_loc(
-            distance_columns[-1]) + 1].astype(np.float32).values
-        current_distances = datas.iloc[2:, datas.columns.get_loc(distance_columns[0]):datas.columns.get_loc(
-            distance_columns[-1]) + 1].astype(np.float32).values
-        prev_distances[prev_distances == 0] = np.finfo(np.float32).eps
-        color_velocities = (current_distances - prev_distances) / prev_distances
-
-        for idx, col in enumerate(distance_columns):
-            datas.iloc[2:, datas.columns.get_loc(f"ColorVelocity{idx + 1}")] = color_velocities[:, idx]
-
-        return datas
+        # 색 차이는 그래프에서 선택한 홀만 필요할 때 계산
+        return store
 
     def get_color_distance(self, color1, color2) -> np.float32:
         return np.float32(round(np.linalg.norm(color1 - color2), 3))
@@ -235,9 +229,32 @@ class TimelineDataManager(QObject):
         mean_colors_data = {"mean_colors": mean_colors}
         save_with_compress(mean_colors_data, mc_file_name)
 
+    def append_timeline(self, indexes: list, elapsed_times, rgbs, mc_file_name: str, new_timeline=False):
+        # 새 캡처의 레코드만 .mclog 파일 끝에 추가, 새 타임라인이면 같은 이름의 이전 기록 뒤에 잇지 않음
+        timeline_log = TimelineLog(get_log_file_name(mc_file_name))
+        if new_timeline:
+            timeline_log.rotate()
+        timeline_log.append(indexes, elapsed_times, rgbs)
+
+    def load_mean_colors(self, mc_file_name: str) -> pd.DataFrame:
+        timeline_log = TimelineLog(get_log_file_name(mc_file_name))
+        if timeline_log.exists:
+            return timeline_log.load_dataframe()
+
+        # 이전 버전의 .mcgz는 처음 불러올 때 한 번 .mclog로 변환
+        mean_colors = load_with_decompress(mc_file_name)["mean_colors"]
+        timeline_log.write_dataframe(mean_colors)
+        return mean_colors
+
+    def open_timeline_reader(self, mc_file_name: str) -> TimelineLogReader:
+        log_file_name = get_log_file_name(mc_file_name)
+        if not os.path.exists(log_file_name):
+            self.load_mean_colors(mc_file_name)  # .mcgz 변환
+        return TimelineLogReader(log_file_name)
+
     def load_timeline(self, timeline, snapshot_instance, cs_file_name, ti_file_name: str, mc_file_name: str) \
             -> (dict, pd.DataFrame):
-        if not os.path.exists(mc_file_name):
+        if not os.path.exists(mc_file_name) and not os.path.exists(get_log_file_name(mc_file_name)):
             return None, None
 
         try:
@@ -245,7 +262,7 @@ class TimelineDataManager(QObject):
         except:
             camera_settings = None
         timeline_info = load_with_decompress(ti_file_name)["timeline_info"]
-        mean_colors = load_with_decompress(mc_file_name)["mean_colors"]
-        worker = TimeLineLoadWorker(timeline, snapshot_instance, timeline_info, mean_colors)
+        reader = self.open_timeline_reader(mc_file_name)
+        worker = TimeLineLoadWorker(timeline, snapshot_instance, timeline_info, reader)
 
         return worker, camera_settings
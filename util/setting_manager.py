@@ -33,6 +33,7 @@ CAMERA_BRIGHTNESS = "camera_brightness"
 CAMERA_CONTRAST = "camera_contrast"
 CAMERA_GAMMA = "camera_gamma"
 CAMERA_ANTI_FLICKER = "camera_anti_flicker"
+CAMERA_PREVIEW_FPS = "camera_preview_fps"
 
 
 class SettingManager:
@@ -237,6 +238,12 @@ class SettingManager:
     def get_camera_anti_flicker(self):
         return self._get_value(CAMERA_ANTI_FLICKER, 2)
 
+    def set_camera_preview_fps(self, fps):
+        self._set_value(CAMERA_PREVIEW_FPS, fps)
+
+    def get_camera_preview_fps(self):
+        return self._get_value(CAMERA_PREVIEW_FPS)
+
 
 def main():
     settings = SettingManager()
@@ -0,0 +1,243 @@
+import logging
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+LOG_EXTENSION = ".mclog"
+MAGIC = b"PITL"
+VERSION = 1
+HEADER_FORMAT = "<4sHHI4x"  # magic, version, num_cells, record_size
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)  # 16
+INDEX_FORMAT = "%y%m%d-%H%M%S.%f"
+EPOCH = datetime(1970, 1, 1)  # 타임라인 인덱스는 시간대 없는 로컬 시간
+
+
+class InvalidTimelineLog(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def get_record_dtype(num_cells: int = 96) -> np.dtype:
+    # 레코드 하나: timestamp(µs) + elapsed_time + 96 * RGB + crc32, 패딩 없음
+    return np.dtype([
+        ("timestamp", "<i8"),
+        ("elapsed_time", "<f4"),
+        ("rgb", "<f4", (num_cells * 3,)),
+        ("crc", "<u4"),
+    ])
+
+
+def get_mean_color_columns(num_cells: int = 96) -> list:
+    columns = ["elapsed_time"]
+    for idx in range(num_cells):
+        columns.extend([f"R{idx + 1}", f"G{idx + 1}", f"B{idx + 1}"])
+    return columns
+
+
+def get_log_file_name(mc_file_name: str) -> str:
+    return f"{os.path.splitext(mc_file_name)[0]}{LOG_EXTENSION}"
+
+
+def index_to_timestamp(index: str) -> int:
+    return (datetime.strptime(index, INDEX_FORMAT) - EPOCH) // timedelta(microseconds=1)
+
+
+def timestamp_to_index(timestamp: int) -> str:
+    return (EPOCH + timedelta(microseconds=int(timestamp))).strftime(INDEX_FORMAT)[:-5]
+
+
+class TimelineLog:
+    """ 타임라인 평균색을 고정 크기 레코드로 이어 쓰는 파일
+
+    [header 16 bytes][record][record]... 캡처마다 레코드 하나만 추가하며,
+    레코드마다 crc32를 저장해 불러올 때 손상된 레코드와 잘린 마지막 레코드를 제외함
+    """
+
+    def __init__(self, file_name: str, num_cells: int = 96):
+        self.file_name = file_name
+        self.num_cells = num_cells
+        self.record_dtype = get_record_dtype(num_cells)
+        self.record_size = self.record_dtype.itemsize
+
+    @property
+    def exists(self):
+        return os.path.exists(self.file_name)
+
+    def get_header(self) -> bytes:
+        return struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.num_cells, self.record_size)
+
+    def read_header(self, f):
+        header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise InvalidTimelineLog(f"Header is truncated: {self.file_name}")
+
+        magic, version, num_cells, record_size = struct.unpack(HEADER_FORMAT, header)
+        if magic != MAGIC or version != VERSION:
+            raise InvalidTimelineLog(f"Unsupported timeline log: {self.file_name}")
+        if num_cells != self.num_cells or record_size != self.record_size:
+            raise InvalidTimelineLog(f"Record layout mismatch: {self.file_name}")
+
+    def make_records(self, indexes: list, elapsed_times, rgbs) -> np.ndarray:
+        """ indexes: 행 이름 리스트, elapsed_times: (n,), rgbs: (n, 288) """
+        records = np.zeros(len(indexes), dtype=self.record_dtype)
+        records["timestamp"] = [index_to_timestamp(index) for index in indexes]
+        records["elapsed_time"] = elapsed_times
+        records["rgb"] = rgbs
+
+        raw = records.view(np.uint8).reshape(len(records), self.record_size)
+        records["crc"] = [zlib.crc32(row[:-4]) for row in raw]
+        return records
+
+    def append(self, indexes: list, elapsed_times, rgbs):
+        records = self.make_records(indexes, elapsed_times, rgbs)
+
+        with open(self.file_name, "ab") as f:
+            size = f.tell()
+            if size < HEADER_SIZE:
+                f.truncate(0)
+                f.write(self.get_header())
+            elif (size - HEADER_SIZE) % self.record_size:
+                # 쓰기 도중 종료되어 잘린 레코드는 버리고 이어 씀
+                f.truncate(size - (size - HEADER_SIZE) % self.record_size)
+            f.write(records.tobytes())
+
+    def rotate(self):
+        """ 새 타임라인을 같은 이름으로 시작할 때 호출, 기존 파일은 .old로 남김 """
+        if self.exists:
+            os.replace(self.file_name, f"{self.file_name}.old")
+
+    def write(self, indexes: list, elapsed_times, rgbs):
+        records = self.make_records(indexes, elapsed_times, rgbs)
+
+        temp_file_name = f"{self.file_name}.tmp"
+        with open(temp_file_name, "wb") as f:
+            f.write(self.get_header())
+            f.write(records.tobytes())
+        os.replace(temp_file_name, self.file_name)
+
+    def read_records(self) -> np.ndarray:
+        with open(self.file_name, "rb") as f:
+            self.read_header(f)
+            buffer = f.read()
+
+        count = len(buffer) // self.record_size
+        records = np.frombuffer(buffer, dtype=self.record_dtype, count=count)
+
+        raw = records.view(np.uint8).reshape(count, self.record_size)
+        valid = np.array([zlib.crc32(row[:-4]) for row in raw], dtype=np.uint32) == records["crc"]
+        if not valid.all():
+            logging.error(f"Skipped {np.count_nonzero(~valid)} corrupted records: {self.file_name}")
+        return records[valid]
+
+    def load_dataframe(self) -> pd.DataFrame:
+        """ 기존 .mcgz의 mean_colors와 같은 (n, 289) DataFrame """
+        records = self.read_records()
+        values = np.empty((len(records), 1 + self.num_cells * 3), dtype=np.float32)
+        values[:, 0] = records["elapsed_time"]
+        values[:, 1:] = records["rgb"]
+        index = [timestamp_to_index(timestamp) for timestamp in records["timestamp"]]
+
+        return pd.DataFrame(values, index=index, columns=get_mean_color_columns(self.num_cells))
+
+    def write_dataframe(self, mean_colors: pd.DataFrame):
+        columns = get_mean_color_columns(self.num_cells)
+        values = mean_colors.reindex(columns=columns).to_numpy(dtype=np.float32, na_value=np.nan)
+        self.write([str(index) for index in mean_colors.index], values[:, 0], values[:, 1:])
+
+
+class TimelineLogReader:
+    """ .mclog 레코드를 np.memmap으로 참조하는 읽기 전용 뷰
+
+    레코드 크기가 고정이므로 행 범위와 홀만 골라 읽을 수 있고, 전체 표를 메모리에 올리지 않음
+    불러온 타임라인의 TimelineStore가 열어 둔 채로 기록 부분의 rgb 저장소로 사용함
+    기록 중인 파일은 refresh()로 늘어난 레코드를 다시 매핑함
+    """
+
+    def __init__(self, file_name: str, num_cells: int = 96):
+        self.timeline_log = TimelineLog(file_name, num_cells)
+        self.num_cells = num_cells
+        self.records: np.ndarray = None
+        self.refresh()
+
+    def __len__(self):
+        return len(self.records)
+
+    def refresh(self):
+        timeline_log = self.timeline_log
+        with open(timeline_log.file_name, "rb") as f:
+            timeline_log.read_header(f)
+
+        count = (os.path.getsize(timeline_log.file_name) - HEADER_SIZE) // timeline_log.record_size
+        if count:
+            self.records = np.memmap(timeline_log.file_name, dtype=timeline_log.record_dtype, mode="r",
+                                     offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=timeline_log.record_dtype)
+
+    def close(self):
+        self.records = np.zeros(0, dtype=self.timeline_log.record_dtype)
+
+    def iter_chunks(self, chunk_size: int = 4096):
+        for start in range(0, len(self), chunk_size):
+            yield slice(start, min(len(self), start + chunk_size))
+
+    def verify(self, rows=slice(None)) -> np.ndarray:
+        """ return 행 별 crc 일치 여부 (n,) bool """
+        records = self.records[rows]
+        raw = np.asarray(records).view(np.uint8).reshape(len(records), self.timeline_log.record_size)
+        return np.array([zlib.crc32(row[:-4]) for row in raw], dtype=np.uint32) == records["crc"]
+
+    def get_indexes(self, rows=slice(None)) -> list:
+        return [timestamp_to_index(timestamp) for timestamp in self.records["timestamp"][rows]]
+
+    def get_elapsed_times(self, rows=slice(None)) -> np.ndarray:
+        return np.array(self.records["elapsed_time"][rows], dtype=np.float32)
+
+    def get_rgbs(self, rows=slice(None), wells=None) -> np.ndarray:
+        """ return (n, wells, 3) float32, rows: slice 또는 레코드 번호 배열, wells가 None이면 전체 홀 """
+        rgbs = self.records["rgb"][rows].reshape(-1, self.num_cells, 3)
+        if wells is not None:
+            rgbs = rgbs[:, wells]
+        return np.array(rgbs, dtype=np.float32)
+
+
+def convert_mean_colors_file(mc_file_name: str, num_cells: int = 96) -> TimelineLog:
+    """ 기존 .mcgz 파일을 한 번에 .mclog로 변환, 원본 파일은 그대로 둠 """
+    from util.local_storage_manager import load_with_decompress
+
+    timeline_log = TimelineLog(get_log_file_name(mc_file_name), num_cells)
+    mean_colors = load_with_decompress(mc_file_name)["mean_colors"]
+    timeline_log.write_dataframe(mean_colors)
+
+    return timeline_log
+
+
+def main():
+    # python -m util.timeline_log <storage path>: 경로 아래의 .mcgz를 모두 변환
+    root = sys.argv[1] if len(sys.argv) > 1 else os.getenv("LOCAL_STORAGE_PATH") or os.getcwd()
+    for directory, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if not file_name.endswith(".mcgz"):
+                continue
+
+            # 스냅샷 평균색(.mcgz)과 구분하기 위해 타임라인 정보(.tigz)가 있는 파일만 변환
+            mc_file_name = os.path.join(directory, file_name)
+            if not os.path.exists(f"{os.path.splitext(mc_file_name)[0]}.tigz"):
+                continue
+            if os.path.exists(get_log_file_name(mc_file_name)):
+                continue
+            try:
+                timeline_log = convert_mean_colors_file(mc_file_name)
+                print(f"converted: {timeline_log.file_name}")
+            except Exception as e:
+                print(f"failed: {mc_file_name} ({e})")
+
+
+if __name__ == "__main__":
+    main()
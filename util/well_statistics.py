@@ -0,0 +1,385 @@
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+GEOMETRY_CACHE_BYTES = 512 * 1024 * 1024
+BINCOUNT_MAX_WELL_PIXELS = 200  # 홀 당 픽셀이 이보다 적으면 홀 별 cv2 호출보다 bincount 한 번이 빠름
+
+
+def get_label_dtype(num_wells: int):
+    return np.uint8 if num_wells < np.iinfo(np.uint8).max else np.int32
+
+
+def get_well_box(circle_x, circle_y, radius, shape):
+    # 기존 평균색 계산과 동일한 정사각 영역: [c - r, c + r)
+    height, width = shape[:2]
+    x1, y1 = min(width, max(0, int(circle_x - radius))), min(height, max(0, int(circle_y - radius)))
+    x2, y2 = max(x1, min(width, int(circle_x + radius))), max(y1, min(height, int(circle_y + radius)))
+    return x1, y1, x2, y2
+
+
+def get_patch_box(circle_x, circle_y, radius, shape):
+    # cv2.circle로 그린 원 전체를 포함하는 영역: [c - r, c + r + 1), well box와 시작점이 같음
+    height, width = shape[:2]
+    x1, y1 = min(width, max(0, int(circle_x - radius))), min(height, max(0, int(circle_y - radius)))
+    x2, y2 = max(x1, min(width, int(circle_x) + radius + 1)), max(y1, min(height, int(circle_y) + radius + 1))
+    return x1, y1, x2, y2
+
+
+class WellGeometry:
+    """ 플레이트 형상(crop 크기, 방향, 축, 반지름) 하나에 대한 홀 번호 맵, 원 마스크와 홀 별 영역 """
+
+    def __init__(self, shape, rows, columns, radius, direction=0):
+        self.shape = tuple(shape[:2])
+        self.direction = direction
+        self.rows = list(rows)
+        self.columns = list(columns)
+        self.radius = radius
+
+        self.num_rows = len(self.rows)
+        self.num_columns = len(self.columns)
+        self.num_wells = self.num_rows * self.num_columns
+
+        self.label_map: np.ndarray = None  # 0: 배경, 1 ~ num_wells: 홀 번호 + 1 (row-major)
+        self.well_pixels: tuple = None  # (ys, xs) 홀 안쪽 픽셀 좌표, 전체 홀을 한 번에 합할 때 사용
+        self.well_labels: np.ndarray = None  # well_pixels 별 홀 번호 (0 ~ num_wells - 1)
+        self.boxes: np.ndarray = None  # (num_wells, 4) x1, y1, x2, y2
+        self.patch_boxes: np.ndarray = None  # (num_wells, 4) 원 전체를 포함하는 영역
+        self.discs = []  # 홀 별 box 크기의 원 영역 (bool)
+        self.circle_mask: np.ndarray = None  # 원 바깥 영역 마스크 (h, w) bool
+        self._disc_spans: tuple = None  # 누적합 테이블 조회용 행 구간, 필요할 때 계산
+
+        self.build()
+
+    @property
+    def key(self):
+        return get_geometry_key(self.shape, self.direction, self.rows, self.columns, self.radius)
+
+    @property
+    def use_bincount(self) -> bool:
+        # 반지름 35 기준 홀 당 약 3800 픽셀에서는 모으는 비용 때문에 bincount가 홀 별 cv2 호출보다 10배 느림
+        return len(self.well_labels) <= BINCOUNT_MAX_WELL_PIXELS * self.num_wells
+
+    @property
+    def nbytes(self):
+        return (self.label_map.nbytes + sum(axis.nbytes for axis in self.well_pixels) + self.well_labels.nbytes
+                + self.boxes.nbytes + self.patch_boxes.nbytes + self.circle_mask.nbytes
+                + sum(disc.nbytes for disc in self.discs))
+
+    def build(self):
+        height, width = self.shape
+        self.label_map = np.zeros((height, width), dtype=get_label_dtype(self.num_wells))
+        self.boxes = np.zeros((self.num_wells, 4), dtype=np.int32)
+        self.patch_boxes = np.zeros((self.num_wells, 4), dtype=np.int32)
+        self.discs = []
+        circle_mask = np.ones((height, width), dtype=np.uint8)
+
+        for j, circle_y in enumerate(self.rows):
+            for i, circle_x in enumerate(self.columns):
+                index = j * self.num_columns + i
+                x1, y1, x2, y2 = get_well_box(circle_x, circle_y, self.radius, self.shape)
+                disc = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+                if disc.size:
+                    cv2.circle(disc, (int(circle_x) - x1, int(circle_y) - y1), self.radius, 1, thickness=cv2.FILLED)
+                disc = disc.astype(bool)
+
+                self.label_map[y1:y2, x1:x2][disc] = index + 1
+                self.boxes[index] = x1, y1, x2, y2
+                self.patch_boxes[index] = get_patch_box(circle_x, circle_y, self.radius, self.shape)
+                self.discs.append(disc)
+
+                cv2.circle(circle_mask, (int(circle_x), int(circle_y)), self.radius, 0, thickness=cv2.FILLED)
+
+        self.circle_mask = circle_mask.astype(bool)
+        self.well_pixels = np.nonzero(self.label_map)
+        self.well_labels = self.label_map[self.well_pixels].astype(np.intp) - 1
+
+        # 여러 스냅샷이 공유하므로 읽기 전용으로 고정
+        for array in [self.label_map, *self.well_pixels, self.well_labels, self.boxes, self.patch_boxes,
+                      self.circle_mask, *self.discs]:
+            array.flags.writeable = False
+
+    @property
+    def disc_spans(self):
+        """ return (spans (m, 4) x1, y1, x2, y2, 홀 번호 (m,)), 원 영역의 행 단위 구간, 누적합 테이블 조회에 사용 """
+        if self._disc_spans is None:
+            spans, span_wells = [], []
+            for index, disc in enumerate(self.discs):
+                x1, y1, _, _ = self.boxes[index]
+                # cv2.circle로 채운 원은 행마다 한 구간
+                filled = np.flatnonzero(disc.any(axis=1))
+                starts = disc[filled].argmax(axis=1)
+                ends = disc.shape[1] - disc[filled, ::-1].argmax(axis=1)
+                ys = y1 + filled
+                spans.append(np.stack([x1 + starts, ys, x1 + ends, ys + 1], axis=1))
+                span_wells.append(np.full(len(filled), index, dtype=np.intp))
+            self._disc_spans = (np.concatenate(spans).astype(np.intp), np.concatenate(span_wells))
+        return self._disc_spans
+
+    def box_slice(self, index):
+        x1, y1, x2, y2 = self.boxes[index]
+        return slice(y1, y2), slice(x1, x2)
+
+    def patch_slice(self, index):
+        x1, y1, x2, y2 = self.patch_boxes[index]
+        return slice(y1, y2), slice(x1, x2)
+
+    def get_wells_in_rect(self, x1, y1, x2, y2) -> np.ndarray:
+        """ 영역과 겹치는 홀 번호 (patch box 기준) """
+        boxes = self.patch_boxes
+        hit = (boxes[:, 0] < x2) & (boxes[:, 2] > x1) & (boxes[:, 1] < y2) & (boxes[:, 3] > y1)
+        return np.flatnonzero(hit)
+
+
+def get_geometry_key(shape, direction, rows, columns, radius):
+    return tuple(shape[:2]), direction, tuple(rows), tuple(columns), radius
+
+
+class WellGeometryCache:
+    """ 프로세스 전역 WellGeometry LRU 캐시, 같은 플레이트 설정의 스냅샷/마스크가 공유함 """
+    _instance = None
+
+    def __new__(cls):
+        if not cls._instance:
+            cls._instance = super(WellGeometryCache, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "initialized"):
+            self.initialized = True
+            self.max_bytes = GEOMETRY_CACHE_BYTES
+            self.geometries = OrderedDict()
+            self.total_bytes = 0
+
+    def get(self, shape, rows, columns, radius, direction=0) -> WellGeometry:
+        key = get_geometry_key(shape, direction, rows, columns, radius)
+        geometry = self.geometries.get(key)
+        if geometry is not None:
+            self.geometries.move_to_end(key)
+            return geometry
+
+        geometry = WellGeometry(shape, rows, columns, radius, direction)
+        self.geometries[key] = geometry
+        self.total_bytes += geometry.nbytes
+        self.evict()
+
+        return geometry
+
+    def evict(self):
+        # 가장 최근 항목 하나는 예산을 넘더라도 유지
+        while self.total_bytes > self.max_bytes and len(self.geometries) > 1:
+            _, geometry = self.geometries.popitem(last=False)
+            self.total_bytes -= geometry.nbytes
+
+    def set_max_bytes(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def clear(self):
+        self.geometries.clear()
+        self.total_bytes = 0
+
+
+def get_wrap_dtype(max_value: int):
+    # 영역 합이 dtype 범위 안이면 누적합이 넘쳐도(모듈러 연산) 영역 합은 정확함
+    for dtype in [np.uint16, np.uint32]:
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+class WellIntegralImage:
+    """ 마스크되지 않은 픽셀, 픽셀 제곱, 유효 픽셀 수의 누적합 테이블(summed-area table)
+
+    프레임 당 한 번 생성하며, 사각형 영역은 O(1), 원 영역은 행 단위 구간 합으로 O(r)에 조회함
+    원 마스크는 포함하지 않으므로 반지름이 바뀌어도 다시 만들 필요가 없음
+    max_area: 조회할 영역의 최대 넓이, 누적합 dtype 선택에 사용(원 조회만 한다면 이미지 너비로 충분)
+    """
+
+    def __init__(self, image: np.ndarray, masked: np.ndarray = None, max_area: int = None):
+        height, width, channels = image.shape
+        max_area = max_area or height * width
+        valid = np.ones((height, width), dtype=np.uint8) if masked is None else (~masked).view(np.uint8)
+        pixels = image * valid[:, :, None]
+
+        self.shape = (height, width)
+        self.channels = channels
+        self.sum_table = self._integral(pixels, get_wrap_dtype(max_area * 255))
+        self.square_table = self._integral(pixels.astype(np.uint32) ** 2, get_wrap_dtype(max_area * 255 ** 2))
+        self.count_table = self._integral(valid[:, :, None], get_wrap_dtype(max_area))
+
+    @staticmethod
+    def _integral(array: np.ndarray, dtype):
+        height, width, channels = array.shape
+        table = np.zeros((height + 1, width + 1, channels), dtype=dtype)
+        inner = table[1:, 1:]
+        np.cumsum(array, axis=0, dtype=dtype, out=inner)
+        np.cumsum(inner, axis=1, dtype=dtype, out=inner)
+        return table
+
+    @staticmethod
+    def _query(table: np.ndarray, x1, y1, x2, y2):
+        with np.errstate(over="ignore"):
+            return table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+
+    def query_rects(self, boxes: np.ndarray):
+        """ boxes: (n, 4) x1, y1, x2, y2 / return (sums (n, c), square_sums (n, c), counts (n,)) """
+        x1, y1, x2, y2 = np.asarray(boxes, dtype=np.intp).T
+        sums = self._query(self.sum_table, x1, y1, x2, y2).astype(np.float64)
+        square_sums = self._query(self.square_table, x1, y1, x2, y2).astype(np.float64)
+        counts = self._query(self.count_table, x1, y1, x2, y2)[:, 0].astype(np.int64)
+        return sums, square_sums, counts
+
+    def query_discs(self, geometry: WellGeometry):
+        """ 홀 별 원 영역을 geometry.disc_spans의 행 단위 구간으로 조회, calculate_well_sums()와 같은 픽셀을 합함 """
+        spans, span_wells = geometry.disc_spans
+        sums, square_sums, counts = self.query_rects(spans)
+
+        num_wells = geometry.num_wells
+        well_sums = np.zeros((num_wells, self.channels), dtype=np.float64)
+        well_square_sums = np.zeros((num_wells, self.channels), dtype=np.float64)
+        np.add.at(well_sums, span_wells, sums)
+        np.add.at(well_square_sums, span_wells, square_sums)
+        return well_sums, well_square_sums, np.bincount(span_wells, weights=counts, minlength=num_wells).astype(np.int64)
+
+    def well_statistics(self, geometry: WellGeometry):
+        """ return (means (rows, columns, c) float32, variances (rows, columns, c) float32, counts (rows, columns)) """
+        sums, square_sums, counts = self.query_discs(geometry)
+        means = np.zeros_like(sums)
+        square_means = np.zeros_like(square_sums)
+        np.divide(sums, counts[:, None], out=means, where=counts[:, None] > 0)
+        np.divide(square_sums, counts[:, None], out=square_means, where=counts[:, None] > 0)
+        variances = np.maximum(square_means - means ** 2, 0)
+
+        shape = (geometry.num_rows, geometry.num_columns)
+        return (means.astype(np.float32).reshape(*shape, -1),
+                variances.astype(np.float32).reshape(*shape, -1),
+                counts.reshape(shape))
+
+
+def _sum_valid_pixels(image: np.ndarray, valid: np.ndarray):
+    """ image: (h, w, c), valid: (h, w) bool / return (sum (c,), count) """
+    channels = image.shape[2]
+    count = cv2.countNonZero(valid.view(np.uint8)) if valid.size else 0
+    if not count:
+        return np.zeros(channels), 0
+    return np.array(cv2.mean(image, mask=valid.view(np.uint8))[:channels]) * count, count
+
+
+def calculate_well_sums(image: np.ndarray, geometry: WellGeometry, masked: np.ndarray = None, indexes=None):
+    """ return (sums: (num_wells, channels) float64, counts: (num_wells,) int64)
+    작은 홀 전체를 계산할 때는 홀 번호 맵으로 bincount 한 번에 합하고, 아니면 홀 별 box만 계산
+    """
+    if indexes is None and geometry.use_bincount:
+        return bincount_well_sums(image, geometry, masked)
+
+    channels = image.shape[2]
+    sums = np.zeros((geometry.num_wells, channels), dtype=np.float64)
+    counts = np.zeros(geometry.num_wells, dtype=np.int64)
+
+    indexes = range(geometry.num_wells) if indexes is None else indexes
+    for index in indexes:
+        rows, cols = geometry.box_slice(index)
+        valid = geometry.discs[index]
+        if masked is not None:
+            valid = valid & ~masked[rows, cols]
+
+        sums[index], counts[index] = _sum_valid_pixels(image[rows, cols], valid)
+
+    return sums, counts
+
+
+def bincount_well_sums(image: np.ndarray, geometry: WellGeometry, masked: np.ndarray = None):
+    """ calculate_well_sums()와 같은 형식, 홀 번호 맵의 픽셀을 모아 모든 홀을 한 번에 합함 """
+    num_wells = geometry.num_wells
+    pixels = image[geometry.well_pixels]  # (p, c), 홀 안쪽 픽셀만 모음
+    labels = geometry.well_labels
+    if masked is not None:
+        valid = ~masked[geometry.well_pixels]
+        pixels, labels = pixels[valid], labels[valid]
+
+    counts = np.bincount(labels, minlength=num_wells).astype(np.int64)
+    sums = np.empty((num_wells, image.shape[2]), dtype=np.float64)
+    for channel in range(image.shape[2]):
+        sums[:, channel] = np.bincount(labels, weights=pixels[:, channel], minlength=num_wells)
+
+    return sums, counts
+
+
+class WellPatches:
+    """ 홀 별 patch box 크기의 이미지/마스크 조각
+
+    평균색 계산과 마스크 편집 화면은 원 안쪽만 사용하므로 조각 단위로 다루고,
+    전체 크기 배열은 to_dense()로 요청할 때만 만듦
+    이미지 조각은 복사하지 않은 image의 view이므로 image 버퍼가 바뀌면 새로 만들어야 함 (Mask가 이미지 변경 시 처리)
+    마스크 조각은 합쳐진 마스크를 해제할 수 있도록 복사해 둠
+    masked: 합쳐진 마스크 (h, w) bool, 없으면 원 마스크만 적용
+    """
+
+    def __init__(self, image: np.ndarray, geometry: WellGeometry, masked: np.ndarray = None):
+        self.geometry = geometry
+        self.shape = geometry.shape
+        self.channels = image.shape[2]
+        self.image_patches = []  # 홀 별 (ph, pw, c), image의 view
+        self.mask_patches = []  # 홀 별 (ph, pw) bool, True: 마스크 처리
+
+        for index in range(geometry.num_wells):
+            rows, cols = geometry.patch_slice(index)
+            self.image_patches.append(image[rows, cols])
+            self.mask_patches.append(self._get_mask_patch(index, masked))
+
+    @property
+    def nbytes(self):  # 새로 할당한 마스크 조각만, 이미지 조각은 원본 버퍼를 공유
+        return sum(patch.nbytes for patch in self.mask_patches)
+
+    def _get_mask_patch(self, index, masked: np.ndarray = None):
+        rows, cols = self.geometry.patch_slice(index)
+        source = self.geometry.circle_mask if masked is None else masked
+        return source[rows, cols].copy()
+
+    def update_masks(self, indexes, masked: np.ndarray):
+        for index in indexes:
+            self.mask_patches[index] = self._get_mask_patch(index, masked)
+
+    def calculate_well_sums(self, indexes=None):
+        """ calculate_well_sums()와 같은 형식, 조각만으로 계산함 """
+        geometry = self.geometry
+        sums = np.zeros((geometry.num_wells, self.channels), dtype=np.float64)
+        counts = np.zeros(geometry.num_wells, dtype=np.int64)
+
+        indexes = range(geometry.num_wells) if indexes is None else indexes
+        for index in indexes:
+            disc = geometry.discs[index]
+            box_height, box_width = disc.shape  # well box는 patch box의 왼쪽 위 부분
+            valid = disc & ~self.mask_patches[index][:box_height, :box_width]
+            sums[index], counts[index] = _sum_valid_pixels(self.image_patches[index][:box_height, :box_width], valid)
+
+        return sums, counts
+
+    def paste(self, target: np.ndarray, fill=0):
+        """ target: (h, w, c), 홀 영역에 마스크 처리된 조각을 채움 """
+        for index in range(self.geometry.num_wells):
+            rows, cols = self.geometry.patch_slice(index)
+            mask_patch = self.mask_patches[index]
+            target[rows, cols] = np.where(mask_patch[:, :, None], np.uint8(fill), self.image_patches[index])
+        return target
+
+    def to_dense(self, fill=0) -> np.ndarray:
+        """ Mask.mask_filled_array와 같은 (h, w, c) uint8 이미지 """
+        height, width = self.shape
+        target = np.full((height, width, self.channels), fill, dtype=np.uint8)
+        return self.paste(target, fill)
+
+
+def sums_to_means(sums: np.ndarray, counts: np.ndarray, geometry: WellGeometry) -> np.ndarray:
+    """ return (rows, columns, channels) float32, 유효 픽셀이 없는 홀은 0 """
+    means = np.zeros_like(sums)
+    np.divide(sums, counts[:, None], out=means, where=counts[:, None] > 0)
+
+    return means.astype(np.float32).reshape(geometry.num_rows, geometry.num_columns, -1)
+
+
+def calculate_well_means(image: np.ndarray, geometry: WellGeometry, masked: np.ndarray = None) -> np.ndarray:
+    sums, counts = calculate_well_sums(image, geometry, masked)
+    return sums_to_means(sums, counts, geometry)